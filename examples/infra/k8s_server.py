@@ -6,6 +6,8 @@ from typing import Optional
 from kubernetes import client, config
 from mcp.server.fastmcp import FastMCP
 
+from mcp_repl.payload_channel import offload_payload
+
 try:
     config.load_incluster_config()
 except config.ConfigException:
@@ -176,7 +178,7 @@ def get_pod_logs(
     namespace: str = "default",
     container: Optional[str] = None,
     tail_lines: int = 100,
-) -> str:
+):
     """
     Get logs from a pod.
 
@@ -190,18 +192,19 @@ def get_pod_logs(
         Pod logs
     """
     try:
-        return core_v1.read_namespaced_pod_log(
+        logs = core_v1.read_namespaced_pod_log(
             name=pod_name,
             namespace=namespace,
             container=container,
             tail_lines=tail_lines,
         )
+        return offload_payload(logs, mime_type="text/plain")
     except Exception as e:
         return f"Error getting logs for pod {pod_name}: {str(e)}"
 
 
 @mcp.tool()
-def describe_resource(resource_type: str, name: str, namespace: str = "default") -> str:
+def describe_resource(resource_type: str, name: str, namespace: str = "default"):
     """
     Get detailed information about a Kubernetes resource.
 
@@ -226,7 +229,7 @@ def describe_resource(resource_type: str, name: str, namespace: str = "default")
             return f"Unsupported resource type: {resource_type}"
 
         resource_dict = client.ApiClient().sanitize_for_serialization(result)
-        return json.dumps(resource_dict, indent=2)
+        return offload_payload(json.dumps(resource_dict, indent=2))
     except Exception as e:
         return f"Error describing {resource_type} {name}: {str(e)}"
 
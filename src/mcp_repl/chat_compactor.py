@@ -0,0 +1,245 @@
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+CHARS_PER_TOKEN = 4
+ELIDED_MARKER = "[tool output elided"
+# Tool results sent as changes against an earlier result, see result_delta
+DELTA_MARKER = "[delta"
+UNCHANGED_MARKER = "[unchanged"
+# A copy of a baseline whose turn was dropped, kept in a result that needs it
+BASELINE_COPY_MARKER = "[baseline tool_use"
+
+_BASELINE_REFERENCE = re.compile(r"in tool_use (\S+)\]")
+_BASELINE_COPY = re.compile(
+    rf"^{re.escape(BASELINE_COPY_MARKER)} (\S+), dropped from the history:\]\n",
+    re.MULTILINE,
+)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Fallback serializer for SDK objects stored in the chat history"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def estimate_tokens(value: Any) -> int:
+    """Cheap token estimate for a message, content block or whole history"""
+    if isinstance(value, str):
+        return len(value) // CHARS_PER_TOKEN
+    return len(json.dumps(value, default=to_jsonable)) // CHARS_PER_TOKEN
+
+
+def content_to_text(content: Any) -> str:
+    """Flatten tool_result content (string or list of content items) to text"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            text = getattr(item, "text", None)
+            if text is None and isinstance(item, dict):
+                text = item.get("text")
+            parts.append(text if text is not None else str(item))
+        return "\n".join(parts)
+    return str(content)
+
+
+def is_tool_result_message(message: Dict[str, Any]) -> bool:
+    """Whether a user message only carries tool results"""
+    content = message.get("content")
+    return (
+        message.get("role") == "user"
+        and isinstance(content, list)
+        and all(
+            isinstance(block, dict) and block.get("type") == "tool_result"
+            for block in content
+        )
+    )
+
+
+def delta_baseline(block: Dict[str, Any]) -> str | None:
+    """tool_use id of the result a delta or unchanged tool_result refers to"""
+    text = content_to_text(block.get("content"))
+    if not text.startswith((DELTA_MARKER, UNCHANGED_MARKER)):
+        return None
+    match = _BASELINE_REFERENCE.search(text.split("\n", 1)[0])
+    return match.group(1) if match else None
+
+
+def held_baselines(block: Dict[str, Any]) -> Dict[str, str]:
+    """Full texts a tool_result holds that deltas may refer to, by tool_use id"""
+    text = content_to_text(block.get("content"))
+    if text.startswith(ELIDED_MARKER):
+        return {}
+    copy = _BASELINE_COPY.search(text)
+    if copy is not None:
+        return {copy.group(1): text[copy.end() :]}
+    if delta_baseline(block) is not None or "tool_use_id" not in block:
+        return {}
+    return {block["tool_use_id"]: text}
+
+
+class ChatHistoryCompactor:
+    """Keeps the chat history under a token budget
+
+    Old tool_result payloads are elided first, then whole turns are dropped
+    from the start of the conversation. The most recent turns are never
+    touched and a turn is always dropped as a unit, so tool_use/tool_result
+    pairs stay intact.
+
+    Results sent as deltas (see result_delta) stay readable: a result that
+    deltas refer to is only elided together with them, and never while a
+    delta in the recent turns needs it. When its turn is dropped, its text
+    is copied into the first delta that is kept.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 100_000,
+        keep_recent_turns: int = 2,
+        preview_chars: int = 200,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.preview_chars = preview_chars
+
+    def _turn_starts(self, history: List[Dict[str, Any]]) -> List[int]:
+        """Indices of user messages that start a new turn"""
+        return [
+            i
+            for i, message in enumerate(history)
+            if message.get("role") == "user" and not is_tool_result_message(message)
+        ]
+
+    def _protected_from(self, history: List[Dict[str, Any]]) -> int:
+        """Index from which messages belong to the recent, untouched turns"""
+        starts = self._turn_starts(history)
+        if len(starts) <= self.keep_recent_turns:
+            return starts[0] if starts else 0
+        return (
+            starts[-self.keep_recent_turns] if self.keep_recent_turns else len(history)
+        )
+
+    def elide_tool_result(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace a tool_result payload with a short summary"""
+        text = content_to_text(block.get("content"))
+        if text.startswith(ELIDED_MARKER):
+            return block
+        preview = " ".join(text[: self.preview_chars].split())
+        summary = f"{ELIDED_MARKER} to save context; original size {len(text)} chars]"
+        if preview:
+            summary += f"\nPreview: {preview}"
+            if len(text) > self.preview_chars:
+                summary += "..."
+        return {**block, "content": summary}
+
+    @staticmethod
+    def _dependents(
+        history: List[Dict[str, Any]],
+    ) -> Dict[str, List[Tuple[int, int]]]:
+        """Positions of delta results, by the tool_use id they refer to"""
+        dependents = {}
+        for i, message in enumerate(history):
+            if not is_tool_result_message(message):
+                continue
+            for j, block in enumerate(message["content"]):
+                baseline = delta_baseline(block)
+                if baseline is not None:
+                    dependents.setdefault(baseline, []).append((i, j))
+        return dependents
+
+    @staticmethod
+    def _replace_block(
+        history: List[Dict[str, Any]], i: int, j: int, block: Dict[str, Any]
+    ) -> int:
+        """Replace one tool_result block, returning the change in tokens"""
+        message = history[i]
+        blocks = list(message["content"])
+        blocks[j] = block
+        history[i] = {**message, "content": blocks}
+        return estimate_tokens(history[i]) - estimate_tokens(message)
+
+    def _elide_message(
+        self, history: List[Dict[str, Any]], i: int, protected_from: int
+    ) -> int:
+        """Elide the tool results of one message and the deltas against them"""
+        dependents = self._dependents(history)
+        change = 0
+        for j, block in enumerate(history[i]["content"]):
+            refs = [
+                ref
+                for baseline in held_baselines(block)
+                for ref in dependents.get(baseline, [])
+                if ref != (i, j)
+            ]
+            # A delta in the recent turns still needs this result
+            if any(k >= protected_from for k, _ in refs):
+                continue
+            for k, m in [(i, j), *refs]:
+                elided = self.elide_tool_result(history[k]["content"][m])
+                change += self._replace_block(history, k, m, elided)
+        return change
+
+    def _copy_dropped_baselines(
+        self, dropped: List[Dict[str, Any]], history: List[Dict[str, Any]]
+    ) -> int:
+        """Copy results that kept deltas refer to out of dropped messages"""
+        dependents = self._dependents(history)
+        change = 0
+        for message in dropped:
+            if not is_tool_result_message(message):
+                continue
+            for block in message["content"]:
+                for baseline, text in held_baselines(block).items():
+                    if baseline not in dependents:
+                        continue
+                    k, m = dependents[baseline][0]
+                    target = history[k]["content"][m]
+                    copied = (
+                        f"{content_to_text(target.get('content'))}\n"
+                        f"{BASELINE_COPY_MARKER} {baseline}, "
+                        "dropped from the history:]\n"
+                        f"{text}"
+                    )
+                    change += self._replace_block(
+                        history, k, m, {**target, "content": copied}
+                    )
+        return change
+
+    def compact(
+        self, history: List[Dict[str, Any]], max_tokens: int | None = None
+    ) -> List[Dict[str, Any]]:
+        """Return a history that fits the token budget
+
+        Messages are never mutated in place; compacted messages are replaced
+        with new dicts so that other holders of the originals are unaffected.
+
+        Args:
+            history: Chat history to compact
+            max_tokens: Budget overriding the compactor's default for this call
+        """
+        max_tokens = max_tokens or self.max_tokens
+        total = estimate_tokens(history)
+        if total <= max_tokens:
+            return history
+
+        history = list(history)
+        protected_from = self._protected_from(history)
+
+        for i in range(protected_from):
+            if total <= max_tokens:
+                return history
+            if is_tool_result_message(history[i]):
+                total += self._elide_message(history, i, protected_from)
+
+        while total > max_tokens:
+            starts = self._turn_starts(history)
+            if len(starts) <= max(self.keep_recent_turns, 1):
+                break
+            dropped, history = history[: starts[1]], history[starts[1] :]
+            total -= estimate_tokens(dropped)
+            total += self._copy_dropped_baselines(dropped, history)
+
+        return history
@@ -0,0 +1,155 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from mcp_repl.chat_compactor import to_jsonable
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+_CLOSE = object()
+
+logger = logging.getLogger(__name__)
+
+
+class ChatLogWriter:
+    """Append-only JSONL event log written by a background thread
+
+    `append` only enqueues the event, so callers on the event loop never
+    wait for disk I/O. The writer thread drains the queue in batches and
+    fsyncs according to the policy:
+
+    - always: after every event
+    - batch: after every batch
+    - never: leave flushing to the OS
+
+    Sinks are called with every written batch on the writer thread, which
+    lets secondary stores follow the log without touching the event loop.
+
+    If the log cannot be written, the error is logged, further events are
+    dropped and close() raises it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync: str = "batch",
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got '{fsync}'")
+
+        self.path = Path(path)
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sinks = []
+        self.error: OSError | None = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name=f"chat-log-{self.path.stem}", daemon=True
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+
+    def append(self, event: Dict[str, Any]):
+        """Queue an event for writing"""
+        if self.error is None:
+            self._queue.put(event)
+
+    def append_message(self, message: Dict[str, Any]):
+        """Queue a chat history message for writing"""
+        self.append({"event": "message", "ts": time.time(), "message": message})
+
+    def close(self):
+        """Write all queued events and stop the writer thread
+
+        Raises:
+            OSError: If writing the log failed
+        """
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _next_batch(self) -> tuple[List[Dict[str, Any]], bool]:
+        batch, closing = [], False
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, closing
+
+        while True:
+            if item is _CLOSE:
+                closing = True
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch, closing
+
+    def _run(self):
+        try:
+            self._write_events()
+        except OSError as e:
+            self.error = e
+            logger.exception(
+                f"Writing chat log {self.path} failed, further events are dropped"
+            )
+
+    def _write_events(self):
+        # Opened on the first event, so a session without any leaves no file
+        f = None
+        try:
+            closing = False
+            while not closing:
+                batch, closing = self._next_batch()
+                if not batch:
+                    continue
+                if f is None:
+                    f = open(self.path, "a")
+                for event in batch:
+                    f.write(json.dumps(event, default=to_jsonable) + "\n")
+                    if self.fsync == "always":
+                        f.flush()
+                        os.fsync(f.fileno())
+                f.flush()
+                if self.fsync == "batch":
+                    os.fsync(f.fileno())
+                for sink in self.sinks:
+                    try:
+                        sink(batch)
+                    except Exception:
+                        logger.exception("Chat log sink failed")
+        finally:
+            if f is not None:
+                f.close()
+
+
+def load_chat_history(path: str) -> List[Dict[str, Any]]:
+    """Load a chat history from a JSONL event log or a legacy JSON file
+
+    Both may be gzip-compressed by the retention policy.
+    """
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt") as f:
+        if path.name.endswith((".json", ".json.gz")):
+            return json.load(f)
+        return [
+            event["message"]
+            for event in map(json.loads, filter(str.strip, f))
+            if event.get("event") == "message"
+        ]
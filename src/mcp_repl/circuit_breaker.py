@@ -0,0 +1,141 @@
+import time
+from collections import deque
+from enum import StrEnum
+from typing import Any, Callable, Dict
+
+from pydantic import BaseModel
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreakerConfig(BaseModel):
+    """Circuit breaker settings of one server, from its config entry"""
+
+    enabled: bool = True
+    # Keep a separate breaker for every tool of the server
+    per_tool: bool = False
+    # Number of recent calls the failure rate is computed over
+    window: int = 20
+    # Calls needed in the window before the breaker can open
+    min_calls: int = 5
+    failure_rate: float = 0.5
+    # Calls slower than this count as failures
+    slow_call_seconds: float | None = 30.0
+    # Also count error results as failures. Off by default, since these are
+    # usually tool-level errors such as a bad query, not a failing server
+    count_error_results: bool = False
+    # How long the breaker stays open before letting a trial call through
+    open_seconds: float = 30.0
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states driven by failure rate and latency
+
+    While closed, the outcome of every call is kept for the last `window`
+    calls; calls that raised, calls slower than slow_call_seconds and, if
+    configured, calls that returned an error count as failures. Once at
+    least min_calls are in the window and the failure rate reaches
+    failure_rate, the breaker opens and calls are refused for open_seconds.
+    After that a single trial call is let through: success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        config: CircuitBreakerConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.config = config or CircuitBreakerConfig()
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.outcomes: deque[bool] = deque(maxlen=self.config.window)
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def failure_count(self) -> int:
+        return sum(1 for ok in self.outcomes if not ok)
+
+    def retry_in(self) -> float:
+        """Seconds until a refused call may be tried again
+
+        For an open breaker, until it lets a trial call through. While a
+        trial is in flight, until the trial has counted as slow at the latest.
+        """
+        if self.state == CircuitState.OPEN:
+            return max(0.0, self.opened_at + self.config.open_seconds - self.clock())
+        if self.state == CircuitState.HALF_OPEN and self.trial_in_flight:
+            limit = self.config.slow_call_seconds or self.config.open_seconds
+            return max(1.0, self.trial_started_at + limit - self.clock())
+        return 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go to the server now"""
+        if self.state == CircuitState.OPEN and self.retry_in() == 0.0:
+            self.state = CircuitState.HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == CircuitState.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            self.trial_started_at = self.clock()
+            return True
+        if self.state == CircuitState.CLOSED:
+            return True
+        self.rejected += 1
+        return False
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self.opened_at = self.clock()
+        self.times_opened += 1
+
+    def record(self, seconds: float, failed: bool):
+        slow = self.config.slow_call_seconds
+        ok = not failed and (slow is None or seconds < slow)
+
+        if self.state == CircuitState.HALF_OPEN:
+            self.trial_in_flight = False
+            if ok:
+                self.state = CircuitState.CLOSED
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+
+        self.outcomes.append(ok)
+        if (
+            self.state == CircuitState.CLOSED
+            and len(self.outcomes) >= self.config.min_calls
+            and self.failure_count() / len(self.outcomes) >= self.config.failure_rate
+        ):
+            self._open()
+
+    def release(self):
+        """Forget a call that ended without an outcome, e.g. cancelled"""
+        if self.state == CircuitState.HALF_OPEN:
+            self.trial_in_flight = False
+
+    def describe(self) -> str:
+        """Short state summary for display"""
+        if self.state == CircuitState.OPEN:
+            return f"{self.state} (retry in {self.retry_in():.0f}s)"
+        if self.state == CircuitState.HALF_OPEN:
+            return str(self.state)
+        if self.outcomes:
+            return f"{self.state} ({self.failure_count()}/{len(self.outcomes)} failed)"
+        return str(self.state)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "state": str(self.state),
+            "failures": self.failure_count(),
+            "calls": len(self.outcomes),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in": self.retry_in(),
+        }
@@ -0,0 +1,495 @@
+import asyncio
+import getpass
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+from mcp.types import CallToolResult, Tool
+
+from mcp_repl.loop_monitor import LoopLagMonitor
+from mcp_repl.mcp_orchestrator import MCPOrchestrator, MCPServerConfig
+from mcp_repl.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+
+def default_socket_path() -> str:
+    """Per-user socket path, in $XDG_RUNTIME_DIR or a private temp directory"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(
+        tempfile.gettempdir(), f"mcp-repl-{os.getuid()}"
+    )
+    return os.path.join(runtime_dir, "mcp-repl.sock")
+
+
+DEFAULT_SOCKET_PATH = default_socket_path()
+
+# Tool results can be large; allow long protocol lines
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+async def read_line(reader: asyncio.StreamReader) -> bytes | None:
+    """Next line of a protocol stream, b"" at the end of the stream
+
+    A line longer than the stream's limit is read to its end and dropped,
+    and None is returned, so one oversized message does not end the
+    connection.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError:
+        pass
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+        except asyncio.IncompleteReadError:
+            return b""
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """Protocol line of a message, refused when the peer could not read it"""
+    line = json.dumps(message).encode() + b"\n"
+    if len(line) > STREAM_LIMIT:
+        raise ValueError(
+            f"Message of {len(line)} bytes exceeds the daemon protocol limit "
+            f"of {STREAM_LIMIT} bytes"
+        )
+    return line
+
+
+class FairScheduler:
+    """Runs submitted work with bounded concurrency, round-robin across clients
+
+    Each client has its own FIFO queue. Workers take the next job from the
+    next client in turn, so a client submitting many slow calls cannot
+    starve the others.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max_concurrency
+        self._queues: Dict[str, deque] = {}
+        self._ready = deque()
+        self._has_work = asyncio.Event()
+        self._workers = []
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    def pending(self, client_id: str) -> int:
+        return len(self._queues.get(client_id, ()))
+
+    async def submit(self, client_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Queue work for a client and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client_id, deque()).append((fn, future))
+        if client_id not in self._ready:
+            self._ready.append(client_id)
+        self._has_work.set()
+        return await future
+
+    async def _worker(self):
+        while True:
+            while not self._ready:
+                self._has_work.clear()
+                await self._has_work.wait()
+
+            client_id = self._ready.popleft()
+            queue = self._queues[client_id]
+            fn, future = queue.popleft()
+            if queue:
+                self._ready.append(client_id)
+            else:
+                del self._queues[client_id]
+
+            if future.cancelled():
+                continue
+            try:
+                result = await fn()
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+
+class ClientStats:
+    """Per-client request statistics kept by the daemon"""
+
+    def __init__(self):
+        self.connected_at = time.time()
+        self.calls = 0
+        self.errors = 0
+        self.latency = LatencyStats()
+        self.queue_wait = LatencyStats()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "connected_at": self.connected_at,
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency": self.latency.summary(),
+            "queue_wait": self.queue_wait.summary(),
+        }
+
+
+class OrchestratorDaemon:
+    """Serves one MCPOrchestrator to many REPL clients over a Unix socket
+
+    The protocol is newline-delimited JSON. Requests are
+    `{"id": ..., "op": ..., "params": {...}}` and responses carry the same id
+    with either a `result` or an `error`. Supported ops are `hello`,
+    `list_servers`, `call_tool` and `stats`.
+    """
+
+    def __init__(
+        self,
+        orchestrator: MCPOrchestrator,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        max_concurrency: int = 8,
+        socket_mode: int = 0o660,
+        loop_lag_threshold: float | None = 0.1,
+    ):
+        self.orchestrator = orchestrator
+        self.socket_path = socket_path
+        self.socket_mode = socket_mode
+        self.scheduler = FairScheduler(max_concurrency)
+        self.clients: Dict[str, ClientStats] = {}
+        self._client_ids = itertools.count(1)
+        self._server = None
+        self.loop_monitor = (
+            LoopLagMonitor(threshold=loop_lag_threshold) if loop_lag_threshold else None
+        )
+
+    async def start(self):
+        """Listen on the socket, replacing a stale one left by a dead daemon
+
+        Raises:
+            ValueError: If another daemon is answering on the socket
+        """
+        if os.path.exists(self.socket_path):
+            try:
+                _, writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                writer.close()
+                raise ValueError(
+                    f"Another daemon is already listening on {self.socket_path}"
+                )
+        os.makedirs(os.path.dirname(self.socket_path) or ".", mode=0o700, exist_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._handle_client, path=self.socket_path, limit=STREAM_LIMIT
+        )
+        os.chmod(self.socket_path, self.socket_mode)
+        self.scheduler.start()
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        logger.info(f"MCP orchestrator daemon listening on {self.socket_path}")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.scheduler.stop()
+        if self.loop_monitor is not None:
+            await self.loop_monitor.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def stats(self) -> Dict[str, Any]:
+        summary = {
+            "max_concurrency": self.scheduler.max_concurrency,
+            "clients": {
+                client_id: {
+                    **stats.summary(),
+                    "pending": self.scheduler.pending(client_id),
+                }
+                for client_id, stats in self.clients.items()
+            },
+        }
+        if self.loop_monitor is not None:
+            summary["event_loop"] = self.loop_monitor.summary()
+        return summary
+
+    async def _handle_client(self, reader, writer):
+        client_id = f"client-{next(self._client_ids)}"
+        self.clients[client_id] = ClientStats()
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(line):
+            async with write_lock:
+                writer.write(line)
+                await writer.drain()
+
+        async def respond(request):
+            try:
+                result = await self._dispatch(client_id, request)
+                line = encode_message({"id": request.get("id"), "result": result})
+            except Exception as e:
+                line = encode_message({"id": request.get("id"), "error": str(e)})
+            await send(line)
+
+        try:
+            while (line := await read_line(reader)) != b"":
+                if line is None:
+                    # The request id is lost with the line; the client
+                    # checks the size of its requests before sending them
+                    logger.warning(f"Client {client_id} sent an oversized request")
+                    error = {"id": None, "error": "Request exceeds the size limit"}
+                    await send(encode_message(error))
+                    continue
+                request = json.loads(line)
+                if not isinstance(request, dict) or not isinstance(
+                    request.get("params", {}), dict
+                ):
+                    error = {"id": None, "error": "Request must be a JSON object"}
+                    await send(encode_message(error))
+                    continue
+                if request.get("op") == "hello":
+                    name = request.get("params", {}).get("name")
+                    if name:
+                        new_id = f"{name}#{client_id.split('-')[1]}"
+                        self.clients[new_id] = self.clients.pop(client_id)
+                        client_id = new_id
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"Dropping client {client_id}: {e}")
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            stats = self.clients.pop(client_id)
+            logger.info(f"Client {client_id} disconnected: {stats.summary()}")
+            writer.close()
+
+    async def _dispatch(self, client_id: str, request: Dict[str, Any]) -> Any:
+        op = request.get("op")
+        params = request.get("params", {})
+
+        if op == "hello":
+            return {"client_id": client_id}
+
+        if op == "list_servers":
+            return [
+                {
+                    "server_id": server_id,
+                    "server_path": server_data["server_path"],
+                    "tools": [tool.model_dump() for tool in server_data["tools"]],
+                    "read_only_tools": self.orchestrator.read_only_patterns.get(
+                        server_id, []
+                    ),
+                    "circuit": self.orchestrator.circuit_status(server_id),
+                }
+                for server_id, server_data in self.orchestrator.sessions.items()
+            ]
+
+        if op == "stats":
+            return self.stats()
+
+        if op == "call_tool":
+            stats = self.clients[client_id]
+            enqueued = time.perf_counter()
+
+            async def call():
+                started = time.perf_counter()
+                stats.queue_wait.record(started - enqueued)
+                try:
+                    return await self.orchestrator.call_tool(
+                        params["tool"], params.get("arguments") or {}
+                    )
+                finally:
+                    stats.latency.record(time.perf_counter() - started)
+
+            stats.calls += 1
+            try:
+                result = await self.scheduler.submit(client_id, call)
+            except Exception:
+                stats.errors += 1
+                raise
+            if result.isError:
+                stats.errors += 1
+            return result.model_dump()
+
+        raise ValueError(f"Unknown op '{op}'")
+
+
+class DaemonClient:
+    """Connection to an OrchestratorDaemon supporting concurrent requests"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            self.socket_path, limit=STREAM_LIMIT
+        )
+        self._reader_task = asyncio.create_task(self._read_responses())
+        await self.request("hello", name=f"{getpass.getuser()}@{os.getpid()}")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    async def _read_responses(self):
+        try:
+            while (line := await read_line(self._reader)) != b"":
+                if line is None:
+                    logger.warning("Dropped an oversized response from the daemon")
+                    continue
+                response = json.loads(line)
+                future = self._pending.pop(response.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(ValueError(response["error"]))
+                else:
+                    future.set_result(response.get("result"))
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Daemon connection closed"))
+            self._pending.clear()
+
+    async def request(self, op: str, **params) -> Any:
+        request_id = next(self._ids)
+        line = encode_message({"id": request_id, "op": op, "params": params})
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self._writer.write(line)
+        await self._writer.drain()
+        return await future
+
+
+class _RemoteSession:
+    """Stands in for a ClientSession of a server hosted by the daemon"""
+
+    def __init__(self, client: DaemonClient, server_id: str):
+        self.client = client
+        self.server_id = server_id
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        result = await self.client.request(
+            "call_tool", tool=f"{self.server_id}_{name}", arguments=arguments
+        )
+        return CallToolResult.model_validate(result)
+
+
+class RemoteOrchestrator(MCPOrchestrator):
+    """MCPOrchestrator whose servers live in a shared daemon
+
+    Tool catalog, selection and built-in tools work as for a local
+    orchestrator; server tool calls are forwarded to the daemon. Circuit
+    breakers are the daemon's, so none are kept here.
+    """
+
+    def __init__(self, client: DaemonClient):
+        super().__init__()
+        self.client = client
+        # Circuit breaker state of each server, as of the last refresh
+        self.circuits: Dict[str, str] = {}
+
+    @classmethod
+    async def attach(
+        cls, socket_path: str = DEFAULT_SOCKET_PATH
+    ) -> "RemoteOrchestrator":
+        """Connect to a running daemon and load its tool catalog"""
+        client = DaemonClient(socket_path)
+        await client.connect()
+        orchestrator = cls(client)
+        await orchestrator.refresh()
+        return orchestrator
+
+    async def refresh(self):
+        """Reload the list of servers and tools from the daemon"""
+        servers = await self.client.request("list_servers")
+        self.read_only_patterns = {
+            server["server_id"]: server.get("read_only_tools", []) for server in servers
+        }
+        self.circuits = {
+            server["server_id"]: server.get("circuit", "unknown") for server in servers
+        }
+        self.sessions = {
+            server["server_id"]: {
+                "session": _RemoteSession(self.client, server["server_id"]),
+                "tools": [Tool.model_validate(tool) for tool in server["tools"]],
+                "server_info": None,
+                "server_id": server["server_id"],
+                "server_path": server["server_path"],
+            }
+            for server in servers
+        }
+        self._update_available_tools()
+
+    def breaker_for(self, server_id: str, tool_name: str) -> None:
+        return None
+
+    def circuit_status(self, server_id: str) -> str:
+        return self.circuits.get(server_id, "unknown")
+
+    async def daemon_stats(self) -> Dict[str, Any]:
+        return await self.client.request("stats")
+
+    async def add_server(self, server_config: MCPServerConfig):
+        raise ValueError("Servers are managed by the daemon and cannot be added here")
+
+    async def remove_server(self, server_id: str):
+        raise ValueError("Servers are managed by the daemon and cannot be removed here")
+
+    async def cleanup(self):
+        await self.client.close()
+        await super().cleanup()
+
+
+async def run_daemon(
+    config_path: str,
+    socket_path: str = DEFAULT_SOCKET_PATH,
+    max_concurrency: int = 8,
+    loop_lag_threshold: float | None = 0.1,
+):
+    """Start the servers from a config file and serve them until cancelled"""
+    orchestrator = await MCPOrchestrator.from_config(config_path)
+    daemon = OrchestratorDaemon(
+        orchestrator,
+        socket_path,
+        max_concurrency,
+        loop_lag_threshold=loop_lag_threshold,
+    )
+    try:
+        await daemon.serve_forever()
+    finally:
+        await orchestrator.cleanup()
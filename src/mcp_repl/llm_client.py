@@ -1,16 +1,57 @@
-from anthropic import Anthropic
+from mcp_repl.chat_compactor import ChatHistoryCompactor
+from mcp_repl.llm_providers import AnthropicProvider, ProviderChain
+from mcp_repl.model_router import ModelRouter
+from mcp_repl.result_delta import ResultDeltaEncoder
+from mcp_repl.result_store import ResultStore
+from mcp_repl.usage import UsageTracker
 
 
 class LLMClient:
     """Handles interactions with the LLM"""
 
-    def __init__(self):
-        self.anthropic = Anthropic()
+    def __init__(
+        self,
+        compactor: ChatHistoryCompactor | None = None,
+        result_store: ResultStore | None = None,
+        usage_tracker: UsageTracker | None = None,
+        providers: ProviderChain | None = None,
+        max_tokens: int = 1000,
+        delta_encoder: ResultDeltaEncoder | None = None,
+        router: ModelRouter | None = None,
+    ):
+        self.providers = providers or ProviderChain([AnthropicProvider()])
+        self.max_tokens = max_tokens
         self.chat_history = []
+        self.compactor = compactor or ChatHistoryCompactor()
+        self.result_store = result_store
+        self.usage_tracker = usage_tracker or UsageTracker()
+        self.delta_encoder = delta_encoder
+        # Routes steps between a fast and a large model; its large tier is
+        # the providers chain
+        self.router = router
+        # Callables notified with every message appended to the chat history
+        self.message_listeners = []
+
+    def _append_message(self, message):
+        """Append a message to the chat history and notify listeners"""
+        self.chat_history.append(message)
+        for listener in self.message_listeners:
+            listener(message)
+
+    def compact_history(self):
+        """Shrink the chat history to the compactor's token budget
+
+        Once the session is over its soft token budget the history is
+        compacted to half the usual budget to slow down further spending.
+        """
+        max_tokens = self.compactor.max_tokens
+        if self.usage_tracker.over_soft_budget():
+            max_tokens //= 2
+        self.chat_history = self.compactor.compact(self.chat_history, max_tokens)
 
     async def add_user_message(self, query: str):
         """Add a user message to the chat history"""
-        self.chat_history.append({"role": "user", "content": query})
+        self._append_message({"role": "user", "content": query})
 
     async def get_llm_response(self, available_tools=None):
         """Get a response from the LLM based on the current chat history"""
@@ -22,32 +63,92 @@ class LLMClient:
 
 When asked to write code or perform general tasks unrelated to the available tools, you should do so directly. Only use the provided tools when they are specifically relevant to the user's request."""
 
-        response = self.anthropic.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            system=system_prompt,
-            messages=self.chat_history,
-            tools=available_tools if available_tools else [],
-            max_tokens=1000,
-        )
+        self.usage_tracker.check_hard_budget()
+        self.compact_history()
+
+        request = {
+            "system": system_prompt,
+            "messages": self.chat_history,
+            "tools": available_tools if available_tools else [],
+            "max_tokens": self.max_tokens,
+        }
+        if self.router is None:
+            response = await self.providers.create(**request)
+            responses = [response]
+        else:
+            response, responses = await self.router.create(**request)
+        for paid in responses:
+            self.usage_tracker.record(
+                paid.usage, available_tools or [], self.chat_history, paid.model
+            )
 
         return response
 
+    def used_tool_names(self):
+        """Names of the tools called so far in the conversation"""
+        names = set()
+        for message in self.chat_history:
+            if message["role"] != "assistant" or isinstance(message["content"], str):
+                continue
+            for block in message["content"]:
+                if getattr(block, "type", None) == "tool_use":
+                    names.add(block.name)
+                elif isinstance(block, dict) and block.get("type") == "tool_use":
+                    names.add(block["name"])
+        return names
+
+    def find_tool_use(self, tool_use_id):
+        """The tool_use block with the given id, most recent first"""
+        for message in reversed(self.chat_history):
+            if message["role"] != "assistant" or isinstance(message["content"], str):
+                continue
+            for block in message["content"]:
+                if getattr(block, "type", None) == "tool_use":
+                    if block.id == tool_use_id:
+                        return block.name, block.input
+                elif isinstance(block, dict) and block.get("type") == "tool_use":
+                    if block["id"] == tool_use_id:
+                        return block["name"], block["input"]
+        return None
+
     async def add_assistant_message(self, content):
         """Add an assistant message to the chat history"""
         assistant_message = {"role": "assistant", "content": content}
-        self.chat_history.append(assistant_message)
+        self._append_message(assistant_message)
         return assistant_message
 
     async def add_tool_result(self, tool_use_id, result):
-        """Add a tool result to the chat history"""
+        """Add a tool result to the chat history
+
+        A repeat of an earlier call is sent as a diff against that call's
+        result, when a delta encoder is set. Results larger than the result
+        store threshold are replaced with a preview and a handle to the
+        stored copy; they are never sent as deltas, so the stored copy is
+        always the full result.
+        """
+        content = result.content
+        spilled = self.result_store is not None and self.result_store.oversized(content)
+        if (
+            self.delta_encoder is not None
+            and not spilled
+            and not getattr(result, "isError", False)
+        ):
+            tool_use = self.find_tool_use(tool_use_id)
+            if tool_use is not None:
+                content = self.delta_encoder.encode(
+                    self.chat_history, tool_use_id, *tool_use, content
+                )
+        if self.result_store is not None:
+            content = self.result_store.spill(content)
+
         tool_result_message = {
             "role": "user",
             "content": [
                 {
                     "type": "tool_result",
                     "tool_use_id": tool_use_id,
-                    "content": result.content,
+                    "content": content,
                 }
             ],
         }
-        self.chat_history.append(tool_result_message)
+        self._append_message(tool_result_message)
@@ -0,0 +1,402 @@
+import abc
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Dict, List
+
+import anthropic
+import openai
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+from mcp_repl.chat_compactor import content_to_text, estimate_tokens
+from mcp_repl.metrics import LatencyStats
+from mcp_repl.rate_limit import RateLimiter, backoff_delay, retry_after
+from mcp_repl.schema_validator import UNPARSED_ARGUMENTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODELS = {
+    "anthropic": "claude-3-5-sonnet-20241022",
+    "openai": "gpt-4o",
+}
+
+# HTTP statuses worth retrying on another provider: rate limits, server
+# errors and Anthropic's 529 overloaded
+OVERLOAD_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+OPENAI_STOP_REASONS = {
+    "stop": "end_turn",
+    "tool_calls": "tool_use",
+    "length": "max_tokens",
+}
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Whether a provider error is transient and a fallback should be tried"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # Connection errors include the SDKs' own timeout errors
+    if isinstance(error, (anthropic.APIConnectionError, openai.APIConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code in OVERLOAD_STATUS_CODES
+
+
+class LLMProvider(abc.ABC):
+    """A chat model behind a provider API
+
+    Requests and responses use the Anthropic messages format, which is also
+    the format of the chat history; providers with another API translate
+    both ways.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str | None = None, timeout: float = 60.0):
+        self.model = model or DEFAULT_MODELS[self.name]
+        self.timeout = timeout
+        self.latency = LatencyStats()
+        self.errors = 0
+        self.limiter: RateLimiter | None = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    @abc.abstractmethod
+    async def create(
+        self,
+        system: str,
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        max_tokens: int,
+    ) -> Message:
+        """Send a request and return the response in the Anthropic format"""
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def __init__(
+        self,
+        model: str | None = None,
+        timeout: float = 60.0,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ):
+        super().__init__(model, timeout)
+        # Retries are left to the fallback chain
+        self.client = anthropic.AsyncAnthropic(
+            base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0
+        )
+
+    async def create(self, system, messages, tools, max_tokens) -> Message:
+        return await self.client.messages.create(
+            model=self.model,
+            system=system,
+            messages=messages,
+            tools=tools,
+            max_tokens=max_tokens,
+        )
+
+
+def block_field(block: Any, name: str) -> Any:
+    """Field of a content block stored either as an SDK object or a dict"""
+    if isinstance(block, dict):
+        return block.get(name)
+    return getattr(block, name, None)
+
+
+def to_openai_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert catalog entries to OpenAI function tools"""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool["name"],
+                "description": tool.get("description") or "",
+                "parameters": tool["input_schema"],
+            },
+        }
+        for tool in tools
+    ]
+
+
+def to_openai_messages(
+    system: str, messages: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Convert an Anthropic-format chat history to OpenAI chat messages
+
+    Assistant tool_use blocks become tool_calls and each tool_result block
+    becomes a separate `tool` message.
+    """
+    converted = [{"role": "system", "content": system}]
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            converted.append({"role": message["role"], "content": content})
+            continue
+
+        texts = []
+        tool_calls = []
+        for block in content:
+            block_type = block_field(block, "type")
+            if block_type == "text":
+                texts.append(block_field(block, "text"))
+            elif block_type == "tool_use":
+                tool_calls.append(
+                    {
+                        "id": block_field(block, "id"),
+                        "type": "function",
+                        "function": {
+                            "name": block_field(block, "name"),
+                            "arguments": json.dumps(block_field(block, "input")),
+                        },
+                    }
+                )
+            elif block_type == "tool_result":
+                converted.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": block_field(block, "tool_use_id"),
+                        "content": content_to_text(block_field(block, "content")),
+                    }
+                )
+
+        if message["role"] == "assistant":
+            assistant = {"role": "assistant", "content": "\n".join(texts) or None}
+            if tool_calls:
+                assistant["tool_calls"] = tool_calls
+            converted.append(assistant)
+        elif texts:
+            converted.append({"role": "user", "content": "\n".join(texts)})
+    return converted
+
+
+def parse_tool_arguments(arguments: str | None) -> Dict[str, Any]:
+    """Decode OpenAI tool call arguments
+
+    Models occasionally emit malformed JSON; the raw text is then kept
+    under UNPARSED_ARGUMENTS so the call fails with an error result the
+    model can correct, rather than failing the whole response.
+    """
+    try:
+        parsed = json.loads(arguments or "{}")
+    except json.JSONDecodeError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        logger.warning(f"Tool call arguments are not a JSON object: {arguments!r}")
+        return {UNPARSED_ARGUMENTS: arguments}
+    return parsed
+
+
+def from_openai_response(response: Any) -> Message:
+    """Convert an OpenAI chat completion to an Anthropic Message"""
+    choice = response.choices[0]
+    content = []
+    if choice.message.content:
+        content.append(TextBlock(type="text", text=choice.message.content))
+    for tool_call in choice.message.tool_calls or []:
+        content.append(
+            ToolUseBlock(
+                type="tool_use",
+                id=tool_call.id,
+                name=tool_call.function.name,
+                input=parse_tool_arguments(tool_call.function.arguments),
+            )
+        )
+    usage = response.usage
+    return Message(
+        id=response.id or f"msg_{uuid.uuid4().hex}",
+        type="message",
+        role="assistant",
+        model=response.model,
+        content=content,
+        stop_reason=OPENAI_STOP_REASONS.get(choice.finish_reason, "end_turn"),
+        usage=Usage(
+            input_tokens=usage.prompt_tokens if usage else 0,
+            output_tokens=usage.completion_tokens if usage else 0,
+        ),
+    )
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(
+        self,
+        model: str | None = None,
+        timeout: float = 60.0,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ):
+        super().__init__(model, timeout)
+        self.client = openai.AsyncOpenAI(
+            base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0
+        )
+
+    async def create(self, system, messages, tools, max_tokens) -> Message:
+        request = {
+            "model": self.model,
+            "messages": to_openai_messages(system, messages),
+            "max_tokens": max_tokens,
+        }
+        if tools:
+            request["tools"] = to_openai_tools(tools)
+        response = await self.client.chat.completions.create(**request)
+        return from_openai_response(response)
+
+
+PROVIDERS = {
+    AnthropicProvider.name: AnthropicProvider,
+    OpenAIProvider.name: OpenAIProvider,
+}
+
+
+def provider_from_spec(spec: str, timeout: float = 60.0, **kwargs) -> LLMProvider:
+    """Create a provider from `provider` or `provider:model`"""
+    name, _, model = spec.partition(":")
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Unknown LLM provider '{name}', expected one of: {', '.join(PROVIDERS)}"
+        )
+    try:
+        return PROVIDERS[name](model or None, timeout, **kwargs)
+    except openai.OpenAIError as e:
+        # Raised for a missing API key
+        raise ValueError(f"Cannot use LLM provider '{name}': {e}") from e
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """Tokens a request may use: estimated input plus the output limit"""
+    return (
+        estimate_tokens(request["system"])
+        + estimate_tokens(request["messages"])
+        + estimate_tokens(request["tools"])
+        + request["max_tokens"]
+    )
+
+
+class ProviderChain:
+    """Sends each request to the first healthy provider of an ordered list
+
+    A provider that fails with an overload error, or times out, is followed
+    by the next one. With a latency SLO, a provider that has not answered
+    within the SLO is hedged: the next provider is started as well and the
+    first response wins. When the last provider tried answers with an
+    overload status, the whole chain is retried up to max_retries times
+    with jittered exponential backoff, waiting at least as long as the
+    provider's retry-after header asks.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        latency_slo: float | None = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+    ):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = providers
+        self.latency_slo = latency_slo
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.fallbacks = 0
+        self.retries = 0
+        self.last_provider: LLMProvider | None = None
+
+    async def _call(self, provider: LLMProvider, request: Dict[str, Any]) -> Message:
+        limiter = provider.limiter
+        estimated = estimate_request_tokens(request) if limiter else 0
+        async with limiter.slot(estimated) if limiter else nullcontext():
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    provider.create(**request), provider.timeout
+                )
+            except Exception as e:
+                provider.errors += 1
+                provider.latency.record(time.perf_counter() - started)
+                if limiter:
+                    limiter.on_error(e)
+                raise
+            provider.latency.record(time.perf_counter() - started)
+        if limiter:
+            limiter.on_success()
+            usage = response.usage
+            limiter.settle(estimated, usage.input_tokens + usage.output_tokens)
+        return response
+
+    async def create(self, **request) -> Message:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._create_once(request)
+            except Exception as e:
+                # Timeouts are not retried; they already took a long time
+                status_code = getattr(e, "status_code", None)
+                if (
+                    status_code not in OVERLOAD_STATUS_CODES
+                    or attempt == self.max_retries
+                ):
+                    raise
+                delay = backoff_delay(
+                    attempt, self.backoff_base, self.backoff_cap, retry_after(e)
+                )
+                logger.warning(
+                    f"All LLM providers overloaded, retrying in {delay:.1f}s "
+                    f"({attempt + 1}/{self.max_retries})"
+                )
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    async def _create_once(self, request: Dict[str, Any]) -> Message:
+        remaining = list(self.providers)
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        last_error = None
+
+        def launch():
+            provider = remaining.pop(0)
+            pending[asyncio.create_task(self._call(provider, request))] = provider
+
+        launch()
+        try:
+            while pending:
+                hedge_after = self.latency_slo if remaining else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    logger.warning(
+                        f"No response within {self.latency_slo}s latency SLO, "
+                        f"also trying {remaining[0].label}"
+                    )
+                    self.fallbacks += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        if not is_overload_error(e):
+                            raise
+                        logger.warning(f"{provider.label} failed: {e!r}")
+                        last_error = e
+                    else:
+                        self.last_provider = provider
+                        return response
+
+                if not pending and remaining:
+                    self.fallbacks += 1
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
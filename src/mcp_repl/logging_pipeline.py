@@ -0,0 +1,218 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.Handler | None = None
+_filter: "SamplingFilter | None" = None
+_lock = threading.Lock()
+
+
+def dumps(value) -> str:
+    """Serialize a log record dict, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return json.dumps(value, default=str)
+
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per line with time, level, logger and message"""
+
+    def format(self, record):
+        log_record = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            log_record["exc"] = self.formatException(record.exc_info)
+        return dumps(log_record)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock handler formats the record, including any traceback, on the
+    logging thread. Only the message is interpolated here so later changes
+    to the arguments cannot affect it.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _most_specific(name: str, values: Dict[str, float]) -> str | None:
+    """Configured logger name that is the closest ancestor of name"""
+    while True:
+        if name in values:
+            return name
+        if "." not in name:
+            return "" if "" in values else None
+        name = name.rsplit(".", 1)[0]
+
+
+class SamplingFilter(logging.Filter):
+    """Per-logger sampling and rate limiting
+
+    sample_rates keeps that fraction of a logger's records below WARNING;
+    rate_limits caps a logger at that many records per second at any level.
+    Settings apply to the named logger and its children, and the empty name
+    configures the root. Dropped records are counted per logger. Records
+    are filtered on whichever thread logs them, so the counters and buckets
+    are guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        sample_rates: Dict[str, float] | None = None,
+        rate_limits: Dict[str, float] | None = None,
+    ):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        # Token buckets per configured logger: (tokens, last refill time)
+        self._buckets: Dict[str, tuple[float, float]] = {}
+        self.dropped = Counter()
+        self._lock = threading.Lock()
+
+    def dropped_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.dropped)
+
+    def filter(self, record):
+        with self._lock:
+            return self._keep(record)
+
+    def _keep(self, record) -> bool:
+        if record.levelno < logging.WARNING:
+            key = _most_specific(record.name, self.sample_rates)
+            if key is not None and random.random() >= self.sample_rates[key]:
+                self.dropped[record.name] += 1
+                return False
+
+        key = _most_specific(record.name, self.rate_limits)
+        if key is not None:
+            rate = self.rate_limits[key]
+            now = time.monotonic()
+            tokens, last = self._buckets.get(key, (max(rate, 1.0), now))
+            tokens = min(max(rate, 1.0), tokens + (now - last) * rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                self.dropped[record.name] += 1
+                return False
+            self._buckets[key] = (tokens - 1.0, now)
+        return True
+
+
+def parse_logger_values(specs: Iterable[str]) -> Dict[str, float]:
+    """Parse `logger=value` command line settings"""
+    values = {}
+    for spec in specs:
+        name, sep, value = spec.rpartition("=")
+        try:
+            if not sep:
+                raise ValueError
+            values[name] = float(value)
+        except ValueError:
+            raise ValueError(f"Expected LOGGER=NUMBER, got '{spec}'") from None
+    return values
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    log_file: str | None = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    sample_rates: Dict[str, float] | None = None,
+    rate_limits: Dict[str, float] | None = None,
+) -> logging.Logger:
+    """Route all logging through a queue to a background listener thread
+
+    The root logger gets a single non-blocking QueueHandler; the listener
+    writes JSON lines to stderr and, optionally, to a rotating file. Calling
+    it again replaces the previous configuration.
+    """
+    global _listener, _queue_handler, _filter
+
+    formatter = JSONLogFormatter()
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(
+            logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    sampling_filter = SamplingFilter(sample_rates, rate_limits)
+    queue_handler.addFilter(sampling_filter)
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+
+        logger = logging.getLogger()
+        logger.setLevel(level)
+        for existing in logger.handlers[:]:
+            logger.removeHandler(existing)
+        logger.addHandler(queue_handler)
+
+        _queue_handler = queue_handler
+        _filter = sampling_filter
+        _listener = logging.handlers.QueueListener(
+            queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread
+
+    The root logger's queue handler is replaced by a direct JSON stderr
+    handler, so records logged afterwards are not queued for nobody.
+    """
+    global _listener, _queue_handler
+    dropped = _filter.dropped_counts() if _filter is not None else {}
+    if dropped:
+        logging.getLogger(__name__).warning(f"Dropped log records by logger: {dropped}")
+    with _lock:
+        if _listener is None:
+            return
+        logger = logging.getLogger()
+        if _queue_handler in logger.handlers:
+            logger.removeHandler(_queue_handler)
+            fallback = logging.StreamHandler(sys.stderr)
+            fallback.setFormatter(JSONLogFormatter())
+            logger.addHandler(fallback)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
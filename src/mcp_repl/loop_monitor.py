@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict
+
+from mcp_repl.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs callbacks, and what blocked it
+
+    A heartbeat task sleeps for `interval` and records how much later than
+    that it woke up, which is the scheduling delay every other task sees as
+    well. A watchdog thread notices when the heartbeat is overdue by more
+    than `threshold` and captures the loop thread's stack while it is still
+    blocked, so the report names the blocking call rather than whatever
+    coroutine runs next.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        max_events: int = 20,
+        stack_depth: int = 12,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.lag = LatencyStats()
+        self.events = deque(maxlen=max_events)
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self._due = None
+        self._captured = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._due = None
+        self._thread.join()
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._due = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - self._due)
+            self._due = None
+            event, self._captured = self._captured, None
+            self.lag.record(lag)
+            if lag < self.threshold:
+                continue
+            self.blocked += 1
+            self.blocked_seconds += lag
+            if event is not None:
+                event["blocked_ms"] = 1000 * lag
+                logger.warning(
+                    f"Event loop blocked for {1000 * lag:.0f}ms in {event['frame']}\n"
+                    + "".join(event["stack"])
+                )
+            else:
+                logger.warning(f"Event loop blocked for {1000 * lag:.0f}ms")
+
+    def _watch(self):
+        while not self._stopping.wait(self.threshold / 4):
+            due = self._due
+            if due is None or self._captured is not None:
+                continue
+            if time.perf_counter() - due < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=self.stack_depth)
+            del frame
+            innermost = stack[-1]
+            # The heartbeat resumed just now: the loop is no longer blocked
+            if innermost.name == self._heartbeat.__name__:
+                continue
+            self._captured = {
+                "time": time.time(),
+                "frame": f"{innermost.filename}:{innermost.lineno} in {innermost.name}",
+                "stack": stack.format(),
+                "blocked_ms": None,
+            }
+            self.events.append(self._captured)
+
+    def summary(self) -> Dict[str, Any]:
+        """Lag percentiles, time spent blocked and the recent blocking calls"""
+        return {
+            **self.lag.summary(),
+            "threshold_ms": 1000 * self.threshold,
+            "blocked": self.blocked,
+            "blocked_s": self.blocked_seconds,
+            "events": list(self.events),
+        }
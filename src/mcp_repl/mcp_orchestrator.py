@@ -1,20 +1,61 @@
+import fnmatch
 import json
 import logging
+import time
+from collections import Counter
 from contextlib import AsyncExitStack
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List
 
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp.client.stdio import get_default_environment, stdio_client
+from mcp.types import CallToolResult, TextContent, Tool
 from pydantic import BaseModel
 
+from mcp_repl.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitState,
+)
+from mcp_repl.payload_channel import PayloadChannel
+from mcp_repl.result_store import ResultStore
+from mcp_repl.schema_validator import UNPARSED_ARGUMENTS, compile_validator
+from mcp_repl.streaming import ProgressCallback, StreamingClientSession
+from mcp_repl.tool_catalog import catalog_report, compile_tool
+from mcp_repl.tool_index import ToolIndex
+
 logger = logging.getLogger(__name__)
 
+BUILTIN_SERVER_ID = "repl"
+
+READ_RESULT_TOOL = Tool(
+    name="read_result",
+    description=(
+        "Page through or grep a tool result that was too large to include in the "
+        "conversation and was stored with a handle."
+    ),
+    inputSchema={
+        "type": "object",
+        "properties": {
+            "handle": {"type": "string"},
+            "offset": {"type": "integer", "default": 0},
+            "limit": {"type": "integer", "default": 200},
+            "pattern": {"type": "string"},
+        },
+        "required": ["handle"],
+    },
+)
+
 
 class MCPServerConfig(BaseModel):
     """Represents an MCP server"""
+
     id: str
     path: str
+    # Glob patterns of tools without side effects, in addition to tools the
+    # server itself annotates with readOnlyHint
+    read_only_tools: List[str] = []
+    circuit_breaker: CircuitBreakerConfig = CircuitBreakerConfig()
 
 
 class MCPOrchestrator:
@@ -25,6 +66,20 @@ class MCPOrchestrator:
         self.available_tools = []
         self.sessions = {}
         self.exit_stack = AsyncExitStack()
+        self.builtin_tools = [READ_RESULT_TOOL]
+        self.result_store = ResultStore(
+            tool_name=f"{BUILTIN_SERVER_ID}_{READ_RESULT_TOOL.name}"
+        )
+        self.tool_index = ToolIndex([])
+        self.tool_top_k = None
+        self.pinned_servers = set()
+        self.read_only_patterns: Dict[str, List[str]] = {}
+        self.validators = {}
+        self.payload_channel = PayloadChannel()
+        self.calls_in_flight: Counter = Counter()
+        self.breaker_configs: Dict[str, CircuitBreakerConfig] = {}
+        # Keyed by server id, or by (server id, tool) for per-tool breakers
+        self.breakers: Dict[Any, CircuitBreaker] = {}
 
     @classmethod
     async def from_server_configs(
@@ -33,6 +88,7 @@ class MCPOrchestrator:
         """Create MCPOrchestrator instance from a list of server configs"""
         orchestrator = cls()
         for server_config in server_configs:
+            orchestrator._apply_server_config(server_config)
             await orchestrator.connect_to_server(server_config.path, server_config.id)
         return orchestrator
 
@@ -64,6 +120,7 @@ class MCPOrchestrator:
             orchestrator = cls()
 
             for server in servers:
+                orchestrator._apply_server_config(server)
                 await orchestrator.connect_to_server(server.path, server.id)
 
             return orchestrator
@@ -78,7 +135,12 @@ class MCPOrchestrator:
 
         command = "python"
         server_params = StdioServerParameters(
-            command=command, args=[server_script_path], env=None
+            command=command,
+            args=[server_script_path],
+            env={
+                **get_default_environment(),
+                **self.payload_channel.server_env(server_id),
+            },
         )
 
         stdio_transport = await self.exit_stack.enter_async_context(
@@ -86,7 +148,7 @@ class MCPOrchestrator:
         )
         stdio, write = stdio_transport
         session: ClientSession = await self.exit_stack.enter_async_context(
-            ClientSession(stdio, write)
+            StreamingClientSession(stdio, write)
         )
 
         server_info = await session.initialize()
@@ -108,34 +170,250 @@ class MCPOrchestrator:
         """Update the combined list of available tools from all servers"""
         self.tools = []
         self.available_tools = []
+        self.validators = {}
 
         for server_id, server_data in self.sessions.items():
+            # Compiled once per server and reused until the server is removed
+            if "catalog" not in server_data:
+                server_data["catalog"] = [
+                    compile_tool(server_id, tool) for tool in server_data["tools"]
+                ]
+            if "validators" not in server_data:
+                server_data["validators"] = {
+                    f"{server_id}_{tool.name}": compile_validator(tool.inputSchema)
+                    for tool in server_data["tools"]
+                }
+            self.available_tools.extend(server_data["catalog"])
+            self.validators.update(server_data["validators"])
             for tool in server_data["tools"]:
-                unique_name = f"{server_id}_{tool.name}"
-                description = f"[{server_id.upper()}] {tool.description}"
-
-                self.available_tools.append(
-                    {
-                        "name": unique_name,
-                        "description": description,
-                        "input_schema": tool.inputSchema,
-                    }
-                )
+                self.tools.append((f"{server_id}_{tool.name}", server_id, tool.name))
+
+        for tool in self.builtin_tools:
+            compiled = compile_tool(BUILTIN_SERVER_ID, tool)
+            self.available_tools.append(compiled)
+            self.tools.append((compiled["name"], BUILTIN_SERVER_ID, tool.name))
+            self.validators[compiled["name"]] = compile_validator(tool.inputSchema)
+
+        self.tool_index = ToolIndex(self.available_tools)
+
+    def catalog_report(self) -> List[Dict[str, Any]]:
+        """Estimated tokens saved per tool by catalog compilation"""
+        report = []
+        for server_id, server_data in self.sessions.items():
+            report.extend(catalog_report(server_id, server_data["tools"]))
+        return report
+
+    def select_tools(self, query: str, used_tools: Iterable[str] = ()) -> List[Dict]:
+        """Select the tools to send to the LLM for a query
+
+        Returns the tool_top_k most relevant tools for the query plus tools
+        already used in the conversation, tools of pinned servers and the
+        built-in tools. All tools are returned when no limit is configured or
+        when nothing in the catalog matches the query.
+        """
+        if not self.tool_top_k or self.tool_top_k >= len(self.available_tools):
+            return self.available_tools
+
+        selected = set(self.tool_index.search(query, self.tool_top_k))
+        if not selected:
+            return self.available_tools
+
+        selected.update(used_tools)
+        for unique_name, server_id, _ in self.tools:
+            if server_id == BUILTIN_SERVER_ID or server_id in self.pinned_servers:
+                selected.add(unique_name)
+
+        return [tool for tool in self.available_tools if tool["name"] in selected]
 
-                self.tools.append((unique_name, server_id, tool.name))
+    def is_read_only(self, tool_name: str) -> bool:
+        """Whether a tool is known to have no side effects
+
+        Built-in tools are read-only; server tools are when the server
+        annotates them with readOnlyHint or they match one of the server's
+        configured read_only_tools patterns.
+        """
+        for unique_name, server_id, original_name in self.tools:
+            if unique_name != tool_name:
+                continue
+            if server_id == BUILTIN_SERVER_ID:
+                return True
+            patterns = self.read_only_patterns.get(server_id, ())
+            if any(fnmatch.fnmatchcase(original_name, p) for p in patterns):
+                return True
+            for tool in self.sessions[server_id]["tools"]:
+                if tool.name == original_name:
+                    annotations = getattr(tool, "annotations", None) or {}
+                    if not isinstance(annotations, dict):
+                        annotations = annotations.model_dump()
+                    return bool(annotations.get("readOnlyHint"))
+        return False
+
+    async def _call_builtin_tool(
+        self, tool_name: str, tool_args: Dict[str, Any]
+    ) -> CallToolResult:
+        """Execute a tool implemented by the orchestrator itself"""
+        try:
+            if tool_name == READ_RESULT_TOOL.name:
+                text = self.result_store.read(**tool_args)
+            else:
+                raise ValueError(f"Unknown built-in tool '{tool_name}'")
+        except (ValueError, TypeError, OSError) as e:
+            return CallToolResult(
+                content=[TextContent(type="text", text=str(e))], isError=True
+            )
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+    def validate_arguments(self, tool_name: str, tool_args: Dict[str, Any]):
+        """Check arguments against the tool's compiled input schema
+
+        Returns the arguments with schema defaults applied, and an error
+        result to return instead of calling the tool when they are invalid.
+        """
+        if UNPARSED_ARGUMENTS in tool_args:
+            text = (
+                f"Invalid arguments for {tool_name}: not valid JSON: "
+                f"{tool_args[UNPARSED_ARGUMENTS]}"
+            )
+            return tool_args, CallToolResult(
+                content=[TextContent(type="text", text=text)], isError=True
+            )
+        validator = self.validators.get(tool_name)
+        if validator is None:
+            return tool_args, None
+        checked, errors = validator(tool_args)
+        if not errors:
+            return checked, None
+        text = f"Invalid arguments for {tool_name}: " + "; ".join(errors)
+        return tool_args, CallToolResult(
+            content=[TextContent(type="text", text=text)], isError=True
+        )
+
+    async def call_tool(
+        self,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        on_progress: ProgressCallback | None = None,
+    ):
+        """Call a tool and return the result
+
+        Arguments are validated locally first; invalid arguments produce an
+        error result without a round trip to the server. on_progress receives
+        the progress and output the server streams while the call runs.
+        """
+        tool_args, error = self.validate_arguments(tool_name, tool_args)
+        if error is not None:
+            return error
 
-    async def call_tool(self, tool_name: str, tool_args: Dict[str, Any]):
-        """Call a tool and return the result"""
         for unique_name, server_id, original_name in self.tools:
             if unique_name == tool_name:
-                server_data = self.sessions[server_id]
-                return await server_data["session"].call_tool(original_name, tool_args)
+                if server_id == BUILTIN_SERVER_ID:
+                    return await self._call_builtin_tool(original_name, tool_args)
+                return await self._call_server_tool(
+                    server_id, original_name, tool_args, on_progress
+                )
 
         raise ValueError(f"Tool '{tool_name}' not found in any connected server")
 
+    def _apply_server_config(self, server_config: MCPServerConfig):
+        """Settings of a server that apply to its tool calls"""
+        self.read_only_patterns[server_config.id] = server_config.read_only_tools
+        self.breaker_configs[server_config.id] = server_config.circuit_breaker
+
+    def breaker_for(self, server_id: str, tool_name: str) -> CircuitBreaker | None:
+        """Circuit breaker guarding calls to a tool, None when disabled"""
+        config = self.breaker_configs.get(server_id, CircuitBreakerConfig())
+        if not config.enabled:
+            return None
+        key = (server_id, tool_name) if config.per_tool else server_id
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(config)
+        return self.breakers[key]
+
+    def circuit_status(self, server_id: str) -> str:
+        """State of a server's circuit breakers for display"""
+        config = self.breaker_configs.get(server_id, CircuitBreakerConfig())
+        if not config.enabled:
+            return "disabled"
+        if not config.per_tool:
+            breaker = self.breakers.get(server_id)
+            return breaker.describe() if breaker else "closed"
+        tripped = [
+            f"{key[1]}: {breaker.describe()}"
+            for key, breaker in self.breakers.items()
+            if isinstance(key, tuple)
+            and key[0] == server_id
+            and breaker.state != CircuitState.CLOSED
+        ]
+        return "\n".join(tripped) or "closed"
+
+    async def _call_server_tool(
+        self,
+        server_id: str,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        on_progress: ProgressCallback | None,
+    ):
+        """Call a tool on a server through its circuit breaker"""
+        breaker = self.breaker_for(server_id, tool_name)
+        if breaker is not None and not breaker.allow():
+            if breaker.state == CircuitState.HALF_OPEN:
+                reason = (
+                    "its circuit breaker is half-open and a trial call is "
+                    "checking whether it has recovered"
+                )
+            else:
+                reason = (
+                    f"its circuit breaker is open after {breaker.failure_count()} "
+                    f"of the last {len(breaker.outcomes)} calls failed or timed out"
+                )
+            text = (
+                f"Server '{server_id}' is unavailable: {reason}. The call was "
+                f"not sent; do not retry for {breaker.retry_in():.0f} seconds."
+            )
+            return CallToolResult(
+                content=[TextContent(type="text", text=text)], isError=True
+            )
+
+        session = self.sessions[server_id]["session"]
+        started = time.perf_counter()
+        self.calls_in_flight[server_id] += 1
+        try:
+            try:
+                if on_progress is not None and isinstance(
+                    session, StreamingClientSession
+                ):
+                    result = await session.call_tool_streaming(
+                        tool_name, tool_args, on_progress
+                    )
+                else:
+                    result = await session.call_tool(tool_name, tool_args)
+            except Exception:
+                if breaker is not None:
+                    breaker.record(time.perf_counter() - started, failed=True)
+                raise
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+            if breaker is not None:
+                is_error = bool(getattr(result, "isError", False))
+                breaker.record(
+                    time.perf_counter() - started,
+                    failed=is_error and breaker.config.count_error_results,
+                )
+            return self.payload_channel.resolve(result, server_id)
+        finally:
+            # Payloads of cancelled calls are never read; drop them once
+            # no other call of the server could still claim a file
+            self.calls_in_flight[server_id] -= 1
+            if not self.calls_in_flight[server_id]:
+                del self.calls_in_flight[server_id]
+                self.payload_channel.sweep(server_id)
+
     async def cleanup(self):
         """Clean up resources"""
         await self.exit_stack.aclose()
+        self.payload_channel.close()
 
     async def add_server(self, server_config: MCPServerConfig) -> List[str]:
         """Add a new MCP server to the orchestrator
@@ -152,6 +430,7 @@ class MCPOrchestrator:
         if server_config.id in self.sessions:
             raise ValueError(f"Server at '{server_config.path}' is already connected")
 
+        self._apply_server_config(server_config)
         await self.connect_to_server(server_config.path, server_config.id)
         return [tool.name for tool in self.sessions[server_config.id]["tools"]]
 
@@ -169,6 +448,13 @@ class MCPOrchestrator:
         # session = server_data["session"]
 
         del self.sessions[server_id]
+        self.read_only_patterns.pop(server_id, None)
+        self.breaker_configs.pop(server_id, None)
+        self.breakers = {
+            key: breaker
+            for key, breaker in self.breakers.items()
+            if key != server_id and not (isinstance(key, tuple) and key[0] == server_id)
+        }
         self._update_available_tools()
 
     def list_servers(self) -> List[str]:
@@ -0,0 +1,244 @@
+import asyncio
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, List
+
+from mcp import ClientSession
+
+logger = logging.getLogger(__name__)
+
+PROC = "/proc"
+
+# Frames of the interpreter's own bookkeeping, not worth reporting
+IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def read_rss(pid: int) -> int | None:
+    """Resident set size of a process in bytes, None when it is unknown"""
+    try:
+        with open(f"{PROC}/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def child_processes(pid: int) -> Dict[int, List[str]]:
+    """Command lines of the direct children of a process, by pid"""
+    children = {}
+    try:
+        entries = os.listdir(PROC)
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"{PROC}/{entry}/stat") as f:
+                stat = f.read()
+            # The command name may contain spaces and parentheses
+            parent = int(stat.rsplit(")", 1)[1].split()[1])
+            if parent != pid:
+                continue
+            with open(f"{PROC}/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().decode(errors="replace").split("\0")
+        except (OSError, ValueError, IndexError):
+            continue
+        children[int(entry)] = [arg for arg in cmdline if arg]
+    return children
+
+
+def format_bytes(size: int | None) -> str:
+    if size is None:
+        return "-"
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def history_size(chat_history: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Number of messages and serialized size of a chat history"""
+    serialized = json.dumps(chat_history, default=str)
+    return {"messages": len(chat_history), "bytes": len(serialized.encode())}
+
+
+class MemoryMonitor:
+    """Memory usage of the REPL and of the MCP servers it started
+
+    Allocation tracing with tracemalloc is off until start_tracing() is
+    called, since it slows every allocation down; top allocators are then
+    reported as growth since tracing started. With a sample_interval,
+    sample() is taken periodically so that slow growth over a long session
+    shows up in the samples and the log.
+    """
+
+    def __init__(
+        self,
+        sample_interval: float | None = None,
+        trace_frames: int = 1,
+        max_samples: int = 720,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.sample_interval = sample_interval
+        self.trace_frames = trace_frames
+        self.samples = deque(maxlen=max_samples)
+        self.clock = clock
+        self.baseline = None
+        self._task = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+        self.baseline = self._snapshot()
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+        self.baseline = None
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(IGNORED_TRACES)
+
+    def top_allocators(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Source lines holding the most memory, with their growth since the baseline"""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = self._snapshot()
+        if self.baseline is None:
+            self.baseline = snapshot
+        stats = snapshot.compare_to(self.baseline, "lineno")
+        stats.sort(key=lambda stat: (stat.size_diff, stat.size), reverse=True)
+        return [
+            {
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+            for frame in stat.traceback[:1]
+        ]
+
+    def sample(self, chat_history: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Cheap point-in-time measurements, kept for the growth report"""
+        traced = tracemalloc.get_traced_memory()[0] if self.tracing else None
+        sample = {
+            "time": self.clock(),
+            "rss": read_rss(os.getpid()),
+            "traced": traced,
+            "history_messages": len(chat_history),
+        }
+        self.samples.append(sample)
+        return sample
+
+    def growth(self) -> Dict[str, float] | None:
+        """RSS growth per hour between the first and the last sample"""
+        samples = [s for s in self.samples if s["rss"] is not None]
+        if len(samples) < 2:
+            return None
+        first, last = samples[0], samples[-1]
+        elapsed = last["time"] - first["time"]
+        if elapsed <= 0:
+            return None
+        return {
+            "seconds": elapsed,
+            "rss_bytes": last["rss"] - first["rss"],
+            "rss_bytes_per_hour": (last["rss"] - first["rss"]) * 3600 / elapsed,
+        }
+
+    def start(self, get_chat_history: Callable[[], List[Dict[str, Any]]]):
+        """Start periodic sampling, if a sample interval is set"""
+        if self.sample_interval and self._task is None:
+            self._task = asyncio.create_task(self._run(get_chat_history))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, get_chat_history: Callable[[], List[Dict[str, Any]]]):
+        while True:
+            try:
+                sample = self.sample(get_chat_history())
+                logger.info(f"Memory sample: {sample}")
+            except Exception as e:
+                logger.warning(f"Memory sampling failed: {e!r}")
+            await asyncio.sleep(self.sample_interval)
+
+    def report(
+        self,
+        chat_history: List[Dict[str, Any]],
+        sessions: Dict[str, Dict[str, Any]],
+        top: int = 10,
+    ) -> Dict[str, Any]:
+        """Full report for mem!: RSS, history, sessions, processes and allocators
+
+        sessions are the orchestrator's connected servers. Server processes
+        are found among the REPL's child processes by their script path;
+        children that match no server are reported separately, since they
+        usually belong to servers that were removed but never shut down.
+        """
+        children = child_processes(os.getpid())
+        unmatched = dict(children)
+        servers = []
+        for server_id, server_data in sessions.items():
+            path = server_data.get("server_path")
+            pid = next(
+                (pid for pid, cmdline in unmatched.items() if path in cmdline), None
+            )
+            unmatched.pop(pid, None)
+            servers.append(
+                {
+                    "server_id": server_id,
+                    "pid": pid,
+                    "rss": read_rss(pid) if pid is not None else None,
+                }
+            )
+
+        # Sessions that are still alive, including ones no longer connected.
+        # type() rather than isinstance(): lazy import proxies fake __class__
+        live_sessions = sum(
+            issubclass(type(obj), ClientSession) for obj in gc.get_objects()
+        )
+        traced, traced_peak = (
+            tracemalloc.get_traced_memory() if self.tracing else (None, None)
+        )
+        return {
+            "rss": read_rss(os.getpid()),
+            "history": history_size(chat_history),
+            "connected_sessions": len(sessions),
+            "live_sessions": live_sessions,
+            "subprocesses": len(children),
+            "servers": servers,
+            "other_subprocesses": [
+                {"pid": pid, "cmdline": " ".join(cmdline), "rss": read_rss(pid)}
+                for pid, cmdline in unmatched.items()
+            ],
+            "tracing": self.tracing,
+            "traced": traced,
+            "traced_peak": traced_peak,
+            "top_allocators": self.top_allocators(top),
+            "growth": self.growth(),
+        }
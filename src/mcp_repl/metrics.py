@@ -0,0 +1,41 @@
+import math
+from collections import deque
+from typing import Dict
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyStats:
+    """Latency samples with count, mean and tail percentiles
+
+    Only the most recent max_samples samples are kept for percentiles;
+    count and mean cover every recorded sample.
+    """
+
+    def __init__(self, max_samples: int = 4096):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self) -> Dict[str, float]:
+        """Latency summary in milliseconds"""
+        values = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * percentile(values, 50),
+            "p95_ms": 1000 * percentile(values, 95),
+            "p99_ms": 1000 * percentile(values, 99),
+            "max_ms": 1000 * values[-1] if values else 0.0,
+        }
@@ -0,0 +1,122 @@
+import logging
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from anthropic.types import Message
+
+from mcp_repl.chat_compactor import is_tool_result_message
+from mcp_repl.llm_providers import ProviderChain
+from mcp_repl.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "fast"
+LARGE_TIER = "large"
+
+# Returns an error message for an invalid tool call, None when it is valid
+ToolCallValidator = Callable[[str, Dict[str, Any]], str | None]
+
+
+class TierStats:
+    """Requests, latency and escalations of one model tier"""
+
+    def __init__(self):
+        self.latency = LatencyStats()
+        self.escalations = Counter()
+
+    def summary(self) -> Dict[str, Any]:
+        return {**self.latency.summary(), "escalations": dict(self.escalations)}
+
+
+class ModelRouter:
+    """Sends cheap steps of the tool loop to a fast model
+
+    Steps that continue the tool loop after tool results, and short user
+    queries, go to the fast tier. Its answer is escalated to the large tier
+    when it was cut off at max_tokens, when it calls an unknown tool or
+    passes invalid arguments, when it is a final answer after tool results,
+    since synthesizing those is left to the large model, and when the fast
+    tier fails altogether.
+    """
+
+    def __init__(
+        self,
+        fast: ProviderChain,
+        large: ProviderChain,
+        fast_max_tokens: int = 1000,
+        short_query_chars: int = 200,
+        validate_tool_call: ToolCallValidator | None = None,
+    ):
+        self.tiers = {FAST_TIER: fast, LARGE_TIER: large}
+        self.fast_max_tokens = fast_max_tokens
+        self.short_query_chars = short_query_chars
+        self.validate_tool_call = validate_tool_call
+        self.stats = {FAST_TIER: TierStats(), LARGE_TIER: TierStats()}
+        # Latency of a whole step, including an escalated second request
+        self.step_latency = LatencyStats()
+
+    def choose_tier(self, messages: List[Dict[str, Any]]) -> str:
+        if not messages:
+            return LARGE_TIER
+        last = messages[-1]
+        if is_tool_result_message(last):
+            return FAST_TIER
+        if isinstance(last["content"], str) and (
+            len(last["content"]) <= self.short_query_chars
+        ):
+            return FAST_TIER
+        return LARGE_TIER
+
+    def escalation_reason(
+        self, response: Message, request: Dict[str, Any]
+    ) -> str | None:
+        """Why a fast tier response should be redone by the large tier"""
+        if response.stop_reason == "max_tokens":
+            return "truncated"
+        tool_names = {tool["name"] for tool in request["tools"]}
+        tool_uses = [block for block in response.content if block.type == "tool_use"]
+        for block in tool_uses:
+            if block.name not in tool_names:
+                return "unknown_tool"
+            if self.validate_tool_call and self.validate_tool_call(
+                block.name, block.input
+            ):
+                return "invalid_arguments"
+        if not tool_uses and is_tool_result_message(request["messages"][-1]):
+            return "final_synthesis"
+        return None
+
+    async def _create(self, tier: str, request: Dict[str, Any]) -> Message:
+        started = time.perf_counter()
+        try:
+            return await self.tiers[tier].create(**request)
+        finally:
+            self.stats[tier].latency.record(time.perf_counter() - started)
+
+    async def create(self, **request) -> Tuple[Message, List[Message]]:
+        """Response for a request, and every response paid for along the way"""
+        started = time.perf_counter()
+        try:
+            if self.choose_tier(request["messages"]) == LARGE_TIER:
+                response = await self._create(LARGE_TIER, request)
+                return response, [response]
+
+            fast_request = {**request, "max_tokens": self.fast_max_tokens}
+            try:
+                fast_response = await self._create(FAST_TIER, fast_request)
+            except Exception as e:
+                logger.warning(f"Fast model failed, using the large model: {e!r}")
+                paid, reason = [], "error"
+            else:
+                reason = self.escalation_reason(fast_response, request)
+                if reason is None:
+                    return fast_response, [fast_response]
+                paid = [fast_response]
+
+            logger.info(f"Escalating to the large model: {reason}")
+            self.stats[FAST_TIER].escalations[reason] += 1
+            response = await self._create(LARGE_TIER, request)
+            return response, [*paid, response]
+        finally:
+            self.step_latency.record(time.perf_counter() - started)
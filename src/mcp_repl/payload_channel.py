@@ -0,0 +1,173 @@
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+from mcp.types import EmbeddedResource, TextContent, TextResourceContents
+
+logger = logging.getLogger(__name__)
+
+# Set by the orchestrator on the servers it starts: the directory to write
+# large payloads to. Servers only use the channel when it is present.
+PAYLOAD_DIR_ENV = "MCP_REPL_PAYLOAD_DIR"
+PAYLOAD_MIN_BYTES_ENV = "MCP_REPL_PAYLOAD_MIN_BYTES"
+DEFAULT_MIN_BYTES = 64 * 1024
+
+PAYLOAD_URI_SCHEME = "payload"
+_PAYLOAD_NAME = re.compile(r"payload-[A-Za-z0-9_]+\.bin")
+
+
+def _shared_memory_dir() -> str | None:
+    """/dev/shm when it is available, so payloads never touch a disk"""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return None
+
+
+def offload_payload(
+    text: str, mime_type: str = "application/json"
+) -> TextContent | EmbeddedResource:
+    """Server side: hand a large result to the client through shared memory
+
+    Returns a small resource referencing a file in the directory the client
+    passed in MCP_REPL_PAYLOAD_DIR, which the client maps and deletes. When
+    the server was not started by mcp-repl, or the text is small, returns
+    ordinary text content instead. Meant to be returned from a tool.
+    """
+    payload_dir = os.environ.get(PAYLOAD_DIR_ENV)
+    min_bytes = int(os.environ.get(PAYLOAD_MIN_BYTES_ENV, DEFAULT_MIN_BYTES))
+    if not payload_dir:
+        return TextContent(type="text", text=text)
+    data = text.encode()
+    if len(data) < min_bytes:
+        return TextContent(type="text", text=text)
+
+    fd, path = tempfile.mkstemp(prefix="payload-", suffix=".bin", dir=payload_dir)
+    try:
+        with open(fd, "wb") as f:
+            f.write(data)
+    except OSError:
+        os.unlink(path)
+        return TextContent(type="text", text=text)
+
+    return EmbeddedResource(
+        type="resource",
+        resource=TextResourceContents(
+            uri=f"{PAYLOAD_URI_SCHEME}://local/{os.path.basename(path)}",
+            mimeType=mime_type,
+            text=f"[{len(data):,} bytes in a shared payload file]",
+        ),
+    )
+
+
+class PayloadChannel:
+    """Client side of the shared-memory channel for large tool results
+
+    Each server started by the orchestrator gets its own private directory,
+    on tmpfs where available, in its environment. Payload references in its
+    results are replaced by the payload text, decoded straight from a
+    memory map of the file, which is then deleted. This skips the JSON
+    escaping, stdio framing and parsing a large result would otherwise go
+    through.
+
+    A cancelled call never delivers its result, so the payload file the
+    server may still write for it is never read. Once a server has no calls
+    in flight, sweep() deletes whatever is left in its directory.
+    """
+
+    def __init__(self, min_bytes: int = DEFAULT_MIN_BYTES):
+        self.min_bytes = min_bytes
+        self._root: Path | None = None
+        self._dirs: Dict[str, Path] = {}
+
+    def directory(self, server_id: str) -> Path:
+        """The server's payload directory, created on first use"""
+        if self._root is None:
+            self._root = Path(
+                tempfile.mkdtemp(prefix="mcp-repl-payloads-", dir=_shared_memory_dir())
+            )
+        if server_id not in self._dirs:
+            self._dirs[server_id] = Path(
+                tempfile.mkdtemp(prefix="server-", dir=self._root)
+            )
+        return self._dirs[server_id]
+
+    def server_env(self, server_id: str) -> Dict[str, str]:
+        """Environment variables that enable the channel for a server"""
+        return {
+            PAYLOAD_DIR_ENV: str(self.directory(server_id)),
+            PAYLOAD_MIN_BYTES_ENV: str(self.min_bytes),
+        }
+
+    def _payload_path(self, item: Any, server_id: str) -> Path | None:
+        if getattr(item, "type", None) != "resource":
+            return None
+        uri = str(item.resource.uri)
+        prefix = f"{PAYLOAD_URI_SCHEME}://local/"
+        if not uri.startswith(prefix):
+            return None
+        name = uri[len(prefix) :]
+        # Only plain file names created in the server's own directory are followed
+        if server_id not in self._dirs or not _PAYLOAD_NAME.fullmatch(name):
+            raise ValueError(f"Invalid payload reference '{uri}'")
+        return self._dirs[server_id] / name
+
+    def read(self, path: Path) -> str:
+        """Decode a payload file through a memory map and delete it"""
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return ""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view:
+                        return str(view, "utf-8")
+        finally:
+            path.unlink(missing_ok=True)
+
+    def resolve(self, result: Any, server_id: str) -> Any:
+        """Replace payload references in a server's tool result with their text"""
+        content = getattr(result, "content", None)
+        if not isinstance(content, list):
+            return result
+        resolved = []
+        changed = False
+        for item in content:
+            try:
+                path = self._payload_path(item, server_id)
+                if path is None:
+                    resolved.append(item)
+                    continue
+                text = self.read(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot read shared payload: {e}")
+                resolved.append(item)
+                continue
+            resolved.append(TextContent(type="text", text=text))
+            changed = True
+        if not changed:
+            return result
+        return result.model_copy(update={"content": resolved})
+
+    def sweep(self, server_id: str) -> int:
+        """Delete payload files no call will read; only safe while none is in flight"""
+        directory = self._dirs.get(server_id)
+        if directory is None:
+            return 0
+        removed = 0
+        for path in directory.iterdir():
+            path.unlink(missing_ok=True)
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unread payload files of {server_id}")
+        return removed
+
+    def close(self):
+        """Remove the payload directories and anything left in them"""
+        if self._root is not None:
+            shutil.rmtree(self._root, ignore_errors=True)
+            self._root = None
+            self._dirs = {}
@@ -0,0 +1,248 @@
+import asyncio
+import contextlib
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from mcp import types
+from mcp.server.lowlevel import Server
+
+from mcp_repl.loop_monitor import LoopLagMonitor
+from mcp_repl.mcp_orchestrator import BUILTIN_SERVER_ID, MCPOrchestrator
+
+logger = logging.getLogger(__name__)
+
+PROXY_SERVER_NAME = "mcp-repl-proxy"
+
+
+class ResultCache:
+    """LRU cache of tool results with a time-to-live
+
+    Only successful results are cached. Identical calls made while one is
+    already in flight wait for it instead of reaching the backend again;
+    if that call is cancelled, one of the waiting calls is made instead.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, Any]] = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tool_name: str, tool_args: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(tool_args, sort_keys=True, default=str)
+
+    def get(self, key: Tuple[str, str]) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: Tuple[str, str], result: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_call(self, key: Tuple[str, str], call) -> Any:
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        if key in self._in_flight:
+            self.hits += 1
+            leader = self._in_flight[key]
+            try:
+                return await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                # The leading call was cancelled, not this one: make the call
+                if leader.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.get_or_call(key, call)
+                raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved in case no other caller was waiting
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled: resolve the future so waiting callers do not hang
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            if not result.isError:
+                self.put(key, result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+
+class MCPProxy:
+    """Serves the tools of every server of an MCPOrchestrator as one MCP server
+
+    Tools are exposed under their `server_id_tool` names with the compiled
+    catalog descriptions and schemas. Calls are forwarded over the
+    orchestrator's existing sessions, so every downstream client shares one
+    connection per backend server, and calls to different backends run
+    concurrently.
+    """
+
+    def __init__(
+        self,
+        orchestrator: MCPOrchestrator,
+        cache_ttl: float = 0.0,
+        cache_size: int = 256,
+        name: str = PROXY_SERVER_NAME,
+    ):
+        self.orchestrator = orchestrator
+        self.cache = ResultCache(cache_ttl, cache_size) if cache_ttl > 0 else None
+        self._tools: List[types.Tool] | None = None
+        self._tools_source = None
+
+        self.server = Server(name)
+        self.server.list_tools()(self.list_tools)
+        # Registered directly so backend results, including isError and
+        # non-text content, are passed through unchanged
+        self.server.request_handlers[types.CallToolRequest] = self._handle_call_tool
+
+    async def list_tools(self) -> List[types.Tool]:
+        """The aggregated tool catalog, rebuilt only when servers change"""
+        if self._tools_source is not self.orchestrator.available_tools:
+            builtin_names = {
+                unique_name
+                for unique_name, server_id, _ in self.orchestrator.tools
+                if server_id == BUILTIN_SERVER_ID
+            }
+            self._tools = [
+                types.Tool(
+                    name=tool["name"],
+                    description=tool.get("description"),
+                    inputSchema=tool["input_schema"],
+                )
+                for tool in self.orchestrator.available_tools
+                if tool["name"] not in builtin_names
+            ]
+            self._tools_source = self.orchestrator.available_tools
+        return self._tools
+
+    async def call_tool(
+        self, tool_name: str, tool_args: Dict[str, Any]
+    ) -> types.CallToolResult:
+        """Forward a call to the backend server that owns the tool"""
+        if any(
+            unique_name == tool_name and server_id == BUILTIN_SERVER_ID
+            for unique_name, server_id, _ in self.orchestrator.tools
+        ):
+            raise ValueError(f"Tool '{tool_name}' is not exposed by the proxy")
+
+        # Repeating a mutating call must reach the server every time
+        if self.cache is None or not self.orchestrator.is_read_only(tool_name):
+            return await self.orchestrator.call_tool(tool_name, tool_args)
+
+        return await self.cache.get_or_call(
+            ResultCache.key(tool_name, tool_args),
+            lambda: self.orchestrator.call_tool(tool_name, tool_args),
+        )
+
+    async def _handle_call_tool(self, request: types.CallToolRequest):
+        try:
+            result = await self.call_tool(
+                request.params.name, request.params.arguments or {}
+            )
+        except Exception as e:
+            logger.warning(f"Tool call {request.params.name} failed: {e}")
+            result = types.CallToolResult(
+                content=[types.TextContent(type="text", text=str(e))], isError=True
+            )
+        return types.ServerResult(result)
+
+    async def run_stdio(self):
+        """Serve a single client over stdin/stdout"""
+        from mcp.server.stdio import stdio_server
+
+        async with stdio_server() as (read_stream, write_stream):
+            await self.server.run(
+                read_stream, write_stream, self.server.create_initialization_options()
+            )
+
+    def sse_app(self):
+        """Starlette app serving any number of clients over SSE at /sse"""
+        from mcp.server.sse import SseServerTransport
+        from starlette.applications import Starlette
+        from starlette.routing import Mount, Route
+
+        sse = SseServerTransport("/messages/")
+
+        async def handle_sse(request):
+            async with sse.connect_sse(
+                request.scope, request.receive, request._send
+            ) as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    self.server.create_initialization_options(),
+                )
+
+        return Starlette(
+            routes=[
+                Route("/sse", endpoint=handle_sse),
+                Mount("/messages/", app=sse.handle_post_message),
+            ]
+        )
+
+    async def run_sse(self, host: str = "127.0.0.1", port: int = 8000):
+        import uvicorn
+
+        config = uvicorn.Config(self.sse_app(), host=host, port=port)
+        await uvicorn.Server(config).serve()
+
+
+async def run_proxy(
+    config_path: str,
+    transport: str = "stdio",
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache_ttl: float = 0.0,
+    loop_lag_threshold: float | None = 0.1,
+):
+    """Start the servers from a config file and serve them as one MCP server"""
+    # stdout carries the MCP protocol in stdio mode
+    with contextlib.redirect_stdout(sys.stderr):
+        orchestrator = await MCPOrchestrator.from_config(config_path)
+    proxy = MCPProxy(orchestrator, cache_ttl=cache_ttl)
+    logger.info(
+        f"Proxying {len(await proxy.list_tools())} tools from "
+        f"{len(orchestrator.sessions)} servers over {transport}"
+    )
+    loop_monitor = (
+        LoopLagMonitor(threshold=loop_lag_threshold) if loop_lag_threshold else None
+    )
+    if loop_monitor is not None:
+        loop_monitor.start()
+    try:
+        if transport == "sse":
+            await proxy.run_sse(host, port)
+        else:
+            await proxy.run_stdio()
+    finally:
+        if loop_monitor is not None:
+            await loop_monitor.stop()
+        await orchestrator.cleanup()
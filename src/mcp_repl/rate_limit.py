@@ -0,0 +1,188 @@
+import asyncio
+import email.utils
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+# Statuses that mean the provider is throttling us rather than failing
+THROTTLE_STATUS_CODES = {429, 529}
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds the provider asked us to wait, from the error's response headers"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 0.5,
+    cap: float = 30.0,
+    retry_after: float | None = None,
+) -> float:
+    """Delay before retry number attempt (from 0): full jitter, capped
+
+    A retry-after from the provider is a lower bound; a little jitter is
+    added so that clients told the same time do not all retry at once.
+    """
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, min(1.0, base))
+    return delay
+
+
+class TokenBucket:
+    """Allows `per_minute` units per minute, with bursts up to that amount
+
+    take() waits until the units are available. The bucket can go into
+    debt through adjust() when an estimate turns out to be too low.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.clock = clock
+        self.tokens = per_minute
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount units are available"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def take(self, amount: float = 1.0):
+        # A request larger than the bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        while (delay := self.wait_time(amount)) > 0:
+            await asyncio.sleep(delay)
+        self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Take amount more units, or give some back when negative"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that halves on throttling and creeps back up
+
+    Additive increase, multiplicative decrease: each successful request
+    raises the limit by 1/limit, so by about one per round of requests.
+    """
+
+    def __init__(self, limit: int = 4, min_limit: int = 1, max_limit: int = 16):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        self.limit = max(self.min_limit, self.limit / 2)
+
+
+class RateLimiter:
+    """Client-side limits for one LLM provider
+
+    Requests wait for a concurrency slot and for room in the requests- and
+    tokens-per-minute buckets. A throttling response pauses every request
+    to the provider for its retry-after time and halves the concurrency.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_concurrency: int = 8,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(
+            limit=max_concurrency, max_limit=max_concurrency
+        )
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.waited = 0.0
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """Wait until a request may be sent, and hold a concurrency slot"""
+        started = time.monotonic()
+        await self.concurrency.acquire()
+        try:
+            while (pause := self.paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(pause)
+            if self.requests is not None:
+                await self.requests.take(1)
+            if self.tokens is not None and estimated_tokens:
+                await self.tokens.take(estimated_tokens)
+            self.waited += time.monotonic() - started
+            yield
+        finally:
+            await self.concurrency.release()
+
+    def settle(self, estimated_tokens: int, used_tokens: int):
+        """Correct the token bucket once the real usage is known"""
+        if self.tokens is not None:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+    def on_success(self):
+        self.concurrency.on_success()
+
+    def on_error(self, error: Exception):
+        if getattr(error, "status_code", None) not in THROTTLE_STATUS_CODES:
+            return
+        self.throttled += 1
+        self.concurrency.on_throttle()
+        delay = retry_after(error)
+        if delay:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "throttled": self.throttled,
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "waited_s": self.waited,
+        }
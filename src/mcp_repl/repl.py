@@ -1,53 +1,64 @@
 import argparse
 import asyncio
-import json
-import logging
 import os
+import signal
 import sys
+import time
 import traceback
 import uuid
+from contextlib import contextmanager, nullcontext
 from enum import StrEnum
+from functools import partial
 from itertools import groupby
+from pathlib import Path
 
 from dotenv import load_dotenv
+from mcp.types import CallToolResult, TextContent
 from prompt_toolkit import PromptSession
 from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.history import FileHistory
+from prompt_toolkit.history import ThreadedHistory
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.styles import Style
 from rich.console import Console, Group
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
+from mcp_repl.chat_compactor import ChatHistoryCompactor
+from mcp_repl.chat_log import FSYNC_POLICIES, ChatLogWriter
+from mcp_repl.daemon import DEFAULT_SOCKET_PATH, RemoteOrchestrator, run_daemon
 from mcp_repl.llm_client import LLMClient
+from mcp_repl.llm_providers import ProviderChain, provider_from_spec
+from mcp_repl.logging_pipeline import parse_logger_values, setup_logging
+from mcp_repl.loop_monitor import LoopLagMonitor
 from mcp_repl.mcp_orchestrator import MCPOrchestrator, MCPServerConfig
+from mcp_repl.memory_monitor import MemoryMonitor, format_bytes
+from mcp_repl.model_router import ModelRouter
+from mcp_repl.proxy import run_proxy
+from mcp_repl.rate_limit import RateLimiter
+from mcp_repl.replay import run_replay
+from mcp_repl.result_delta import ResultDeltaEncoder
+from mcp_repl.result_view import (
+    JSON_HIGHLIGHT_CHARS,
+    PREVIEW_CHARS,
+    ProgressBoard,
+    item_size,
+    render_item,
+    render_preview,
+)
+from mcp_repl.retention import (
+    BoundedFileHistory,
+    RetentionPolicy,
+    apply_retention,
+    decompress_session,
+)
+from mcp_repl.session_store import SessionStore, resume_session
+from mcp_repl.streaming import ToolStream, call_tool_streaming
+from mcp_repl.usage import BudgetExceededError, UsageTracker
 
-
-class CustomLogFormatter(logging.Formatter):
-    def format(self, record):
-        log_record = {
-            "time": self.formatTime(record),
-            "level": record.levelname,
-            "message": record.getMessage(),
-        }
-        return json.dumps(log_record)
-
-
-def get_logger():
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler()
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    formatter = CustomLogFormatter()
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    return logger
-
-
-logger = get_logger()
+logger = setup_logging()
 
 load_dotenv()
 
@@ -70,6 +81,19 @@ class REPLCommands(StrEnum):
     ADD_SERVER = "add!"
     REMOVE_SERVER = "remove!"
     LIST_SERVERS = "servers!"
+    CATALOG = "catalog!"
+    USAGE = "usage!"
+    SESSIONS = "sessions!"
+    SEARCH = "search!"
+    STATS = "stats!"
+    MEM = "mem!"
+
+
+def discard_task(task):
+    """Cancel a task whose result is no longer wanted"""
+    task.cancel()
+    # Retrieve the outcome so a failure is not reported as never retrieved
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
 
 class RichUI:
@@ -81,18 +105,52 @@ class RichUI:
         mcp_client: MCPOrchestrator,
         auto_approve_tools=False,
         always_show_full_output=False,
+        chat_history_dir="chat_history",
+        chat_log_fsync="batch",
+        chat_id=None,
+        session_store: SessionStore | None = None,
+        prompt_history_size=1000,
+        preview_chars=PREVIEW_CHARS,
+        use_pager=False,
+        stream_output_limit=None,
+        memory_monitor: MemoryMonitor | None = None,
+        loop_monitor: LoopLagMonitor | None = None,
     ):
         self.llm_client = llm_client
         self.mcp_client = mcp_client
         self.console = Console()
         self.auto_approve_tools = auto_approve_tools
         self.always_show_full_output = always_show_full_output
-        self.chat_id = str(uuid.uuid4())
-        self.chat_file = f"chat_history/{self.chat_id}.json"
+        self.chat_id = chat_id or str(uuid.uuid4())
+        self.chat_file = os.path.join(chat_history_dir, f"{self.chat_id}.jsonl")
+        self.session_store = session_store
+        self.prompt_history_size = prompt_history_size
+        self.preview_chars = preview_chars
+        self.use_pager = use_pager
+        self.stream_output_limit = stream_output_limit
+        self.memory_monitor = memory_monitor or MemoryMonitor()
+        self.loop_monitor = loop_monitor
+        self.input_session = None
+
+        self.chat_log = ChatLogWriter(self.chat_file, fsync=chat_log_fsync)
+        self.llm_client.message_listeners.append(self.chat_log.append_message)
+        if self.session_store is not None:
+            self.session_store.start_session(
+                self.chat_id, self.chat_file, self.mcp_client.list_servers()
+            )
+            self.chat_log.sinks.append(
+                partial(self.session_store.write_events, self.chat_id)
+            )
 
-        os.makedirs("chat_history", exist_ok=True)
-        with open(self.chat_file, "w") as f:
-            json.dump([], f)
+    def close(self):
+        """Flush the chat log and release resources"""
+        try:
+            self.chat_log.close()
+        except OSError as e:
+            self.console.print(
+                f"[bold red]Chat history was not fully saved to {self.chat_file}: "
+                f"{e}[/bold red]"
+            )
 
     def print_welcome(self):
         """Print welcome message"""
@@ -106,7 +164,20 @@ class RichUI:
             f"• [bold magenta]{REPLCommands.LIST_MCP}[/bold magenta] to list available tools\n"
             f"• [bold blue]{REPLCommands.ADD_SERVER}[/bold blue] to add a new MCP server\n"
             f"• [bold red]{REPLCommands.REMOVE_SERVER}[/bold red] to remove an MCP server\n"
-            f"• [bold green]{REPLCommands.LIST_SERVERS}[/bold green] to list connected servers"
+            f"• [bold green]{REPLCommands.LIST_SERVERS}[/bold green] "
+            "to list connected servers\n"
+            f"• [bold magenta]{REPLCommands.CATALOG}[/bold magenta] "
+            "to show tokens saved per tool by catalog compilation\n"
+            f"• [bold yellow]{REPLCommands.USAGE}[/bold yellow] "
+            "to show token usage, cost and the largest prompt contributors\n"
+            f"• [bold cyan]{REPLCommands.SESSIONS}[/bold cyan] "
+            "to list recent chat sessions (resume with --resume <chat_id>)\n"
+            f"• [bold blue]{REPLCommands.SEARCH} <terms>[/bold blue] "
+            "to search past chat sessions\n"
+            f"• [bold green]{REPLCommands.STATS}[/bold green] "
+            "to show runtime statistics\n"
+            f"• [bold magenta]{REPLCommands.MEM}[/bold magenta] "
+            "to show memory usage and top allocators"
         )
 
     def print_connected_tools(self, tool_names, server_path):
@@ -124,7 +195,13 @@ class RichUI:
         """Print tool call information"""
         self.console.print(f"\n[Tool call: {tool_name}]\n")
 
-    def confirm_tool_execution(self, tool_name, tool_args):
+    async def ask(self, message=""):
+        """Read a line of input without blocking the event loop"""
+        if self.input_session is None:
+            self.input_session = PromptSession()
+        return await self.input_session.prompt_async(message)
+
+    async def confirm_tool_execution(self, tool_name, tool_args):
         """Ask for confirmation to execute a tool"""
         if self.auto_approve_tools:
             self.console.print(
@@ -152,27 +229,138 @@ class RichUI:
             )
         )
 
-        confirm = input()
+        confirm = await self.ask()
         self.console.print()
 
         return confirm.lower() != "n"
 
-    def display_tool_result(self, tool_name, tool_args, result):
-        """Display tool execution result"""
-        result_text = result.content
-        formatted_result = ""
+    async def confirm_tool_executions(self, tool_calls):
+        """Ask for confirmation of several tool calls at once
+
+        Returns one approval per call. The user can approve or reject the
+        whole batch, or choose per call.
+        """
+        if self.auto_approve_tools or len(tool_calls) == 1:
+            return [
+                await self.confirm_tool_execution(call.name, call.input)
+                for call in tool_calls
+            ]
+
+        table = Table(show_header=True, box=None)
+        table.add_column("#", style="cyan", justify="right")
+        table.add_column("Tool", style="bold yellow")
+        table.add_column("Arguments", style="italic")
+        for i, call in enumerate(tool_calls, 1):
+            table.add_row(str(i), call.name, str(call.input))
 
-        if isinstance(result_text, list) and len(result_text) > 0:
-            try:
-                json_data = json.loads(result_text[0].text)
-                formatted_result = json.dumps(json_data, indent=2)
-            except (json.JSONDecodeError, AttributeError):
-                if hasattr(result_text[0], "text"):
-                    formatted_result = result_text[0].text
-                else:
-                    formatted_result = str(result_text)
-        else:
-            formatted_result = str(result_text)
+        self.console.print(
+            Panel(
+                Group(
+                    Text("🛠️  Tool Execution Requests", style="bold white"),
+                    Text(""),
+                    table,
+                    Text(""),
+                    Text(
+                        f"Run all {len(tool_calls)} tool calls? "
+                        "(Y/n, s to choose each): ",
+                        style="bold green",
+                    ),
+                ),
+                border_style="yellow",
+                title="Confirmation Required",
+                subtitle="Press Enter to approve all",
+            )
+        )
+
+        choice = (await self.ask()).strip().lower()
+        self.console.print()
+
+        if choice == "s":
+            return [
+                await self.confirm_tool_execution(call.name, call.input)
+                for call in tool_calls
+            ]
+        return [choice != "n"] * len(tool_calls)
+
+    def start_speculative_calls(self, tool_calls):
+        """Start read-only tool calls while their approval is still pending
+
+        Returns the running tasks by tool_use id. Results are only used once
+        the call is approved.
+        """
+        if self.auto_approve_tools:
+            return {}
+        return {
+            call.id: asyncio.create_task(
+                self.mcp_client.call_tool(call.name, call.input)
+            )
+            for call in tool_calls
+            if self.mcp_client.is_read_only(call.name)
+        }
+
+    @contextmanager
+    def stop_on_interrupt(self, stop):
+        """Make Ctrl-C set stop instead of interrupting the REPL"""
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGINT)
+        try:
+            loop.add_signal_handler(signal.SIGINT, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # No loop signal handlers on Windows or outside the main thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
+            if previous is not None:
+                signal.signal(signal.SIGINT, previous)
+
+    async def execute_tool_calls(self, tool_calls, speculative):
+        """Run approved tool calls, showing their progress as it streams in
+
+        Calls started speculatively are awaited as they are. The others can
+        be stopped with Ctrl-C, or once stream_output_limit characters of
+        output have arrived; they then return the output streamed so far.
+        A call that raises gets an error result of its own, so the results
+        of the other calls, which may have changed things, are still kept.
+        """
+        stop = asyncio.Event()
+        streams = []
+        calls = []
+        for call in tool_calls:
+            stream = ToolStream(call.name, self.stream_output_limit)
+            streams.append(stream)
+            if call.id in speculative:
+                calls.append(speculative[call.id])
+            else:
+                calls.append(
+                    call_tool_streaming(
+                        self.mcp_client, call.name, call.input, stream, stop
+                    )
+                )
+
+        with (
+            self.stop_on_interrupt(stop),
+            Live(ProgressBoard(streams), console=self.console, transient=True),
+        ):
+            results = await asyncio.gather(*calls, return_exceptions=True)
+
+        for i, (call, result) in enumerate(zip(tool_calls, results)):
+            if not isinstance(result, (Exception, asyncio.CancelledError)):
+                if isinstance(result, BaseException):
+                    raise result
+                continue
+            logger.warning(f"Tool call {call.name} failed: {result!r}")
+            results[i] = CallToolResult(
+                content=[TextContent(type="text", text=f"Tool call failed: {result}")],
+                isError=True,
+            )
+        return results
+
+    async def display_tool_result(self, tool_name, tool_args, result):
+        """Display tool execution result"""
+        content = result.content if isinstance(result.content, list) else []
 
         header = Group(
             Text("🔧 Tool Call: ", style="bold cyan")
@@ -183,37 +371,46 @@ class RichUI:
             Text(""),
         )
 
-        if len(formatted_result) > 500 and not self.always_show_full_output:
-            preview_length = 500
-            truncated = len(formatted_result) > preview_length
-            preview = formatted_result[:preview_length] + ("..." if truncated else "")
-            panel_content = Group(header, Text(preview))
-            if truncated:
-                panel_content.renderables.append(
-                    Text(
-                        "\n[Output truncated. Full length: "
-                        + str(len(formatted_result))
-                        + " characters]",
-                        style="italic yellow",
-                    )
+        preview, truncated = render_preview(content, self.preview_chars)
+        panel_content = Group(header, *preview)
+        if truncated:
+            total_size = sum(item_size(item) for item in content)
+            panel_content.renderables.append(
+                Text(
+                    f"\n[Output truncated. Full length: {total_size} characters]",
+                    style="italic yellow",
                 )
-
-            self.console.print(
-                Panel(panel_content, title="Tool Result", border_style="cyan")
             )
-            if truncated:
-                show_full = input("\nShow full output? (y/n): ")
+        self.console.print(
+            Panel(panel_content, title="Tool Result", border_style="cyan")
+        )
+
+        if truncated:
+            if self.always_show_full_output:
+                self.show_full_output(content)
+            else:
+                show_full = await self.ask("\nShow full output? (y/n): ")
                 if show_full.lower() == "y":
-                    self.console.print("\nFull output:")
-                    self.console.print(formatted_result)
-        else:
-            panel_content = Group(header, Text(formatted_result))
-            self.console.print(
-                Panel(panel_content, title="Tool Result", border_style="cyan")
-            )
+                    self.show_full_output(content)
 
         self.console.print()
 
+    def show_full_output(self, content):
+        """Print complete tool result content, through the pager if enabled"""
+        pager = self.console.pager(styles=True) if self.use_pager else nullcontext()
+        with pager:
+            self.console.print("\nFull output:")
+            for item in content:
+                if getattr(item, "type", None) == "text" and len(item.text) > (
+                    JSON_HIGHLIGHT_CHARS
+                ):
+                    # Leave wrapping to the terminal, rich wraps large text slowly
+                    self.console.print(
+                        item.text, soft_wrap=True, markup=False, highlight=False
+                    )
+                else:
+                    self.console.print(render_item(item))
+
     def print_error(self, error):
         """Print error message"""
         self.console.print(f"\n[bold red]Error:[/bold red] {str(error)}")
@@ -230,79 +427,86 @@ class RichUI:
         """Print tool cancelled message"""
         self.console.print("[bold red]Tool call cancelled by user[/bold red]")
 
-    def debug_and_save_chat_history(self):
-        try:
-            with open(self.chat_file, "w") as f:
-                json.dump(self.llm_client.chat_history, f, indent=2, default=str)
-        except Exception as e:
-            self.console.print(
-                f"[bold red]Error saving chat history: {str(e)}[/bold red]"
-            )
-
     async def process_query(self, query: str):
         """Process a query using Claude and available tools"""
         await self.llm_client.add_user_message(query)
 
-        self.debug_and_save_chat_history()
-
         while True:
             with self.console.status("[bold green]Processing query...[/bold green]"):
-                response = await self.llm_client.get_llm_response(
-                    self.mcp_client.available_tools
+                tools = self.mcp_client.select_tools(
+                    query, self.llm_client.used_tool_names()
                 )
+                try:
+                    response = await self.llm_client.get_llm_response(tools)
+                except BudgetExceededError as e:
+                    self.console.print(f"[bold red]{e}[/bold red]")
+                    break
+
+            turn = self.llm_client.usage_tracker.turns[-1]
+            self.chat_log.append(
+                {
+                    "event": "usage",
+                    "ts": time.time(),
+                    "input_tokens": turn.input_tokens,
+                    "output_tokens": turn.output_tokens,
+                }
+            )
+            self.print_turn_usage()
 
             tool_used = False
             assistant_content = []
+            tool_calls = []
 
             for content in response.content:
                 if content.type == "text":
                     self.print_markdown(content.text)
                     assistant_content.append(content)
                 elif content.type == "tool_use":
-                    tool_used = True
-                    tool_name = content.name
-                    tool_args = content.input
-                    tool_use_id = content.id
-
-                    self.print_tool_call(tool_name)
-
-                    if self.confirm_tool_execution(tool_name, tool_args):
-                        with self.console.status(
-                            "[bold green]Executing tool...[/bold green]"
-                        ):
-                            result = await self.mcp_client.call_tool(
-                                tool_name, tool_args
-                            )
-
-                        self.display_tool_result(tool_name, tool_args, result)
-
-                        await self.llm_client.add_assistant_message([content])
-
-                        await self.llm_client.add_tool_result(tool_use_id, result)
-
-                        self.debug_and_save_chat_history()
-
-                    else:
-                        self.print_tool_cancelled()
-                        tool_used = False
-                        break
+                    self.print_tool_call(content.name)
+                    tool_calls.append(content)
+
+            if tool_calls:
+                speculative = self.start_speculative_calls(tool_calls)
+                try:
+                    approvals = await self.confirm_tool_executions(tool_calls)
+                except BaseException:
+                    for task in speculative.values():
+                        discard_task(task)
+                    raise
+
+                approved = []
+                for call, ok in zip(tool_calls, approvals):
+                    if ok:
+                        approved.append(call)
+                    elif call.id in speculative:
+                        discard_task(speculative.pop(call.id))
+
+                results = await self.execute_tool_calls(approved, speculative)
+
+                for call, result in zip(approved, results):
+                    await self.display_tool_result(call.name, call.input, result)
+                    await self.llm_client.add_assistant_message([call])
+                    await self.llm_client.add_tool_result(call.id, result)
+
+                tool_used = all(approvals)
+                if not tool_used:
+                    self.print_tool_cancelled()
 
             if not tool_used:
                 if assistant_content:
                     await self.llm_client.add_assistant_message(assistant_content)
-                    self.debug_and_save_chat_history()
                 break
 
     async def add_new_server(self):
         """Add a new MCP server"""
         self.console.print("[bold blue]Adding a new MCP server[/bold blue]")
 
-        server_id = input("Enter server ID: ").strip()
+        server_id = (await self.ask("Enter server ID: ")).strip()
         if not server_id:
             self.console.print("[bold red]Server ID cannot be empty[/bold red]")
             return
 
-        server_path = input("Enter server script path: ").strip()
+        server_path = (await self.ask("Enter server script path: ")).strip()
         if not server_path:
             self.console.print("[bold red]Server path cannot be empty[/bold red]")
             return
@@ -335,7 +539,9 @@ class RichUI:
         for i, server_id in enumerate(servers, 1):
             self.console.print(f"{i}. {server_id}")
 
-        choice = input("\nEnter server number to remove (or 'cancel'): ").strip()
+        choice = (
+            await self.ask("\nEnter server number to remove (or 'cancel'): ")
+        ).strip()
 
         if choice.lower() == "cancel":
             return
@@ -358,8 +564,11 @@ class RichUI:
         except Exception as e:
             self.console.print(f"[bold red]Error removing server: {str(e)}[/bold red]")
 
-    def list_servers(self):
+    async def list_servers(self):
         """List all connected MCP servers"""
+        if isinstance(self.mcp_client, RemoteOrchestrator):
+            # Fetch the daemon's current circuit breaker states
+            await self.mcp_client.refresh()
         servers = self.mcp_client.list_servers()
 
         if not servers:
@@ -370,13 +579,377 @@ class RichUI:
         table.add_column("Server ID", style="cyan")
         table.add_column("Server Path", style="green")
         table.add_column("Tools Count", style="yellow")
+        table.add_column("Circuit")
 
         for server_id in servers:
             server_data = self.mcp_client.sessions[server_id]
             server_path = server_data["server_path"]
             tools_count = len(server_data["tools"])
+            circuit = self.mcp_client.circuit_status(server_id)
+            if circuit.startswith("closed"):
+                style = "green"
+            elif circuit == "disabled":
+                style = "dim"
+            else:
+                style = "bold red"
+
+            table.add_row(
+                server_id, server_path, str(tools_count), Text(circuit, style=style)
+            )
+
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print("\n")
+
+    def print_turn_usage(self):
+        """Print token usage of the last LLM request and the session totals"""
+        tracker = self.llm_client.usage_tracker
+        turn, totals = tracker.turns[-1], tracker.totals()
+        estimate = "~" if tracker.cost_is_estimate() else ""
+        self.console.print(
+            f"[dim]tokens: {turn.input_tokens} in / {turn.output_tokens} out"
+            f" (cache {turn.cache_read_input_tokens} read"
+            f" / {turn.cache_creation_input_tokens} write)"
+            f" | session: {totals.total_tokens} tokens,"
+            f" {estimate}${tracker.cost():.4f}[/dim]"
+        )
+        if tracker.over_soft_budget():
+            self.console.print(
+                "[bold yellow]Soft token budget exceeded: "
+                "compacting chat history more aggressively[/bold yellow]"
+            )
+
+    def print_usage(self):
+        """Print session token usage, cost and the tools with the largest prompts"""
+        tracker = self.llm_client.usage_tracker
+        totals = tracker.totals()
+
+        table = Table(title="Session Token Usage", show_header=True)
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="yellow", justify="right")
+        table.add_row("Requests", str(len(tracker.turns)))
+        table.add_row("Input tokens", str(totals.input_tokens))
+        table.add_row("Output tokens", str(totals.output_tokens))
+        table.add_row("Cache write tokens", str(totals.cache_creation_input_tokens))
+        table.add_row("Cache read tokens", str(totals.cache_read_input_tokens))
+        cost_label = (
+            "Cost (USD, estimated)" if tracker.cost_is_estimate() else "Cost (USD)"
+        )
+        table.add_row(cost_label, f"{tracker.cost():.4f}")
+        table.add_row("Soft budget", str(tracker.soft_budget or "-"))
+        table.add_row("Hard budget", str(tracker.hard_budget or "-"))
+
+        tools_table = Table(title="Largest Prompt Contributors", show_header=True)
+        tools_table.add_column("Tool Name", style="cyan")
+        tools_table.add_column("Est. Prompt Tokens", style="yellow", justify="right")
+        for name, tokens in tracker.top_tools():
+            tools_table.add_row(name, str(tokens))
+
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print(tools_table)
+        self.console.print("\n")
+
+    def list_sessions(self):
+        """List recent chat sessions from the session store"""
+        if self.session_store is None:
+            self.console.print("[bold yellow]No session store configured[/bold yellow]")
+            return
+
+        table = Table(title="Recent Chat Sessions", show_header=True)
+        table.add_column("Chat ID", style="cyan", no_wrap=True)
+        table.add_column("Updated", style="green")
+        table.add_column("Messages", style="yellow", justify="right")
+        table.add_column("Tokens", style="yellow", justify="right")
+        table.add_column("Tools Used", style="magenta")
+
+        for session in self.session_store.list_sessions():
+            table.add_row(
+                session["chat_id"],
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(session["updated_at"])),
+                str(session["message_count"]),
+                str(session["input_tokens"] + session["output_tokens"]),
+                ", ".join(session["tools_used"]),
+            )
+
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print("\n")
+
+    def search_sessions(self, terms):
+        """Full-text search over past chat sessions"""
+        if self.session_store is None:
+            self.console.print("[bold yellow]No session store configured[/bold yellow]")
+            return
+
+        results = self.session_store.search(terms)
+        if not results:
+            self.console.print("[bold yellow]No matching turns found[/bold yellow]")
+            return
+
+        table = Table(title=f"Search: {terms.strip()}", show_header=True)
+        table.add_column("Chat ID", style="cyan", no_wrap=True)
+        table.add_column("Role", style="green")
+        table.add_column("Match", style="white")
+        for result in results:
+            snippet = " ".join(result["snippet"].split())
+            table.add_row(result["chat_id"], result["role"], snippet)
+
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print("\n")
+
+    def print_llm_stats(self):
+        """Print latency, errors and throttling per LLM provider"""
+        router = self.llm_client.router
+        chains = list(router.tiers.values()) if router else [self.llm_client.providers]
+        fallbacks = sum(chain.fallbacks for chain in chains)
+        retries = sum(chain.retries for chain in chains)
+        table = Table(
+            title=f"LLM Providers ({fallbacks} fallbacks, {retries} retries)",
+            show_header=True,
+        )
+        table.add_column("Provider", style="cyan")
+        table.add_column("Requests", style="yellow", justify="right")
+        table.add_column("Errors", style="red", justify="right")
+        table.add_column("Throttled", style="red", justify="right")
+        table.add_column("Concurrency", style="yellow", justify="right")
+        table.add_column("Limit wait s", style="magenta", justify="right")
+        table.add_column("p50 / p95 ms", style="green", justify="right")
+
+        for provider in [provider for chain in chains for provider in chain.providers]:
+            latency = provider.latency.summary()
+            limits = provider.limiter.summary() if provider.limiter else None
+            table.add_row(
+                provider.label,
+                str(latency["count"]),
+                str(provider.errors),
+                str(limits["throttled"]) if limits else "-",
+                str(limits["concurrency_limit"]) if limits else "-",
+                f"{limits['waited_s']:.1f}" if limits else "-",
+                f"{latency['p50_ms']:.0f} / {latency['p95_ms']:.0f}",
+            )
+
+        self.console.print("\n")
+        self.console.print(table)
+        if router:
+            self.print_tier_stats(router)
+
+    def print_tier_stats(self, router):
+        """Print latency and escalations per model tier"""
+        table = Table(title="Model Tiers", show_header=True)
+        table.add_column("Tier", style="cyan")
+        table.add_column("Requests", style="yellow", justify="right")
+        table.add_column("Escalated", style="red")
+        table.add_column("p50 / p95 / p99 ms", style="green", justify="right")
+
+        rows = [
+            (tier, stats.latency, stats.escalations)
+            for tier, stats in router.stats.items()
+        ]
+        rows.append(("per step", router.step_latency, {}))
+        for tier, latency_stats, escalations in rows:
+            latency = latency_stats.summary()
+            table.add_row(
+                tier,
+                str(latency["count"]),
+                ", ".join(f"{reason} {n}" for reason, n in escalations.items()),
+                f"{latency['p50_ms']:.0f} / {latency['p95_ms']:.0f} / "
+                f"{latency['p99_ms']:.0f}",
+            )
+
+        self.console.print(table)
+
+    def print_loop_stats(self, loops):
+        """Print event loop lag and the latest calls that blocked the loop"""
+        table = Table(title="Event Loop Lag", show_header=True)
+        table.add_column("Process", style="cyan")
+        table.add_column("p50 / p95 / p99 ms", style="green", justify="right")
+        table.add_column("Max ms", style="yellow", justify="right")
+        table.add_column("Blocked", style="red", justify="right")
+        table.add_column("Blocked s", style="red", justify="right")
+        blocking = Table(title="Blocking Calls", show_header=True)
+        blocking.add_column("Process", style="cyan")
+        blocking.add_column("Ago s", style="yellow", justify="right")
+        blocking.add_column("Blocked ms", style="red", justify="right")
+        blocking.add_column("Frame", style="white", overflow="fold")
+
+        for process, summary in loops.items():
+            table.add_row(
+                process,
+                f"{summary['p50_ms']:.0f} / {summary['p95_ms']:.0f} / "
+                f"{summary['p99_ms']:.0f}",
+                f"{summary['max_ms']:.0f}",
+                f"{summary['blocked']} (> {summary['threshold_ms']:.0f}ms)",
+                f"{summary['blocked_s']:.1f}",
+            )
+            for event in reversed(summary["events"][-5:]):
+                blocked_ms = event["blocked_ms"]
+                blocking.add_row(
+                    process,
+                    f"{time.time() - event['time']:.0f}",
+                    f"{blocked_ms:.0f}" if blocked_ms is not None else "ongoing",
+                    event["frame"],
+                )
+
+        self.console.print("\n")
+        self.console.print(table)
+        if blocking.row_count:
+            self.console.print(blocking)
+
+    async def print_stats(self):
+        """Print runtime statistics"""
+        self.print_llm_stats()
+        stats = None
+        if isinstance(self.mcp_client, RemoteOrchestrator):
+            stats = await self.mcp_client.daemon_stats()
+
+        loops = {}
+        if self.loop_monitor is not None and self.loop_monitor.running:
+            loops["repl"] = self.loop_monitor.summary()
+        if stats and "event_loop" in stats:
+            loops["daemon"] = stats["event_loop"]
+        if loops:
+            self.print_loop_stats(loops)
+
+        if stats is None:
+            self.console.print("\n")
+            return
+
+        table = Table(
+            title=f"Daemon Clients (max concurrency {stats['max_concurrency']})",
+            show_header=True,
+        )
+        table.add_column("Client", style="cyan")
+        table.add_column("Calls", style="yellow", justify="right")
+        table.add_column("Errors", style="red", justify="right")
+        table.add_column("Pending", style="yellow", justify="right")
+        table.add_column("p50 / p95 ms", style="green", justify="right")
+        table.add_column("Queue wait p95 ms", style="magenta", justify="right")
+
+        for client_id, client in stats["clients"].items():
+            latency = client["latency"]
+            table.add_row(
+                client_id,
+                str(client["calls"]),
+                str(client["errors"]),
+                str(client["pending"]),
+                f"{latency['p50_ms']:.0f} / {latency['p95_ms']:.0f}",
+                f"{client['queue_wait']['p95_ms']:.0f}",
+            )
+
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print("\n")
+
+    def print_memory(self):
+        """Print memory usage of the REPL and its servers, and top allocators"""
+        monitor = self.memory_monitor
+        started_tracing = not monitor.tracing
+        if started_tracing:
+            monitor.start_tracing()
+        report = monitor.report(self.llm_client.chat_history, self.mcp_client.sessions)
+
+        history = report["history"]
+        table = Table(title="Memory", show_header=False)
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="yellow", justify="right")
+        table.add_row("REPL RSS", format_bytes(report["rss"]))
+        if report["tracing"]:
+            table.add_row(
+                "Traced (peak)",
+                f"{format_bytes(report['traced'])} "
+                f"({format_bytes(report['traced_peak'])})",
+            )
+        table.add_row(
+            "Chat history",
+            f"{history['messages']} messages, {format_bytes(history['bytes'])}",
+        )
+        table.add_row(
+            "Sessions (connected / alive)",
+            f"{report['connected_sessions']} / {report['live_sessions']}",
+        )
+        table.add_row("Subprocesses", str(report["subprocesses"]))
+        if report["growth"]:
+            growth = report["growth"]
+            table.add_row(
+                "RSS growth",
+                f"{format_bytes(growth['rss_bytes'])} in {growth['seconds']:.0f}s "
+                f"({format_bytes(growth['rss_bytes_per_hour'])}/h)",
+            )
+
+        processes = Table(title="Server Processes", show_header=True)
+        processes.add_column("Server", style="cyan")
+        processes.add_column("PID", style="yellow", justify="right")
+        processes.add_column("RSS", style="green", justify="right")
+        for server in report["servers"]:
+            processes.add_row(
+                server["server_id"],
+                str(server["pid"]) if server["pid"] is not None else "-",
+                format_bytes(server["rss"]),
+            )
+        for process in report["other_subprocesses"]:
+            processes.add_row(
+                Text(process["cmdline"], style="red"),
+                str(process["pid"]),
+                format_bytes(process["rss"]),
+            )
+
+        self.console.print("\n")
+        self.console.print(table)
+        self.console.print(processes)
+
+        if started_tracing:
+            self.console.print(
+                "[yellow]Started tracing allocations; run "
+                f"{REPLCommands.MEM} again to see the top allocators[/yellow]\n"
+            )
+            return
+
+        allocators = Table(title="Top Allocators (growth since tracing started)")
+        allocators.add_column("Location", style="cyan", overflow="fold")
+        allocators.add_column("Size", style="yellow", justify="right")
+        allocators.add_column("Growth", style="red", justify="right")
+        allocators.add_column("Blocks", style="green", justify="right")
+        for allocator in report["top_allocators"]:
+            allocators.add_row(
+                allocator["location"],
+                format_bytes(allocator["size"]),
+                format_bytes(allocator["size_diff"]),
+                str(allocator["count"]),
+            )
+        self.console.print(allocators)
+        self.console.print("\n")
+
+    def print_catalog_report(self):
+        """Print estimated tokens saved per tool by catalog compilation"""
+        report = sorted(
+            self.mcp_client.catalog_report(), key=lambda row: -row["saved_tokens"]
+        )
+
+        table = Table(title="Tool Catalog Compilation", show_header=True)
+        table.add_column("Tool Name", style="cyan")
+        table.add_column("Raw Tokens", style="yellow", justify="right")
+        table.add_column("Compiled Tokens", style="green", justify="right")
+        table.add_column("Saved", style="magenta", justify="right")
+
+        for row in report:
+            table.add_row(
+                row["name"],
+                str(row["raw_tokens"]),
+                str(row["compiled_tokens"]),
+                str(row["saved_tokens"]),
+            )
 
-            table.add_row(server_id, server_path, str(tools_count))
+        raw_total = sum(row["raw_tokens"] for row in report)
+        compiled_total = sum(row["compiled_tokens"] for row in report)
+        table.add_row(
+            "Total",
+            str(raw_total),
+            str(compiled_total),
+            str(raw_total - compiled_total),
+            style="bold",
+        )
 
         self.console.print("\n")
         self.console.print(table)
@@ -386,8 +959,13 @@ class RichUI:
         """Run an interactive chat loop with improved UI"""
         self.print_welcome()
 
+        prompt_history = BoundedFileHistory(
+            ".mcp_chat_history", max_entries=self.prompt_history_size
+        )
+        prompt_history.truncate()
+
         session = PromptSession(
-            history=FileHistory(".mcp_chat_history"),
+            history=ThreadedHistory(prompt_history),
             style=style,
             key_bindings=kb,
             multiline=True,
@@ -433,7 +1011,31 @@ class RichUI:
                     continue
 
                 if query.lower().strip() == REPLCommands.LIST_SERVERS:
-                    self.list_servers()
+                    await self.list_servers()
+                    continue
+
+                if query.lower().strip() == REPLCommands.CATALOG:
+                    self.print_catalog_report()
+                    continue
+
+                if query.lower().strip() == REPLCommands.USAGE:
+                    self.print_usage()
+                    continue
+
+                if query.lower().strip() == REPLCommands.SESSIONS:
+                    self.list_sessions()
+                    continue
+
+                if query.lower().strip() == REPLCommands.STATS:
+                    await self.print_stats()
+                    continue
+
+                if query.lower().strip() == REPLCommands.MEM:
+                    self.print_memory()
+                    continue
+
+                if query.lower().strip().startswith(REPLCommands.SEARCH):
+                    self.search_sessions(query.strip()[len(REPLCommands.SEARCH) :])
                     continue
 
                 await self.process_query(query)
@@ -446,17 +1048,21 @@ class RichUI:
     def print_available_tools(self):
         """Print available tools in a table format"""
 
-        def get_server_type(tool):
-            desc = tool["description"]
-            if "[" in desc and "]" in desc:
-                return desc[desc.find("[") + 1 : desc.find("]")]
-            return "Other"
+        server_by_tool = {
+            unique_name: server_id
+            for unique_name, server_id, _ in self.mcp_client.tools
+        }
+
+        def get_server_id(tool):
+            return server_by_tool.get(tool["name"], "Other")
 
-        sorted_tools = sorted(self.mcp_client.available_tools, key=get_server_type)
-        grouped_tools = groupby(sorted_tools, key=get_server_type)
+        sorted_tools = sorted(self.mcp_client.available_tools, key=get_server_id)
+        grouped_tools = groupby(sorted_tools, key=get_server_id)
 
-        for server_type, tools in grouped_tools:
-            table = Table(title=f"{server_type} Tools", show_header=True, expand=True)
+        for server_id, tools in grouped_tools:
+            table = Table(
+                title=f"{server_id.upper()} Tools", show_header=True, expand=True
+            )
             table.add_column("Tool Name", style="cyan", no_wrap=True)
             table.add_column("Description", style="green")
             table.add_column("Arguments", style="yellow")
@@ -477,21 +1083,14 @@ class RichUI:
 
                 args_str = ", ".join(args) if args else "None"
 
-                # Clean up description - remove any prefix in square brackets and whitespace
-                description = tool["description"]
-                if "]" in description:
-                    description = description.split("]", 1)[1]
-                description = description.strip()
-
                 # Take first line of description
-                short_description = description.split("\n")[0].strip()
+                short_description = tool["description"].split("\n")[0].strip()
 
                 # Remove server prefix from tool name if it exists
                 tool_name = tool["name"]
-                if server_type != "Other":
-                    prefix = f"{server_type.lower()}_"
-                    if tool_name.startswith(prefix):
-                        tool_name = tool_name[len(prefix) :]
+                prefix = f"{server_id}_"
+                if tool_name.startswith(prefix):
+                    tool_name = tool_name[len(prefix) :]
 
                 table.add_row(tool_name, short_description, args_str)
 
@@ -502,6 +1101,82 @@ class RichUI:
         self.console.print("\n")
 
 
+def print_replay_report(report):
+    """Print per-tool latency and throughput of a replay run"""
+    table = Table(title=f"Replay Results ({report.elapsed:.1f}s)", show_header=True)
+    table.add_column("Tool", style="cyan")
+    table.add_column("Calls", style="yellow", justify="right")
+    table.add_column("Errors", style="red", justify="right")
+    table.add_column("Calls/s", style="green", justify="right")
+    table.add_column("p50 ms", style="magenta", justify="right")
+    table.add_column("p95 ms", style="magenta", justify="right")
+    table.add_column("p99 ms", style="magenta", justify="right")
+    table.add_column("Max ms", style="magenta", justify="right")
+
+    for row in report.rows():
+        table.add_row(
+            row["tool"],
+            str(row["count"]),
+            str(row["errors"]),
+            f"{row['throughput']:.1f}",
+            f"{row['p50_ms']:.1f}",
+            f"{row['p95_ms']:.1f}",
+            f"{row['p99_ms']:.1f}",
+            f"{row['max_ms']:.1f}",
+        )
+
+    Console().print(table)
+
+
+def add_runtime_arguments(
+    parser: argparse.ArgumentParser, subcommand: bool = False, loop_lag: bool = True
+):
+    """Logging and event loop options, accepted before and after a subcommand name
+
+    A subcommand's copies have no defaults, so they do not overwrite values
+    given before the subcommand name.
+    """
+
+    def default(value):
+        return argparse.SUPPRESS if subcommand else value
+
+    if loop_lag:
+        parser.add_argument(
+            "--loop-lag-threshold",
+            type=float,
+            default=default(0.1),
+            help="Report event loop stalls longer than this many seconds, "
+            "0 to disable (default: 0.1)",
+        )
+
+    parser.add_argument(
+        "--log-file",
+        type=str,
+        default=default(None),
+        help="Also write logs to this file, rotated by size",
+    )
+    parser.add_argument(
+        "--log-max-bytes",
+        type=int,
+        default=default(10 * 1024 * 1024),
+        help="Size at which the log file is rotated (default: 10MB)",
+    )
+    parser.add_argument(
+        "--log-sample",
+        action="append",
+        default=default([]),
+        metavar="LOGGER=RATE",
+        help="Keep only this fraction of a logger's records below WARNING (repeatable)",
+    )
+    parser.add_argument(
+        "--log-rate-limit",
+        action="append",
+        default=default([]),
+        metavar="LOGGER=PER_SECOND",
+        help="Cap a logger at this many records per second (repeatable)",
+    )
+
+
 def cli_main():
     """Entry point for the CLI command."""
     asyncio.run(main())
@@ -520,24 +1195,493 @@ async def main():
         action="store_true",
         help="Always show full tool output without truncating or prompting",
     )
+    parser.add_argument(
+        "--preview-chars",
+        type=int,
+        default=PREVIEW_CHARS,
+        help="Characters of a tool result shown before truncating "
+        f"(default: {PREVIEW_CHARS})",
+    )
+    parser.add_argument(
+        "--pager",
+        action="store_true",
+        help="Show full tool output through the system pager",
+    )
+    parser.add_argument(
+        "--stream-output-limit",
+        type=int,
+        default=None,
+        help="Stop a tool call once it has streamed this many characters of output",
+    )
+    parser.add_argument(
+        "--mem-sample-interval",
+        type=float,
+        default=None,
+        help="Sample memory usage every this many seconds (see mem!)",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Trace allocations from startup, so mem! shows all growth",
+    )
+    parser.add_argument(
+        "--chat-history-dir",
+        type=str,
+        default="chat_history",
+        help="Directory to save chat history",
+    )
+    parser.add_argument(
+        "--chat-log-fsync",
+        choices=FSYNC_POLICIES,
+        default="batch",
+        help="When the chat history log is fsynced: "
+        "after every event, every batch of events, or never",
+    )
+    parser.add_argument(
+        "--max-history-tokens",
+        type=int,
+        default=100_000,
+        help="Token budget for the chat history sent to the LLM; "
+        "old tool results are elided first",
+    )
+    parser.add_argument(
+        "--result-spill-chars",
+        type=int,
+        default=20_000,
+        help="Tool results larger than this are stored on disk and sent to the LLM "
+        "as a preview with a handle",
+    )
+    parser.add_argument(
+        "--no-result-deltas",
+        action="store_true",
+        help="Always send full tool results, also when a call repeats an earlier one",
+    )
+    parser.add_argument(
+        "--tool-top-k",
+        type=int,
+        default=None,
+        help="Send only the K tools most relevant to the query "
+        "(plus tools already used); default sends all tools",
+    )
+    parser.add_argument(
+        "--pin-server",
+        action="append",
+        default=[],
+        help="Server ID whose tools are always sent regardless of relevance "
+        "(repeatable)",
+    )
+    parser.add_argument(
+        "--soft-token-budget",
+        type=int,
+        default=None,
+        help="Session token budget after which the chat history is compacted "
+        "more aggressively",
+    )
+    parser.add_argument(
+        "--hard-token-budget",
+        type=int,
+        default=None,
+        help="Session token budget after which further LLM requests are refused",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="anthropic",
+        help="LLM as provider or provider:model, e.g. openai:gpt-4o "
+        "(default: anthropic)",
+    )
+    parser.add_argument(
+        "--fallback-model",
+        action="append",
+        default=[],
+        help="LLM to fall back to when the previous one is overloaded or too slow "
+        "(repeatable)",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=1000,
+        help="Most tokens the LLM may generate per step (default: 1000)",
+    )
+    parser.add_argument(
+        "--fast-model",
+        action="append",
+        default=[],
+        help="Fast, cheaper LLM for tool-loop steps and short queries, "
+        "as provider[:model]; "
+        "repeat to give it fallbacks. Its answers are escalated to --model when needed",
+    )
+    parser.add_argument(
+        "--fast-max-tokens",
+        type=int,
+        default=1000,
+        help="Most tokens the fast model may generate per step (default: 1000)",
+    )
+    parser.add_argument(
+        "--short-query-chars",
+        type=int,
+        default=200,
+        help="User queries up to this length go to the fast model (default: 200)",
+    )
+    parser.add_argument(
+        "--llm-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds before an LLM request is abandoned (default: 60)",
+    )
+    parser.add_argument(
+        "--latency-slo",
+        type=float,
+        default=None,
+        help="Seconds after which a slow LLM request is also sent "
+        "to the fallback model",
+    )
+    parser.add_argument(
+        "--llm-rpm",
+        type=float,
+        default=None,
+        help="Client-side limit on LLM requests per minute, per provider",
+    )
+    parser.add_argument(
+        "--llm-tpm",
+        type=float,
+        default=None,
+        help="Client-side limit on LLM tokens per minute, per provider",
+    )
+    parser.add_argument(
+        "--llm-max-concurrency",
+        type=int,
+        default=8,
+        help="Most LLM requests in flight per provider; "
+        "halved while the provider throttles (default: 8)",
+    )
+    parser.add_argument(
+        "--llm-max-retries",
+        type=int,
+        default=3,
+        help="Retries with backoff when every LLM provider is overloaded (default: 3)",
+    )
+    parser.add_argument(
+        "--history-max-age-days",
+        type=float,
+        default=None,
+        help="Delete chat sessions older than this many days",
+    )
+    parser.add_argument(
+        "--history-max-sessions",
+        type=int,
+        default=None,
+        help="Keep at most this many chat sessions",
+    )
+    parser.add_argument(
+        "--history-max-bytes",
+        type=int,
+        default=None,
+        help="Keep at most this many bytes of chat session logs",
+    )
+    parser.add_argument(
+        "--history-compress-after-days",
+        type=float,
+        default=1.0,
+        help="Gzip chat session logs not modified for this many days",
+    )
+    parser.add_argument(
+        "--prompt-history-size",
+        type=int,
+        default=1000,
+        help="Number of prompt history entries kept and loaded at startup",
+    )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="CHAT_ID",
+        help="Resume a previous chat session",
+    )
+    parser.add_argument(
+        "--attach",
+        type=str,
+        nargs="?",
+        const=DEFAULT_SOCKET_PATH,
+        metavar="SOCKET",
+        help="Use the MCP servers of a running `mcp-repl daemon` "
+        "instead of starting them "
+        f"(default socket: {DEFAULT_SOCKET_PATH})",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Run a shared orchestrator that REPL clients attach to over a Unix socket",
+    )
+    daemon_parser.add_argument(
+        "--config", type=str, required=True, help="Path to config file"
+    )
+    daemon_parser.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET_PATH,
+        help="Path of the Unix socket to listen on",
+    )
+    daemon_parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of tool calls executed at once across all clients",
+    )
+    proxy_parser = subparsers.add_parser(
+        "proxy",
+        help="Serve the tools of all configured servers as a single MCP server",
+    )
+    proxy_parser.add_argument(
+        "--config", type=str, required=True, help="Path to config file"
+    )
+    proxy_parser.add_argument(
+        "--transport",
+        choices=("stdio", "sse"),
+        default="stdio",
+        help="Transport to serve the aggregated server over",
+    )
+    proxy_parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Host to bind in SSE mode (default: 127.0.0.1). The proxy has no "
+        "authentication; only bind other addresses on a trusted network",
+    )
+    proxy_parser.add_argument(
+        "--port", type=int, default=8000, help="Port to bind in SSE mode"
+    )
+    proxy_parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0.0,
+        help="Seconds to cache successful tool results (default: 0, disabled)",
+    )
+    replay_parser = subparsers.add_parser(
+        "replay",
+        help="Replay tool calls from saved chat sessions "
+        "against the configured servers",
+    )
+    replay_parser.add_argument(
+        "--config", type=str, required=True, help="Path to config file"
+    )
+    replay_parser.add_argument(
+        "sessions",
+        nargs="+",
+        help="Session logs, or chat history directories to take all sessions from",
+    )
+    replay_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of tool calls in flight at once (default: 4)",
+    )
+    replay_parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Maximum tool calls started per second (default: unlimited)",
+    )
+    replay_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Number of times to replay the recorded calls (default: 1)",
+    )
+    replay_parser.add_argument(
+        "--tool",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="Only replay tools matching this glob, e.g. k8s_get_* (repeatable)",
+    )
+    replay_parser.add_argument(
+        "--include-mutating",
+        action="store_true",
+        help="Also replay tools not known to be read-only, against the live servers",
+    )
+    for command_parser in [parser, *subparsers.choices.values()]:
+        add_runtime_arguments(
+            command_parser,
+            subcommand=command_parser is not parser,
+            loop_lag=command_parser is not replay_parser,
+        )
     args = parser.parse_args()
 
+    try:
+        setup_logging(
+            log_file=args.log_file,
+            max_bytes=args.log_max_bytes,
+            sample_rates=parse_logger_values(args.log_sample),
+            rate_limits=parse_logger_values(args.log_rate_limit),
+        )
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.command == "daemon":
+        try:
+            await run_daemon(
+                args.config,
+                args.socket,
+                args.max_concurrency,
+                loop_lag_threshold=args.loop_lag_threshold or None,
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
+    if args.command == "replay":
+        report = await run_replay(
+            args.config,
+            args.sessions,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            repeat=args.repeat,
+            tool_patterns=args.tool,
+            include_mutating=args.include_mutating,
+        )
+        print_replay_report(report)
+        return
+
+    if args.command == "proxy":
+        await run_proxy(
+            args.config,
+            args.transport,
+            args.host,
+            args.port,
+            args.cache_ttl,
+            loop_lag_threshold=args.loop_lag_threshold or None,
+        )
+        return
+
+    try:
+        llm_providers = [
+            provider_from_spec(spec, timeout=args.llm_timeout)
+            for spec in [args.model, *args.fallback_model]
+        ]
+        fast_providers = [
+            provider_from_spec(spec, timeout=args.llm_timeout)
+            for spec in args.fast_model
+        ]
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    for provider in llm_providers + fast_providers:
+        provider.limiter = RateLimiter(
+            requests_per_minute=args.llm_rpm,
+            tokens_per_minute=args.llm_tpm,
+            max_concurrency=args.llm_max_concurrency,
+        )
+
+    session_store = SessionStore(os.path.join(args.chat_history_dir, "sessions.db"))
+    chat_id = args.resume or str(uuid.uuid4())
+
+    retention_policy = RetentionPolicy(
+        max_age_days=args.history_max_age_days,
+        max_sessions=args.history_max_sessions,
+        max_total_bytes=args.history_max_bytes,
+        compress_after_days=args.history_compress_after_days,
+    )
+    await asyncio.to_thread(
+        apply_retention,
+        args.chat_history_dir,
+        retention_policy,
+        session_store,
+        [chat_id],
+    )
+    chat_history = []
+    if args.resume:
+        # New events go to the plain log, which must continue the old one
+        await asyncio.to_thread(decompress_session, args.chat_history_dir, chat_id)
+        try:
+            chat_history = resume_session(
+                session_store, args.resume, args.chat_history_dir
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    # Outlives reloads, so samples and the tracing baseline cover the session
+    memory_monitor = MemoryMonitor(sample_interval=args.mem_sample_interval)
+    if args.tracemalloc:
+        memory_monitor.start_tracing()
+    loop_monitor = None
+    if args.loop_lag_threshold > 0:
+        loop_monitor = LoopLagMonitor(threshold=args.loop_lag_threshold)
+        loop_monitor.start()
+
     while True:
-        llm_client = LLMClient()
         try:
-            mcp_orchestrator = await MCPOrchestrator.from_config(args.config)
+            if args.attach:
+                try:
+                    mcp_orchestrator = await RemoteOrchestrator.attach(args.attach)
+                except OSError as e:
+                    print(f"Error: could not attach to daemon at {args.attach}: {e}")
+                    sys.exit(1)
+            else:
+                mcp_orchestrator = await MCPOrchestrator.from_config(args.config)
         except ValueError as e:
             print(f"Error: {e}")
             print("Usage: python client.py --config config.json")
             sys.exit(1)
 
+        mcp_orchestrator.result_store.root_dir = Path(args.chat_history_dir) / "results"
+        mcp_orchestrator.result_store.threshold_chars = args.result_spill_chars
+        mcp_orchestrator.tool_top_k = args.tool_top_k
+        mcp_orchestrator.pinned_servers = set(args.pin_server)
+        providers = ProviderChain(
+            llm_providers,
+            latency_slo=args.latency_slo,
+            max_retries=args.llm_max_retries,
+        )
+        router = None
+        if fast_providers:
+
+            def validate_tool_call(tool_name, tool_args):
+                _, error = mcp_orchestrator.validate_arguments(tool_name, tool_args)
+                return error.content[0].text if error else None
+
+            router = ModelRouter(
+                fast=ProviderChain(fast_providers, max_retries=args.llm_max_retries),
+                large=providers,
+                fast_max_tokens=args.fast_max_tokens,
+                short_query_chars=args.short_query_chars,
+                validate_tool_call=validate_tool_call,
+            )
+        llm_client = LLMClient(
+            compactor=ChatHistoryCompactor(max_tokens=args.max_history_tokens),
+            result_store=mcp_orchestrator.result_store,
+            usage_tracker=UsageTracker(
+                soft_budget=args.soft_token_budget,
+                hard_budget=args.hard_token_budget,
+            ),
+            providers=providers,
+            max_tokens=args.max_tokens,
+            delta_encoder=None if args.no_result_deltas else ResultDeltaEncoder(),
+            router=router,
+        )
+        # Keep the conversation across reloads and resumed sessions
+        llm_client.chat_history = chat_history
+
         ui = RichUI(
             llm_client,
             mcp_orchestrator,
             auto_approve_tools=args.auto_approve_tools,
             always_show_full_output=args.always_show_full_output,
+            chat_history_dir=args.chat_history_dir,
+            chat_log_fsync=args.chat_log_fsync,
+            chat_id=chat_id,
+            session_store=session_store,
+            prompt_history_size=args.prompt_history_size,
+            preview_chars=args.preview_chars,
+            use_pager=args.pager,
+            stream_output_limit=args.stream_output_limit,
+            memory_monitor=memory_monitor,
+            loop_monitor=loop_monitor,
         )
 
+        memory_monitor.start(lambda: ui.llm_client.chat_history)
         try:
             ui.print_available_tools()
 
@@ -545,8 +1689,15 @@ async def main():
             if result["action"] == REPLCommands.EXIT:
                 break
         finally:
+            await memory_monitor.stop()
+            ui.close()
+            chat_history = llm_client.chat_history
             await mcp_orchestrator.cleanup()
 
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+    session_store.close()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
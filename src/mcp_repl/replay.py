@@ -0,0 +1,194 @@
+import asyncio
+import fnmatch
+import logging
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from mcp_repl.chat_log import load_chat_history
+from mcp_repl.circuit_breaker import CircuitBreakerConfig
+from mcp_repl.mcp_orchestrator import MCPOrchestrator
+from mcp_repl.metrics import LatencyStats
+from mcp_repl.retention import session_files
+
+logger = logging.getLogger(__name__)
+
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+def extract_tool_calls(history: List[Dict[str, Any]]) -> List[ToolCall]:
+    """Name and arguments of every tool_use in a chat history, in order"""
+    calls = []
+    for message in history:
+        if message.get("role") != "assistant" or isinstance(message["content"], str):
+            continue
+        for block in message["content"]:
+            if isinstance(block, dict) and block.get("type") == "tool_use":
+                calls.append((block["name"], block.get("input") or {}))
+            elif getattr(block, "type", None) == "tool_use":
+                calls.append((block.name, block.input or {}))
+    return calls
+
+
+def load_tool_calls(paths: Iterable[str]) -> List[ToolCall]:
+    """Tool calls from session logs; directories are searched for sessions"""
+    calls = []
+    for path in paths:
+        files = session_files(path) if Path(path).is_dir() else [Path(path)]
+        for file in files:
+            try:
+                calls.extend(extract_tool_calls(load_chat_history(str(file))))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable session {file}: {e}")
+    return calls
+
+
+class ReplayReport:
+    """Per-tool latency, errors and throughput of a replay run"""
+
+    def __init__(self):
+        self.latency: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.elapsed = 0.0
+
+    def record(self, tool_name: str, seconds: float, failed: bool):
+        self.latency[tool_name].record(seconds)
+        if failed:
+            self.errors[tool_name] += 1
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Summary per tool plus a `total` row, busiest tools first"""
+        total = LatencyStats()
+        rows = []
+        for tool_name, stats in self.latency.items():
+            total.samples.extend(stats.samples)
+            total.count += stats.count
+            total.total += stats.total
+            rows.append(self._row(tool_name, stats, self.errors[tool_name]))
+        rows.sort(key=lambda row: -row["count"])
+        rows.append(self._row("total", total, sum(self.errors.values())))
+        return rows
+
+    def _row(self, name: str, stats: LatencyStats, errors: int) -> Dict[str, Any]:
+        return {
+            "tool": name,
+            **stats.summary(),
+            "errors": errors,
+            "throughput": stats.count / self.elapsed if self.elapsed else 0.0,
+        }
+
+
+async def replay_tool_calls(
+    orchestrator: MCPOrchestrator,
+    calls: List[ToolCall],
+    concurrency: int = 4,
+    rate: float | None = None,
+    repeat: int = 1,
+) -> ReplayReport:
+    """Replay tool calls against the orchestrator's servers
+
+    Calls are issued in their recorded order, `repeat` times over, by
+    `concurrency` workers. With a rate, call starts are paced to at most
+    that many per second across all workers. Circuit breakers are bypassed
+    while replaying, so every call reaches its server and the latencies
+    measure the servers rather than rejected calls.
+    """
+    report = ReplayReport()
+    queue = asyncio.Queue()
+    for _ in range(repeat):
+        for call in calls:
+            queue.put_nowait(call)
+
+    interval = 1 / rate if rate else 0.0
+    next_start = time.perf_counter()
+    pace_lock = asyncio.Lock()
+
+    async def pace():
+        nonlocal next_start
+        async with pace_lock:
+            delay = next_start - time.perf_counter()
+            next_start = max(next_start, time.perf_counter()) + interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def worker():
+        while not queue.empty():
+            tool_name, tool_args = queue.get_nowait()
+            if interval:
+                await pace()
+            started = time.perf_counter()
+            try:
+                result = await orchestrator.call_tool(tool_name, tool_args)
+                failed = bool(result.isError)
+            except Exception as e:
+                logger.warning(f"Replayed call to {tool_name} failed: {e}")
+                failed = True
+            report.record(tool_name, time.perf_counter() - started, failed)
+
+    breaker_configs = orchestrator.breaker_configs
+    orchestrator.breaker_configs = {
+        server_id: CircuitBreakerConfig(enabled=False)
+        for server_id in orchestrator.sessions
+    }
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        orchestrator.breaker_configs = breaker_configs
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def filter_tool_calls(
+    orchestrator: MCPOrchestrator,
+    calls: List[ToolCall],
+    tool_patterns: Iterable[str] = (),
+    include_mutating: bool = False,
+) -> List[ToolCall]:
+    """Calls to tools the orchestrator has, optionally narrowed down
+
+    Only calls to tools known to be read-only are kept unless
+    include_mutating is set, since replaying runs them against live servers.
+    """
+    known = {unique_name for unique_name, _, _ in orchestrator.tools}
+    tool_patterns = list(tool_patterns)
+    selected = []
+    for tool_name, tool_args in calls:
+        if tool_name not in known:
+            continue
+        if tool_patterns and not any(
+            fnmatch.fnmatchcase(tool_name, pattern) for pattern in tool_patterns
+        ):
+            continue
+        if not include_mutating and not orchestrator.is_read_only(tool_name):
+            continue
+        selected.append((tool_name, tool_args))
+    return selected
+
+
+async def run_replay(
+    config_path: str,
+    session_paths: List[str],
+    concurrency: int = 4,
+    rate: float | None = None,
+    repeat: int = 1,
+    tool_patterns: Iterable[str] = (),
+    include_mutating: bool = False,
+) -> ReplayReport:
+    """Start the servers from a config file and replay recorded tool calls"""
+    calls = load_tool_calls(session_paths)
+    orchestrator = await MCPOrchestrator.from_config(config_path)
+    try:
+        selected = filter_tool_calls(
+            orchestrator, calls, tool_patterns, include_mutating
+        )
+        logger.info(
+            f"Replaying {len(selected)} of {len(calls)} recorded tool calls "
+            f"x{repeat} with concurrency {concurrency}"
+        )
+        return await replay_tool_calls(
+            orchestrator, selected, concurrency, rate, repeat
+        )
+    finally:
+        await orchestrator.cleanup()
@@ -0,0 +1,197 @@
+import difflib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from mcp.types import TextContent
+
+from mcp_repl.chat_compactor import (
+    DELTA_MARKER,
+    ELIDED_MARKER,
+    UNCHANGED_MARKER,
+    content_to_text,
+)
+from mcp_repl.result_store import SPILL_MARKER
+
+# Keys that identify the items of a JSON list, tried in order, so that an
+# inserted or removed item does not show up as a change to every later one
+IDENTITY_KEYS = ("id", "uid", "name", "key")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _identity_key(old: List[Any], new: List[Any]) -> str | None:
+    """A key whose values are present and unique in every item of both lists"""
+    items = old + new
+    if not items or not all(isinstance(item, dict) for item in items):
+        return None
+    for key in IDENTITY_KEYS:
+        for side in (old, new):
+            values = [item.get(key) for item in side]
+            if None in values or len(set(map(_dumps, values))) != len(values):
+                break
+        else:
+            return key
+    return None
+
+
+def json_diff(old: Any, new: Any, path: str = "$") -> List[str]:
+    """Changes that turn old into new, one line per changed JSON path
+
+    Lines start with `+` for an added value, `-` for a removed one and `~`
+    for a changed one.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key, value in old.items():
+            if key not in new:
+                changes.append(f"- {path}.{key}")
+            else:
+                changes.extend(json_diff(value, new[key], f"{path}.{key}"))
+        for key, value in new.items():
+            if key not in old:
+                changes.append(f"+ {path}.{key}: {_dumps(value)}")
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        key = _identity_key(old, new)
+        if key is None:
+            changes = []
+            for i, (old_item, new_item) in enumerate(zip(old, new)):
+                changes.extend(json_diff(old_item, new_item, f"{path}[{i}]"))
+            for i in range(len(new), len(old)):
+                changes.append(f"- {path}[{i}]")
+            for i in range(len(old), len(new)):
+                changes.append(f"+ {path}[{i}]: {_dumps(new[i])}")
+            return changes
+
+        old_items = {_dumps(item[key]): item for item in old}
+        new_items = {_dumps(item[key]): item for item in new}
+        changes = []
+        for ident, item in old_items.items():
+            item_path = f"{path}[{key}={ident}]"
+            if ident not in new_items:
+                changes.append(f"- {item_path}")
+            else:
+                changes.extend(json_diff(item, new_items[ident], item_path))
+        for ident, item in new_items.items():
+            if ident not in old_items:
+                changes.append(f"+ {path}[{key}={ident}]: {_dumps(item)}")
+        return changes
+
+    if old != new or type(old) is not type(new):
+        return [f"~ {path}: {_dumps(old)} -> {_dumps(new)}"]
+    return []
+
+
+def text_diff(old: str, new: str) -> List[str]:
+    """Changed lines between two texts, without context lines"""
+    return [
+        line
+        for line in difflib.unified_diff(
+            old.splitlines(), new.splitlines(), lineterm="", n=0
+        )
+        if not line.startswith(("---", "+++"))
+    ]
+
+
+def diff_results(old: str, new: str) -> List[str]:
+    """Structural diff for JSON results, line diff for anything else"""
+    try:
+        return json_diff(json.loads(old), json.loads(new))
+    except json.JSONDecodeError:
+        return text_diff(old, new)
+
+
+def _tool_result_text(history: List[Dict[str, Any]], tool_use_id: str) -> str | None:
+    """Text the history holds for a tool_result, None if it is gone"""
+    for message in reversed(history):
+        if message.get("role") != "user" or isinstance(message["content"], str):
+            continue
+        for block in message["content"]:
+            if (
+                isinstance(block, dict)
+                and block.get("type") == "tool_result"
+                and block.get("tool_use_id") == tool_use_id
+            ):
+                return content_to_text(block.get("content"))
+    return None
+
+
+class ResultDeltaEncoder:
+    """Sends repeated tool results as changes against an earlier result
+
+    The full text of the last complete result of each tool and argument
+    combination is kept as a baseline. A repeat call is sent as an
+    `unchanged` marker or as a diff against that baseline, but only while
+    the baseline is still in the chat history and was neither elided nor
+    spilled to the result store, and
+    only when the diff is clearly smaller than the result itself. Otherwise
+    the full result is sent and becomes the new baseline.
+    """
+
+    def __init__(self, max_entries: int = 64, max_ratio: float = 0.5):
+        self.max_entries = max_entries
+        self.max_ratio = max_ratio
+        # call key -> (tool_use_id of the baseline, its full text)
+        self._baselines: OrderedDict[str, tuple[str, str]] = OrderedDict()
+
+    @staticmethod
+    def call_key(tool_name: str, tool_args: Dict[str, Any]) -> str:
+        return f"{tool_name}:{json.dumps(tool_args, sort_keys=True, default=str)}"
+
+    def _baseline(self, history, key: str) -> tuple[str, str] | None:
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            return None
+        sent = _tool_result_text(history, baseline[0])
+        # An elided or spilled result left only a summary for the LLM to diff against
+        if sent is None or sent.startswith((ELIDED_MARKER, SPILL_MARKER)):
+            del self._baselines[key]
+            return None
+        return baseline
+
+    def _remember(self, key: str, tool_use_id: str, text: str):
+        self._baselines[key] = (tool_use_id, text)
+        self._baselines.move_to_end(key)
+        while len(self._baselines) > self.max_entries:
+            self._baselines.popitem(last=False)
+
+    def encode(
+        self,
+        history: List[Dict[str, Any]],
+        tool_use_id: str,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        content: Any,
+    ) -> Any:
+        """Content to put in the history for a result of a text-only tool"""
+        if not isinstance(content, list) or not all(
+            getattr(item, "type", None) == "text" for item in content
+        ):
+            return content
+
+        text = content_to_text(content)
+        key = self.call_key(tool_name, tool_args)
+        baseline = self._baseline(history, key)
+        if baseline is not None:
+            baseline_id, baseline_text = baseline
+            if text == baseline_text:
+                summary = (
+                    f"{UNCHANGED_MARKER}: same result as the identical call "
+                    f"in tool_use {baseline_id}]"
+                )
+                return [TextContent(type="text", text=summary)]
+
+            changes = diff_results(baseline_text, text)
+            delta = (
+                f"{DELTA_MARKER}: {len(changes)} changes against the result of "
+                f"the identical call in tool_use {baseline_id}]\n" + "\n".join(changes)
+            )
+            if len(delta) <= len(text) * self.max_ratio:
+                return [TextContent(type="text", text=delta)]
+
+        self._remember(key, tool_use_id, text)
+        return content
@@ -0,0 +1,114 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Any
+
+from mcp.types import TextContent
+
+# Start of the text that replaces a spilled result in the chat history
+SPILL_MARKER = "[Result stored out of band with handle"
+
+# Handle of a spilled result, as it appears in the text that replaces it
+RESULT_HANDLE = re.compile(re.escape(SPILL_MARKER) + r" '([0-9a-f]{16})'")
+
+
+class ResultStore:
+    """Local blob store for tool results too large to keep in the chat history
+
+    Oversized results are written to disk and replaced in the history by a
+    compact preview plus a handle. The LLM can page through or grep a stored
+    result with the orchestrator's built-in retrieval tool.
+    """
+
+    def __init__(
+        self,
+        root_dir: str = "chat_history/results",
+        threshold_chars: int = 20_000,
+        preview_chars: int = 1_000,
+        tool_name: str = "repl_read_result",
+    ):
+        self.root_dir = Path(root_dir)
+        self.threshold_chars = threshold_chars
+        self.preview_chars = preview_chars
+        self.tool_name = tool_name
+
+    def _path(self, handle: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{16}", handle):
+            raise ValueError(f"Invalid result handle '{handle}'")
+        return self.root_dir / f"{handle}.txt"
+
+    def put(self, text: str) -> str:
+        """Store a result and return its handle"""
+        handle = hashlib.sha256(text.encode()).hexdigest()[:16]
+        path = self._path(handle)
+        if not path.exists():
+            self.root_dir.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        return handle
+
+    def get(self, handle: str) -> str:
+        """Return the full text of a stored result"""
+        path = self._path(handle)
+        if not path.exists():
+            raise ValueError(f"No stored result with handle '{handle}'")
+        return path.read_text()
+
+    def read(
+        self, handle: str, offset: int = 0, limit: int = 200, pattern: str | None = None
+    ) -> str:
+        """Return a page of lines from a stored result, optionally filtered by regex"""
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit must not be negative")
+        regex = None
+        if pattern:
+            try:
+                regex = re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern {pattern!r}: {e}") from e
+
+        lines = self.get(handle).splitlines()
+        numbered = list(enumerate(lines, 1))
+        if regex is not None:
+            numbered = [(n, line) for n, line in numbered if regex.search(line)]
+
+        page = numbered[offset : offset + limit]
+        header = (
+            f"[{handle}: {len(numbered)} "
+            f"{'matching ' if pattern else ''}lines of {len(lines)}; "
+            f"showing {offset + 1 if page else 0}-{offset + len(page)}]"
+        )
+        return "\n".join([header] + [f"{n}: {line}" for n, line in page])
+
+    @staticmethod
+    def _text(content: Any) -> str:
+        texts = [item.text for item in content if getattr(item, "type", None) == "text"]
+        return "\n".join(texts)
+
+    def oversized(self, content: Any) -> bool:
+        """Whether spill() would replace the content"""
+        return (
+            isinstance(content, list)
+            and len(self._text(content)) > self.threshold_chars
+        )
+
+    def spill(self, content: Any) -> Any:
+        """Replace oversized text content with a preview and a handle
+
+        Content under the size threshold is returned unchanged. Non-text
+        items are kept as they are.
+        """
+        if not self.oversized(content):
+            return content
+
+        text = self._text(content)
+
+        handle = self.put(text)
+        preview = text[: self.preview_chars]
+        summary = (
+            f"{SPILL_MARKER} '{handle}': "
+            f"{len(text)} chars, {text.count(chr(10)) + 1} lines. "
+            f"Call {self.tool_name} with this handle to page through or grep it.]\n"
+            f"{preview}..."
+        )
+        others = [item for item in content if getattr(item, "type", None) != "text"]
+        return [TextContent(type="text", text=summary)] + others
@@ -0,0 +1,136 @@
+import json
+from typing import Any, List, Tuple
+
+from rich.console import Group, RenderableType
+from rich.progress_bar import ProgressBar
+from rich.spinner import Spinner
+from rich.syntax import Syntax
+from rich.table import Table
+from rich.text import Text
+
+PREVIEW_CHARS = 500
+
+# Lines of streamed output shown under each running tool call
+PROGRESS_TAIL_LINES = 5
+
+# JSON larger than this is shown as-is instead of parsed and highlighted
+JSON_HIGHLIGHT_CHARS = 50_000
+
+
+def looks_like_json(text: str) -> bool:
+    """Cheap check on the first character, without parsing"""
+    stripped = text[:64].lstrip()
+    return stripped[:1] in ("{", "[")
+
+
+def item_size(item: Any) -> int:
+    """Approximate size in characters of a tool result content item"""
+    if getattr(item, "type", None) == "text":
+        return len(item.text)
+    if getattr(item, "type", None) == "image":
+        return len(item.data)
+    if getattr(item, "type", None) == "resource":
+        resource = item.resource
+        return len(getattr(resource, "text", None) or getattr(resource, "blob", ""))
+    return 0
+
+
+def describe_item(item: Any) -> str:
+    """One-line summary of a non-text content item"""
+    if getattr(item, "type", None) == "image":
+        return f"[image: {item.mimeType}, {len(item.data) * 3 // 4:,} bytes]"
+    if getattr(item, "type", None) == "resource":
+        resource = item.resource
+        if getattr(resource, "text", None) is not None:
+            size = f"{len(resource.text):,} characters"
+        else:
+            size = f"{len(resource.blob) * 3 // 4:,} bytes"
+        mime_type = resource.mimeType or "unknown type"
+        return f"[resource: {resource.uri}, {mime_type}, {size}]"
+    return f"[{getattr(item, 'type', type(item).__name__)} content]"
+
+
+def render_text(text: str) -> RenderableType:
+    """Full rendering of a text item; JSON is highlighted below the size limit"""
+    if len(text) <= JSON_HIGHLIGHT_CHARS and looks_like_json(text):
+        try:
+            formatted = json.dumps(json.loads(text), indent=2)
+        except json.JSONDecodeError:
+            pass
+        else:
+            return Syntax(formatted, "json", word_wrap=True, background_color="default")
+    return Text(text)
+
+
+def render_preview(
+    content: List[Any], preview_chars: int = PREVIEW_CHARS
+) -> Tuple[List[RenderableType], bool]:
+    """Renderables for a bounded preview of tool result content
+
+    Text items share a budget of preview_chars characters; items that fit
+    are rendered in full, the first one that does not is cut to a prefix
+    without being parsed. Non-text items are summarized. Returns the
+    renderables and whether anything was left out.
+    """
+    renderables = []
+    remaining = preview_chars
+    truncated = False
+    for item in content:
+        if getattr(item, "type", None) != "text":
+            renderables.append(render_item(item))
+            continue
+        if truncated:
+            continue
+        if len(item.text) <= remaining:
+            renderables.append(render_text(item.text))
+            remaining -= len(item.text)
+        else:
+            renderables.append(Text(item.text[:remaining] + "..."))
+            truncated = True
+    return renderables, truncated
+
+
+def render_item(item: Any) -> RenderableType:
+    """Full rendering of a content item; non-text items are summarized"""
+    if getattr(item, "type", None) == "text":
+        return render_text(item.text)
+    return Text(describe_item(item), style="magenta")
+
+
+class ProgressBoard:
+    """Live view of running tool calls and the tail of their streamed output
+
+    Rendered again on every refresh of a rich Live display, so it always
+    shows the current state of the streams.
+    """
+
+    def __init__(self, streams: List[Any], tail_lines: int = PROGRESS_TAIL_LINES):
+        self.streams = streams
+        self.tail_lines = tail_lines
+        self.spinner = Spinner("dots")
+
+    def __rich__(self) -> RenderableType:
+        renderables = []
+        for stream in self.streams:
+            header = Table.grid(padding=(0, 1))
+            if stream.total:
+                header.add_row(
+                    Text(stream.tool_name, style="bold cyan"),
+                    ProgressBar(
+                        total=stream.total, completed=stream.progress, width=30
+                    ),
+                    Text(f"{stream.progress:g}/{stream.total:g}"),
+                )
+            else:
+                status = f"{stream.progress:g}" if stream.progress is not None else ""
+                header.add_row(
+                    self.spinner, Text(stream.tool_name, style="bold cyan"), status
+                )
+            renderables.append(header)
+            lines = "\n".join(stream.output[-self.tail_lines :]).splitlines()
+            for line in lines[-self.tail_lines :]:
+                renderables.append(
+                    Text("  " + line, "dim", no_wrap=True, overflow="ellipsis")
+                )
+        renderables.append(Text("Ctrl-C to stop and keep the output so far", "dim"))
+        return Group(*renderables)
@@ -0,0 +1,273 @@
+import gzip
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from prompt_toolkit.history import FileHistory
+
+from mcp_repl.result_store import RESULT_HANDLE
+from mcp_repl.session_store import SessionStore
+
+SESSION_SUFFIXES = (".jsonl", ".json", ".jsonl.gz", ".json.gz")
+
+DAY = 24 * 60 * 60
+
+
+def session_id(path: Path) -> str:
+    """Chat id of a session log file, whatever its suffix"""
+    return path.name.split(".", 1)[0]
+
+
+def session_files(chat_history_dir: str) -> List[Path]:
+    """Session log files in the chat history directory, newest first"""
+    root = Path(chat_history_dir)
+    if not root.is_dir():
+        return []
+    files = [
+        path
+        for path in root.iterdir()
+        if path.is_file() and path.name.endswith(SESSION_SUFFIXES)
+    ]
+    return sorted(files, key=lambda path: path.stat().st_mtime, reverse=True)
+
+
+def sessions(chat_history_dir: str) -> Dict[str, List[Path]]:
+    """Log files of each session, newest session first and oldest file first
+
+    A session resumed after it was compressed may have both a `.jsonl.gz`
+    and a `.jsonl`; they belong to the same session.
+    """
+    grouped = {}
+    for path in session_files(chat_history_dir):
+        grouped.setdefault(session_id(path), []).insert(0, path)
+    return grouped
+
+
+def compress_file(path: Path) -> Path:
+    """Gzip a file next to the original, keeping its mtime, and remove the original
+
+    An existing compressed file gets the data appended as another gzip
+    member, so its contents are followed by the original's.
+    """
+    compressed = path.with_name(path.name + ".gz")
+    stat = path.stat()
+    with open(path, "rb") as src, gzip.open(compressed, "ab") as dst:
+        shutil.copyfileobj(src, dst)
+    os.utime(compressed, (stat.st_atime, stat.st_mtime))
+    path.unlink()
+    return compressed
+
+
+def decompress_session(chat_history_dir: str, chat_id: str):
+    """Restore the plain log of a compressed session before it is resumed
+
+    Events already written to an uncompressed log after the compressed one
+    are kept after its contents, so the session stays a single log file.
+    """
+    path = Path(chat_history_dir) / f"{chat_id}.jsonl"
+    compressed = path.with_name(path.name + ".gz")
+    if not compressed.exists():
+        return
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(compressed, "rb") as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+        if path.exists():
+            with open(path, "rb") as newer:
+                shutil.copyfileobj(newer, dst)
+    os.replace(tmp_path, path)
+    compressed.unlink()
+
+
+def result_handles(path: Path) -> Set[str]:
+    """Handles of stored tool results mentioned in a session log"""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", errors="replace") as f:
+        return {handle for line in f for handle in RESULT_HANDLE.findall(line)}
+
+
+def session_handles(
+    chat_id: str, paths: List[Path], indexed: Dict[str, Set[str]]
+) -> Set[str]:
+    """Handles a session refers to, from the session index when it has them"""
+    if chat_id in indexed:
+        return indexed[chat_id]
+    return set().union(*(result_handles(path) for path in paths))
+
+
+@dataclass
+class RetentionPolicy:
+    """Limits for stored chat sessions; None disables a limit"""
+
+    max_age_days: float | None = None
+    max_sessions: int | None = None
+    max_total_bytes: int | None = None
+    compress_after_days: float | None = 1.0
+
+
+def apply_retention(
+    chat_history_dir: str,
+    policy: RetentionPolicy,
+    session_store: SessionStore | None = None,
+    active_chat_ids: Iterable[str] = (),
+) -> Dict[str, int]:
+    """Compress cold sessions and delete sessions beyond the policy limits
+
+    Sessions are ranked newest first; a session is deleted when it is older
+    than max_age_days, beyond the newest max_sessions, or would push the
+    total size over max_total_bytes. A session's size includes its copy in
+    the session index, which is vacuumed after deletions. Stored tool
+    results are deleted once no remaining session mentions them and they
+    are older than max_age_days or belonged to a deleted session. Active
+    sessions are never touched. Session logs are only scanned for handles
+    when results are up for deletion and the session index does not already
+    record them.
+
+    Returns:
+        Number of compressed and deleted files
+    """
+    now = time.time()
+    active = set(active_chat_ids)
+    report = {"compressed": 0, "deleted": 0}
+    index_sizes = session_store.session_sizes() if session_store is not None else {}
+    indexed = session_store.result_handles() if session_store is not None else {}
+    results_dir = Path(chat_history_dir) / "results"
+    results = list(results_dir.iterdir()) if results_dir.is_dir() else []
+
+    kept, total_bytes = 0, 0
+    remaining, orphaned = {}, set()
+    for chat_id, paths in sessions(chat_history_dir).items():
+        if chat_id in active:
+            remaining[chat_id] = paths
+            continue
+
+        age = now - paths[-1].stat().st_mtime
+        size = sum(path.stat().st_size for path in paths) + index_sizes.get(chat_id, 0)
+        expired = (
+            (policy.max_age_days is not None and age > policy.max_age_days * DAY)
+            or (policy.max_sessions is not None and kept >= policy.max_sessions)
+            or (
+                policy.max_total_bytes is not None
+                and total_bytes + size > policy.max_total_bytes
+            )
+        )
+        if expired:
+            if results:
+                orphaned |= session_handles(chat_id, paths, indexed)
+            for path in paths:
+                path.unlink()
+                report["deleted"] += 1
+            if session_store is not None:
+                session_store.delete_session(chat_id)
+            continue
+
+        if (
+            policy.compress_after_days is not None
+            and age > policy.compress_after_days * DAY
+        ):
+            for i, path in enumerate(paths):
+                if not path.name.endswith(".gz"):
+                    paths[i] = compress_file(path)
+                    report["compressed"] += 1
+            paths = list(dict.fromkeys(paths))
+            size = sum(path.stat().st_size for path in paths)
+            size += index_sizes.get(chat_id, 0)
+
+        remaining[chat_id] = paths
+        kept += 1
+        total_bytes += size
+
+    if session_store is not None and report["deleted"]:
+        session_store.vacuum()
+
+    stale = [
+        path
+        for path in results
+        if path.stem in orphaned
+        or (
+            policy.max_age_days is not None
+            and now - path.stat().st_mtime > policy.max_age_days * DAY
+        )
+    ]
+    if not stale:
+        return report
+
+    referenced = set().union(
+        *(
+            session_handles(chat_id, paths, indexed)
+            for chat_id, paths in remaining.items()
+        )
+    )
+    for path in stale:
+        if path.stem not in referenced:
+            path.unlink()
+            report["deleted"] += 1
+
+    return report
+
+
+class BoundedFileHistory(FileHistory):
+    """Prompt history file that only ever loads its most recent entries
+
+    Only the last max_bytes of the file are read, and `truncate` rewrites
+    the file with the newest max_entries once it grows past max_bytes, so
+    startup cost stays bounded however long the history has been in use.
+    """
+
+    def __init__(
+        self, filename: str, max_entries: int = 1000, max_bytes: int = 1_000_000
+    ):
+        super().__init__(filename)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _read_tail(self) -> List[str]:
+        """Entries in the tail of the file, oldest first"""
+        if not os.path.exists(self.filename):
+            return []
+
+        with open(self.filename, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - self.max_bytes))
+            data = f.read().decode("utf-8", errors="replace")
+
+        lines = data.splitlines(keepends=True)
+        if size > self.max_bytes:
+            # The first line may be cut; resync at the next entry boundary
+            lines = lines[1:]
+            while lines and lines[0].startswith("+"):
+                lines.pop(0)
+
+        entries, current = [], []
+        for line in lines:
+            if line.startswith("+"):
+                current.append(line[1:])
+            elif current:
+                entries.append("".join(current)[:-1])
+                current = []
+        if current:
+            entries.append("".join(current)[:-1])
+        return entries[-self.max_entries :]
+
+    def load_history_strings(self) -> Iterable[str]:
+        return reversed(self._read_tail())
+
+    def truncate(self):
+        """Rewrite the file with the newest entries when it exceeds max_bytes"""
+        if (
+            not os.path.exists(self.filename)
+            or os.path.getsize(self.filename) <= self.max_bytes
+        ):
+            return
+
+        entries = self._read_tail()
+        tmp_path = f"{self.filename}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write("\n# truncated\n")
+                for line in entry.split("\n"):
+                    f.write(f"+{line}\n")
+        os.replace(tmp_path, self.filename)
@@ -0,0 +1,306 @@
+import copy
+import logging
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A compiled check appends error messages for value at path to errors and
+# returns the value, with defaults filled in for objects
+Check = Callable[[Any, str, List[str]], Any]
+
+MAX_ERRORS = 5
+
+# Key under which a provider keeps the raw arguments of a tool call that
+# were not valid JSON, so the call fails validation instead of running
+UNPARSED_ARGUMENTS = "_unparsed_arguments"
+
+JSON_TYPES = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: (
+        (isinstance(v, int) and not isinstance(v, bool))
+        or (isinstance(v, float) and v.is_integer())
+    ),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+
+def json_type_name(value: Any) -> str:
+    for name in ("boolean", "integer", "number", "string", "array", "object", "null"):
+        if JSON_TYPES[name](value):
+            return name
+    return type(value).__name__
+
+
+class SchemaCompiler:
+    """Compiles a JSON schema into a tree of closures
+
+    Covers the keywords MCP servers put in tool input schemas: type, enum,
+    const, properties, required, additionalProperties, items, length and
+    range limits, pattern, allOf/anyOf/oneOf and local $ref. Unknown
+    keywords are ignored, so a schema never rejects more than it should.
+    """
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self._refs: Dict[str, Check] = {}
+
+    def compile(self, schema: Any) -> Check:
+        if not isinstance(schema, dict):
+            # true / false schemas
+            if schema is False:
+                return lambda value, path, errors: (
+                    errors.append(f"{path}: not allowed") or value
+                )
+            return lambda value, path, errors: value
+
+        checks: List[Check] = []
+        if "$ref" in schema:
+            checks.append(self._compile_ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._compile_type(schema["type"]))
+        if "enum" in schema:
+            options = schema["enum"]
+            checks.append(
+                self._predicate(lambda v: v in options, f"expected one of {options}")
+            )
+        if "const" in schema:
+            const = schema["const"]
+            checks.append(self._predicate(lambda v: v == const, f"expected {const!r}"))
+        checks.extend(self._compile_limits(schema))
+        if {"properties", "required", "additionalProperties"} & schema.keys():
+            checks.append(self._compile_object(schema))
+        if "items" in schema:
+            checks.append(self._compile_items(schema["items"]))
+        for key in ("allOf", "anyOf", "oneOf"):
+            if key in schema:
+                checks.append(self._compile_combinator(key, schema[key]))
+
+        def check(value, path, errors):
+            for sub_check in checks:
+                value = sub_check(value, path, errors)
+            return value
+
+        return check
+
+    @staticmethod
+    def _predicate(test: Callable[[Any], bool], message: str) -> Check:
+        def check(value, path, errors):
+            if not test(value):
+                errors.append(f"{path}: {message}")
+            return value
+
+        return check
+
+    def _compile_ref(self, ref: str) -> Check:
+        def check(value, path, errors):
+            if ref not in self._refs:
+                target = self.root
+                for part in ref.lstrip("#/").split("/"):
+                    if not part:
+                        continue
+                    target = target.get(part, {}) if isinstance(target, dict) else {}
+                # Placeholder first so recursive schemas terminate
+                self._refs[ref] = lambda value, path, errors: value
+                self._refs[ref] = self.compile(target)
+            return self._refs[ref](value, path, errors)
+
+        return check
+
+    def _compile_type(self, types: Any) -> Check:
+        types = [types] if isinstance(types, str) else list(types)
+        tests = [JSON_TYPES[t] for t in types if t in JSON_TYPES]
+        if not tests:
+            return lambda value, path, errors: value
+
+        def check(value, path, errors):
+            if not any(test(value) for test in tests):
+                errors.append(
+                    f"{path}: expected {' or '.join(types)}, "
+                    f"got {json_type_name(value)}"
+                )
+            return value
+
+        return check
+
+    def _compile_limits(self, schema: Dict[str, Any]) -> List[Check]:
+        checks = []
+        is_number = JSON_TYPES["number"]
+        limits = [
+            ("minimum", is_number, lambda v, n: v >= n, "must be >= {}"),
+            ("maximum", is_number, lambda v, n: v <= n, "must be <= {}"),
+            ("exclusiveMinimum", is_number, lambda v, n: v > n, "must be > {}"),
+            ("exclusiveMaximum", is_number, lambda v, n: v < n, "must be < {}"),
+            (
+                "minLength",
+                JSON_TYPES["string"],
+                lambda v, n: len(v) >= n,
+                "must have at least {} characters",
+            ),
+            (
+                "maxLength",
+                JSON_TYPES["string"],
+                lambda v, n: len(v) <= n,
+                "must have at most {} characters",
+            ),
+            (
+                "minItems",
+                JSON_TYPES["array"],
+                lambda v, n: len(v) >= n,
+                "must have at least {} items",
+            ),
+            (
+                "maxItems",
+                JSON_TYPES["array"],
+                lambda v, n: len(v) <= n,
+                "must have at most {} items",
+            ),
+        ]
+        for key, applies, test, message in limits:
+            # Draft 4 uses booleans for the exclusive limits
+            if key in schema and not isinstance(schema[key], bool):
+                checks.append(
+                    self._limit(applies, test, schema[key], message.format(schema[key]))
+                )
+        if "pattern" in schema:
+            try:
+                regex = re.compile(schema["pattern"])
+            except (re.error, TypeError) as e:
+                # ECMA-262 patterns Python does not support, such as \p{L}:
+                # the server checks them anyway
+                logger.warning(
+                    f"Skipping unsupported schema pattern {schema['pattern']!r}: {e}"
+                )
+                return checks
+            checks.append(
+                self._limit(
+                    JSON_TYPES["string"],
+                    lambda v, r: r.search(v) is not None,
+                    regex,
+                    f"must match {schema['pattern']!r}",
+                )
+            )
+        return checks
+
+    @staticmethod
+    def _limit(applies, test, bound, message) -> Check:
+        def check(value, path, errors):
+            if applies(value) and not test(value, bound):
+                errors.append(f"{path}: {message}")
+            return value
+
+        return check
+
+    def _compile_object(self, schema: Dict[str, Any]) -> Check:
+        properties = {
+            name: self.compile(sub_schema)
+            for name, sub_schema in schema.get("properties", {}).items()
+        }
+        defaults = {
+            name: sub_schema["default"]
+            for name, sub_schema in schema.get("properties", {}).items()
+            if isinstance(sub_schema, dict) and "default" in sub_schema
+        }
+        required = schema.get("required", [])
+        additional = schema.get("additionalProperties", True)
+        additional_check = (
+            self.compile(additional) if isinstance(additional, dict) else None
+        )
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                return value
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: required")
+            checked = {}
+            for name, item in value.items():
+                if name in properties:
+                    checked[name] = properties[name](item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}.{name}: unexpected property")
+                elif additional_check is not None:
+                    checked[name] = additional_check(item, f"{path}.{name}", errors)
+                else:
+                    checked[name] = item
+            for name, default in defaults.items():
+                if name not in checked:
+                    checked[name] = copy.deepcopy(default)
+            return checked
+
+        return check
+
+    def _compile_items(self, items: Any) -> Check:
+        if isinstance(items, list):
+            # Draft 4 tuple validation
+            item_checks = [self.compile(item) for item in items]
+
+            def check(value, path, errors):
+                if not isinstance(value, list):
+                    return value
+                return [
+                    item_checks[i](item, f"{path}[{i}]", errors)
+                    if i < len(item_checks)
+                    else item
+                    for i, item in enumerate(value)
+                ]
+
+            return check
+
+        item_check = self.compile(items)
+
+        def check(value, path, errors):
+            if not isinstance(value, list):
+                return value
+            return [
+                item_check(item, f"{path}[{i}]", errors) for i, item in enumerate(value)
+            ]
+
+        return check
+
+    def _compile_combinator(self, key: str, schemas: List[Any]) -> Check:
+        sub_checks = [self.compile(sub_schema) for sub_schema in schemas]
+
+        if key == "allOf":
+
+            def check(value, path, errors):
+                for sub_check in sub_checks:
+                    value = sub_check(value, path, errors)
+                return value
+
+            return check
+
+        def check(value, path, errors):
+            # oneOf is checked like anyOf: the first matching schema wins
+            for sub_check in sub_checks:
+                sub_errors = []
+                result = sub_check(value, path, sub_errors)
+                if not sub_errors:
+                    return result
+            errors.append(f"{path}: does not match any allowed schema")
+            return value
+
+        return check
+
+
+def compile_validator(
+    schema: Dict[str, Any],
+) -> Callable[[Dict[str, Any]], Tuple[Dict[str, Any], List[str]]]:
+    """Compile a tool input schema into a validator
+
+    The validator returns the arguments with defaults applied, and a list
+    of at most MAX_ERRORS compact error messages. The arguments passed in
+    are never modified.
+    """
+    check = SchemaCompiler(schema).compile(schema)
+
+    def validate(arguments: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        errors = []
+        checked = check(arguments, "$", errors)
+        return checked, errors[:MAX_ERRORS]
+
+    return validate
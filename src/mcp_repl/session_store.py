@@ -0,0 +1,311 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from mcp_repl.chat_compactor import content_to_text, to_jsonable
+from mcp_repl.chat_log import load_chat_history
+from mcp_repl.result_store import RESULT_HANDLE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    chat_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    log_path TEXT,
+    servers TEXT NOT NULL DEFAULT '[]',
+    tools_used TEXT NOT NULL DEFAULT '[]',
+    message_count INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (chat_id, seq)
+);
+CREATE TABLE IF NOT EXISTS result_handles (
+    chat_id TEXT NOT NULL,
+    handle TEXT NOT NULL,
+    PRIMARY KEY (chat_id, handle)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, chat_id UNINDEXED, seq UNINDEXED, role UNINDEXED
+);
+"""
+
+
+def message_text(message: Dict[str, Any]) -> str:
+    """Searchable text of a JSON-decoded chat history message"""
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+
+    parts = []
+    for block in content or []:
+        if not isinstance(block, dict):
+            parts.append(str(block))
+        elif block.get("type") == "text":
+            parts.append(block.get("text", ""))
+        elif block.get("type") == "tool_use":
+            parts.append(f"{block.get('name')} {json.dumps(block.get('input'))}")
+        elif block.get("type") == "tool_result":
+            parts.append(content_to_text(block.get("content")))
+    return "\n".join(parts)
+
+
+def tool_names(message: Dict[str, Any]) -> List[str]:
+    """Names of the tools called in a JSON-decoded assistant message"""
+    if message.get("role") != "assistant" or isinstance(message.get("content"), str):
+        return []
+    return [
+        block["name"]
+        for block in message["content"]
+        if isinstance(block, dict) and block.get("type") == "tool_use"
+    ]
+
+
+class SessionStore:
+    """SQLite index of chat sessions with full-text search over past turns
+
+    Messages are stored alongside per-session metadata so a session can be
+    resumed without reparsing its log file, and the handles of stored tool
+    results each session refers to so retention need not scan the logs.
+    Writes normally come from the chat log writer thread, reads from the
+    REPL, hence the shared lock.
+    """
+
+    def __init__(self, db_path: str = "chat_history/sessions.db"):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            migrate = (
+                self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'messages'"
+                ).fetchone()
+                and not self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'result_handles'"
+                ).fetchone()
+            )
+            self._conn.executescript(SCHEMA)
+            if migrate:
+                # Indexes created before handles were recorded
+                for row in self._conn.execute("SELECT chat_id, body FROM messages"):
+                    self._add_handles(row["chat_id"], row["body"])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _add_handles(self, chat_id: str, body: str):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO result_handles (chat_id, handle) VALUES (?, ?)",
+            [(chat_id, handle) for handle in RESULT_HANDLE.findall(body)],
+        )
+
+    def start_session(self, chat_id: str, log_path: str, servers: List[str]):
+        """Register a session, or refresh its servers when resuming"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO sessions
+                    (chat_id, created_at, updated_at, log_path, servers)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (chat_id) DO UPDATE SET
+                    updated_at = excluded.updated_at, servers = excluded.servers
+                """,
+                (chat_id, now, now, log_path, json.dumps(servers)),
+            )
+
+    def add_messages(self, chat_id: str, messages: List[Dict[str, Any]]):
+        """Append messages to a session and index their text"""
+        if not messages:
+            return
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT message_count, tools_used FROM sessions WHERE chat_id = ?",
+                (chat_id,),
+            ).fetchone()
+            seq = row["message_count"] if row else 0
+            tools_used = set(json.loads(row["tools_used"])) if row else set()
+
+            for message in messages:
+                body = json.dumps(message, default=to_jsonable)
+                plain = json.loads(body)
+                self._conn.execute(
+                    "INSERT INTO messages (chat_id, seq, role, body) "
+                    "VALUES (?, ?, ?, ?)",
+                    (chat_id, seq, plain["role"], body),
+                )
+                self._conn.execute(
+                    "INSERT INTO messages_fts (text, chat_id, seq, role) "
+                    "VALUES (?, ?, ?, ?)",
+                    (message_text(plain), chat_id, seq, plain["role"]),
+                )
+                self._add_handles(chat_id, body)
+                tools_used.update(tool_names(plain))
+                seq += 1
+
+            self._conn.execute(
+                """
+                UPDATE sessions
+                SET message_count = ?, tools_used = ?, updated_at = ?
+                WHERE chat_id = ?
+                """,
+                (seq, json.dumps(sorted(tools_used)), time.time(), chat_id),
+            )
+
+    def add_usage(self, chat_id: str, input_tokens: int, output_tokens: int):
+        """Add the token usage of a turn to the session totals"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE sessions
+                SET input_tokens = input_tokens + ?, output_tokens = output_tokens + ?
+                WHERE chat_id = ?
+                """,
+                (input_tokens, output_tokens, chat_id),
+            )
+
+    def write_events(self, chat_id: str, events: List[Dict[str, Any]]):
+        """Apply a batch of chat log events; used as a chat log writer sink"""
+        self.add_messages(
+            chat_id, [e["message"] for e in events if e.get("event") == "message"]
+        )
+        for event in events:
+            if event.get("event") == "usage":
+                self.add_usage(chat_id, event["input_tokens"], event["output_tokens"])
+
+    def get_session(self, chat_id: str) -> Dict[str, Any] | None:
+        """Metadata of a session"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sessions WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        session = dict(row)
+        session["servers"] = json.loads(session["servers"])
+        session["tools_used"] = json.loads(session["tools_used"])
+        return session
+
+    def list_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently updated sessions"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chat_id FROM sessions ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self.get_session(row["chat_id"]) for row in rows]
+
+    def load_history(self, chat_id: str) -> List[Dict[str, Any]]:
+        """Chat history of a session, in order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM messages WHERE chat_id = ? ORDER BY seq",
+                (chat_id,),
+            ).fetchall()
+        return [json.loads(row["body"]) for row in rows]
+
+    def delete_session(self, chat_id: str):
+        """Remove a session and its messages from the index"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages_fts WHERE chat_id = ?", (chat_id,))
+            self._conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+            self._conn.execute(
+                "DELETE FROM result_handles WHERE chat_id = ?", (chat_id,)
+            )
+            self._conn.execute("DELETE FROM sessions WHERE chat_id = ?", (chat_id,))
+
+    def session_sizes(self) -> Dict[str, int]:
+        """Bytes of stored messages and indexed text of each session"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT chat_id, SUM(size) AS size FROM (
+                    SELECT chat_id, length(body) AS size FROM messages
+                    UNION ALL
+                    SELECT chat_id, length(text) AS size FROM messages_fts
+                )
+                GROUP BY chat_id
+                """
+            ).fetchall()
+        return {row["chat_id"]: row["size"] for row in rows}
+
+    def result_handles(self) -> Dict[str, Set[str]]:
+        """Handles of the stored tool results each indexed session refers to"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT chat_id, handle FROM sessions
+                LEFT JOIN result_handles USING (chat_id)
+                """
+            ).fetchall()
+        handles = {}
+        for row in rows:
+            handles.setdefault(row["chat_id"], set())
+            if row["handle"] is not None:
+                handles[row["chat_id"]].add(row["handle"])
+        return handles
+
+    def vacuum(self):
+        """Return the space of deleted sessions to the file system"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO messages_fts(messages_fts) VALUES ('optimize')"
+            )
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over past turns, best matches first"""
+        terms = " ".join(
+            '"' + term.replace('"', '""') + '"' for term in query.split() if term
+        )
+        if not terms:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT chat_id, seq, role,
+                       snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet
+                FROM messages_fts
+                WHERE messages_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (terms, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def resume_session(
+    store: SessionStore, chat_id: str, chat_history_dir: str
+) -> List[Dict[str, Any]]:
+    """Chat history of a past session
+
+    Served from the index when the session is known to it; otherwise the
+    session's log file is parsed once and indexed.
+    """
+    if store.get_session(chat_id) is not None:
+        return store.load_history(chat_id)
+
+    for suffix in (".jsonl", ".json", ".jsonl.gz", ".json.gz"):
+        path = Path(chat_history_dir) / f"{chat_id}{suffix}"
+        if path.exists():
+            history = load_chat_history(str(path))
+            store.start_session(chat_id, str(path), [])
+            store.add_messages(chat_id, history)
+            return history
+
+    raise ValueError(f"No chat session '{chat_id}' found in {chat_history_dir}")
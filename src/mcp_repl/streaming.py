@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from mcp import ClientSession, types
+
+logger = logging.getLogger(__name__)
+
+EARLY_STOP_MARKER = "[tool call stopped early"
+
+
+@dataclass
+class ToolProgress:
+    """A progress notification or a piece of output streamed by a server"""
+
+    progress: float | None = None
+    total: float | None = None
+    message: str | None = None
+
+
+ProgressCallback = Callable[[ToolProgress], None]
+
+
+class StreamingClientSession(ClientSession):
+    """ClientSession that can follow a tool call while it runs
+
+    call_tool_streaming attaches a progress token to the request and passes
+    the server's progress notifications to a callback. Log messages the
+    server sends meanwhile are treated as streamed output; the protocol
+    does not tie them to a request, so every streaming call on the session
+    receives them. Cancelling the call notifies the server.
+
+    mcp 1.4 has no public API for progress tokens or request ids, so this
+    relies on `_received_notification` and `_request_id` of BaseSession;
+    the mcp version is pinned and test_streaming checks both.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._progress_callbacks: Dict[str, ProgressCallback] = {}
+        self._drain_task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        await super().__aenter__()
+        self._drain_task = asyncio.create_task(self._drain_incoming_messages())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            await asyncio.gather(self._drain_task, return_exceptions=True)
+            self._drain_task = None
+        return await super().__aexit__(exc_type, exc_val, exc_tb)
+
+    async def _drain_incoming_messages(self):
+        # Every notification is also queued on an unbuffered stream; unless
+        # something reads it, the first one blocks the session's receive loop
+        async for message in self.incoming_messages:
+            if isinstance(message, Exception):
+                logger.warning(f"Error from MCP session: {message}")
+
+    async def _received_notification(self, notification: Any) -> None:
+        root = notification.root
+        if isinstance(root, types.ProgressNotification):
+            callback = self._progress_callbacks.get(root.params.progressToken)
+            if callback is not None:
+                callback(
+                    ToolProgress(
+                        progress=root.params.progress,
+                        total=root.params.total,
+                        message=getattr(root.params, "message", None),
+                    )
+                )
+        elif isinstance(root, types.LoggingMessageNotification):
+            data = root.params.data
+            text = data if isinstance(data, str) else json.dumps(data, default=str)
+            for callback in list(self._progress_callbacks.values()):
+                callback(ToolProgress(message=text))
+
+    async def call_tool_streaming(
+        self,
+        name: str,
+        arguments: Dict[str, Any] | None,
+        on_progress: ProgressCallback,
+    ) -> types.CallToolResult:
+        token = uuid.uuid4().hex
+        self._progress_callbacks[token] = on_progress
+        # send_request takes the next id before its first await
+        request_id = self._request_id
+        try:
+            return await self.send_request(
+                types.ClientRequest(
+                    types.CallToolRequest(
+                        method="tools/call",
+                        params=types.CallToolRequestParams(
+                            name=name,
+                            arguments=arguments,
+                            _meta=types.RequestParams.Meta(progressToken=token),
+                        ),
+                    )
+                ),
+                types.CallToolResult,
+            )
+        except asyncio.CancelledError:
+            await self.send_notification(
+                types.ClientNotification(
+                    types.CancelledNotification(
+                        method="notifications/cancelled",
+                        params=types.CancelledNotificationParams(
+                            requestId=request_id, reason="Stopped by the client"
+                        ),
+                    )
+                )
+            )
+            raise
+        finally:
+            del self._progress_callbacks[token]
+
+
+class ToolStream:
+    """Progress and streamed output collected for one running tool call
+
+    `enough` is set once max_chars of output have arrived.
+    """
+
+    def __init__(self, tool_name: str, max_chars: int | None = None):
+        self.tool_name = tool_name
+        self.max_chars = max_chars
+        self.progress: float | None = None
+        self.total: float | None = None
+        self.output: List[str] = []
+        self.chars = 0
+        self.enough = asyncio.Event()
+
+    def update(self, update: ToolProgress):
+        if update.progress is not None:
+            self.progress = update.progress
+            self.total = update.total
+        if update.message:
+            self.output.append(update.message)
+            self.chars += len(update.message)
+            if self.max_chars and self.chars >= self.max_chars:
+                self.enough.set()
+
+    def partial_result(self) -> types.CallToolResult:
+        """Result made of the output streamed before the call was stopped"""
+        text = "\n".join(self.output)
+        marker = f"{EARLY_STOP_MARKER} after {self.chars} characters of output]"
+        return types.CallToolResult(
+            content=[types.TextContent(type="text", text=f"{text}\n{marker}".lstrip())]
+        )
+
+
+async def call_tool_streaming(
+    orchestrator: Any,
+    tool_name: str,
+    tool_args: Dict[str, Any],
+    stream: ToolStream,
+    stop: asyncio.Event,
+) -> types.CallToolResult:
+    """Run a tool call, feeding its progress to stream, until done or stopped
+
+    The call is cancelled when `stop` is set or the stream has received
+    enough output; the output streamed so far is then returned as the result.
+    """
+    call = asyncio.create_task(
+        orchestrator.call_tool(tool_name, tool_args, on_progress=stream.update)
+    )
+    waiters = [
+        asyncio.create_task(stop.wait()),
+        asyncio.create_task(stream.enough.wait()),
+    ]
+    try:
+        await asyncio.wait([call, *waiters], return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        call.cancel()
+        raise
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+    if not call.done():
+        call.cancel()
+    (outcome,) = await asyncio.gather(call, return_exceptions=True)
+    if isinstance(outcome, asyncio.CancelledError):
+        return stream.partial_result()
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
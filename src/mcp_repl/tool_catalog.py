@@ -0,0 +1,86 @@
+import inspect
+import re
+from typing import Any, Dict, List
+
+from mcp.types import Tool
+
+from mcp_repl.chat_compactor import estimate_tokens
+
+SCHEMA_LIST_KEYS = ("anyOf", "allOf", "oneOf", "prefixItems")
+SCHEMA_MAP_KEYS = ("$defs", "definitions")
+
+
+def normalize_description(description: str | None) -> str:
+    """Dedent a docstring and drop indentation, trailing spaces and blank runs"""
+    if not description:
+        return ""
+    lines = [line.strip() for line in inspect.cleandoc(description).splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def minify_schema(schema: Any, is_property: bool = False) -> Any:
+    """Strip keys that carry no information for the LLM from a JSON schema
+
+    Removes the auto-generated `title` of every (sub)schema and `default: null`
+    on optional properties. Property names are kept as they are, even when a
+    property is called `title`.
+    """
+    if not isinstance(schema, dict):
+        return schema
+
+    minified = {}
+    for key, value in schema.items():
+        if key == "title" and isinstance(value, str):
+            continue
+        if key == "properties" and isinstance(value, dict):
+            minified[key] = {
+                name: minify_schema(prop, is_property=True)
+                for name, prop in value.items()
+            }
+        elif key in SCHEMA_LIST_KEYS and isinstance(value, list):
+            minified[key] = [minify_schema(item) for item in value]
+        elif key in SCHEMA_MAP_KEYS and isinstance(value, dict):
+            minified[key] = {name: minify_schema(item) for name, item in value.items()}
+        elif key in ("items", "additionalProperties") and isinstance(value, dict):
+            minified[key] = minify_schema(value)
+        else:
+            minified[key] = value
+
+    if is_property and minified.get("default", ...) is None:
+        del minified["default"]
+    return minified
+
+
+def raw_tool_entry(server_id: str, tool: Tool) -> Dict[str, Any]:
+    """Catalog entry as forwarded before compilation, used for reporting"""
+    return {
+        "name": f"{server_id}_{tool.name}",
+        "description": f"[{server_id.upper()}] {tool.description}",
+        "input_schema": tool.inputSchema,
+    }
+
+
+def compile_tool(server_id: str, tool: Tool) -> Dict[str, Any]:
+    """Compact catalog entry for a server tool in the LLM tool format"""
+    return {
+        "name": f"{server_id}_{tool.name}",
+        "description": normalize_description(tool.description),
+        "input_schema": minify_schema(tool.inputSchema),
+    }
+
+
+def catalog_report(server_id: str, tools: List[Tool]) -> List[Dict[str, Any]]:
+    """Estimated tokens per tool before and after compilation"""
+    report = []
+    for tool in tools:
+        raw_tokens = estimate_tokens(raw_tool_entry(server_id, tool))
+        compiled_tokens = estimate_tokens(compile_tool(server_id, tool))
+        report.append(
+            {
+                "name": f"{server_id}_{tool.name}",
+                "raw_tokens": raw_tokens,
+                "compiled_tokens": compiled_tokens,
+                "saved_tokens": raw_tokens - compiled_tokens,
+            }
+        )
+    return report
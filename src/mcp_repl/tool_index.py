@@ -0,0 +1,62 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; snake_case names are split into their parts"""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def tool_document(tool: Dict[str, Any]) -> str:
+    """Text indexed for a tool: its name, description and argument names"""
+    parts = [tool["name"], tool.get("description") or ""]
+    for arg_name, arg_schema in tool["input_schema"].get("properties", {}).items():
+        parts.append(arg_name)
+        if isinstance(arg_schema, dict) and arg_schema.get("description"):
+            parts.append(arg_schema["description"])
+    return " ".join(parts)
+
+
+class ToolIndex:
+    """BM25 index over the tool catalog used to pick relevant tools per query"""
+
+    def __init__(self, tools: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.names = [tool["name"] for tool in tools]
+        self.term_freqs = [Counter(tokenize(tool_document(tool))) for tool in tools]
+        self.doc_lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_doc_length = (
+            sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        )
+
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(tools)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+    def score(self, query: str) -> List[float]:
+        """BM25 score of every indexed tool for the query"""
+        terms = [term for term in tokenize(query) if term in self.idf]
+        scores = []
+        for tf, length in zip(self.term_freqs, self.doc_lengths):
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term, 0)
+                if not freq:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / self.avg_doc_length)
+                score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[str]:
+        """Names of the top_k tools with a non-zero score, best first"""
+        ranked = sorted(zip(self.score(query), self.names), key=lambda pair: -pair[0])
+        return [name for score, name in ranked[:top_k] if score > 0]
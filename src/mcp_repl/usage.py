@@ -0,0 +1,189 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from mcp_repl.chat_compactor import estimate_tokens
+
+
+class BudgetExceededError(Exception):
+    """Raised when a session has used up its hard token budget"""
+
+
+@dataclass(frozen=True)
+class ModelPrices:
+    """List prices of a model in USD per million tokens"""
+
+    input: float
+    output: float
+    cache_write: float = 0.0
+    cache_read: float = 0.0
+
+
+# By model name prefix; the longest matching prefix wins
+MODEL_PRICES = {
+    "claude-3-5-sonnet": ModelPrices(3.0, 15.0, 3.75, 0.30),
+    "claude-3-7-sonnet": ModelPrices(3.0, 15.0, 3.75, 0.30),
+    "claude-3-5-haiku": ModelPrices(0.80, 4.0, 1.0, 0.08),
+    "claude-3-haiku": ModelPrices(0.25, 1.25, 0.30, 0.03),
+    "claude-3-opus": ModelPrices(15.0, 75.0, 18.75, 1.50),
+    "gpt-4o": ModelPrices(2.50, 10.0),
+    "gpt-4o-mini": ModelPrices(0.15, 0.60),
+}
+
+
+def model_prices(model: str | None) -> ModelPrices | None:
+    """Prices of a model, None when they are not known"""
+    matches = [prefix for prefix in MODEL_PRICES if (model or "").startswith(prefix)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+@dataclass
+class TurnUsage:
+    """Token usage of a single LLM request"""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    # Estimated prompt tokens attributed to each tool: its schema plus its results
+    tool_tokens: Dict[str, int] = field(default_factory=dict)
+    # Model that served the request, which determines its price
+    model: str | None = None
+
+    @property
+    def total_tokens(self) -> int:
+        return (
+            self.input_tokens
+            + self.output_tokens
+            + self.cache_creation_input_tokens
+            + self.cache_read_input_tokens
+        )
+
+
+def attribute_prompt_tokens(
+    available_tools: List[Dict[str, Any]], chat_history: List[Dict[str, Any]]
+) -> Dict[str, int]:
+    """Estimate how many prompt tokens each tool contributes
+
+    Counts the tool's schema in the request and every result of the tool
+    still present in the chat history.
+    """
+    tool_tokens = Counter()
+    for tool in available_tools:
+        tool_tokens[tool["name"]] += estimate_tokens(tool)
+
+    tool_names = {}
+    for message in chat_history:
+        if isinstance(message["content"], str):
+            continue
+        for block in message["content"]:
+            if getattr(block, "type", None) == "tool_use":
+                tool_names[block.id] = block.name
+            elif isinstance(block, dict) and block.get("type") == "tool_use":
+                tool_names[block["id"]] = block["name"]
+            elif isinstance(block, dict) and block.get("type") == "tool_result":
+                name = tool_names.get(block["tool_use_id"], "unknown")
+                tool_tokens[name] += estimate_tokens(block.get("content"))
+
+    return dict(tool_tokens)
+
+
+class UsageTracker:
+    """Per-turn token and cost accounting with soft and hard session budgets
+
+    Each turn is priced by the model that served it; the prices given here,
+    in USD per million tokens, apply to models with unknown prices and make
+    the cost an estimate.
+    """
+
+    def __init__(
+        self,
+        soft_budget: int | None = None,
+        hard_budget: int | None = None,
+        input_price: float = 3.0,
+        output_price: float = 15.0,
+        cache_write_price: float = 3.75,
+        cache_read_price: float = 0.30,
+    ):
+        self.soft_budget = soft_budget
+        self.hard_budget = hard_budget
+        self.input_price = input_price
+        self.output_price = output_price
+        self.cache_write_price = cache_write_price
+        self.cache_read_price = cache_read_price
+        self.turns: List[TurnUsage] = []
+
+    def record(
+        self,
+        usage: Any,
+        available_tools: List[Dict[str, Any]],
+        chat_history: List[Dict[str, Any]],
+        model: str | None = None,
+    ) -> TurnUsage:
+        """Record the usage reported by the API for one request"""
+        turn = TurnUsage(
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0)
+            or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            tool_tokens=attribute_prompt_tokens(available_tools, chat_history),
+            model=model,
+        )
+        self.turns.append(turn)
+        return turn
+
+    def totals(self) -> TurnUsage:
+        """Running totals over the session"""
+        totals = TurnUsage()
+        tool_tokens = Counter()
+        for turn in self.turns:
+            totals.input_tokens += turn.input_tokens
+            totals.output_tokens += turn.output_tokens
+            totals.cache_creation_input_tokens += turn.cache_creation_input_tokens
+            totals.cache_read_input_tokens += turn.cache_read_input_tokens
+            tool_tokens.update(turn.tool_tokens)
+        totals.tool_tokens = dict(tool_tokens)
+        return totals
+
+    def cost(self, turn: TurnUsage | None = None) -> float:
+        """Cost in USD of one turn, or of the whole session"""
+        if turn is None:
+            return sum(self.cost(turn) for turn in self.turns)
+        prices = model_prices(turn.model) or ModelPrices(
+            self.input_price,
+            self.output_price,
+            self.cache_write_price,
+            self.cache_read_price,
+        )
+        return (
+            turn.input_tokens * prices.input
+            + turn.output_tokens * prices.output
+            + turn.cache_creation_input_tokens * prices.cache_write
+            + turn.cache_read_input_tokens * prices.cache_read
+        ) / 1_000_000
+
+    def cost_is_estimate(self) -> bool:
+        """Whether some turn was served by a model with unknown prices"""
+        return any(model_prices(turn.model) is None for turn in self.turns)
+
+    def top_tools(self, n: int = 10) -> List[tuple[str, int]]:
+        """Tools that contributed the most prompt tokens over the session"""
+        return Counter(self.totals().tool_tokens).most_common(n)
+
+    def over_soft_budget(self) -> bool:
+        return (
+            self.soft_budget is not None
+            and self.totals().total_tokens >= self.soft_budget
+        )
+
+    def check_hard_budget(self):
+        """Refuse further requests once the hard budget is used up"""
+        if self.hard_budget is None:
+            return
+        used = self.totals().total_tokens
+        if used >= self.hard_budget:
+            raise BudgetExceededError(
+                f"Session token budget exhausted: "
+                f"{used} of {self.hard_budget} tokens used"
+            )
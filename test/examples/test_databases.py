@@ -6,6 +6,8 @@ from pathlib import Path
 
 import pytest
 
+from mcp_repl.chat_log import load_chat_history
+
 
 @pytest.fixture
 def config_path():
@@ -82,35 +84,34 @@ def test_mcp_repl_databases(mcp_process, chat_history_dir):
             if len(output) > 5000 or "Query ❯" in line:
                 break
 
-    chat_files = list(Path(chat_history_dir).glob("*.json"))
+    chat_files = list(Path(chat_history_dir).glob("*.jsonl"))
     assert chat_files, "No chat history files were created"
 
     latest_chat = max(chat_files, key=os.path.getctime)
 
-    with open(latest_chat, "r") as f:
-        chat_data = json.load(f)
-        print("\nchat_data")
-        print(chat_data)
-        print("\nchat_data")
-        assert len(chat_data) > 0, "Chat history is empty"
-
-        # Check if expected tables are in the chat history
-        chat_history_text = json.dumps(chat_data)
-        expected_tables = [
-            "customers",
-            "employees",
-            "inventory",
-            "orders",
-            "products",
-            "users",
-            "posts",
-            "comments",
-            "categories",
-            "tags",
-        ]
-        tables_in_history = [
-            table for table in expected_tables if table in chat_history_text
-        ]
-
-        missing_tables = set(expected_tables) - set(tables_in_history)
-        assert not missing_tables, f"Missing tables in chat history: {missing_tables}"
+    chat_data = load_chat_history(latest_chat)
+    print("\nchat_data")
+    print(chat_data)
+    print("\nchat_data")
+    assert len(chat_data) > 0, "Chat history is empty"
+
+    # Check if expected tables are in the chat history
+    chat_history_text = json.dumps(chat_data)
+    expected_tables = [
+        "customers",
+        "employees",
+        "inventory",
+        "orders",
+        "products",
+        "users",
+        "posts",
+        "comments",
+        "categories",
+        "tags",
+    ]
+    tables_in_history = [
+        table for table in expected_tables if table in chat_history_text
+    ]
+
+    missing_tables = set(expected_tables) - set(tables_in_history)
+    assert not missing_tables, f"Missing tables in chat history: {missing_tables}"
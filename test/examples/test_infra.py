@@ -6,6 +6,8 @@ from pathlib import Path
 
 import pytest
 
+from mcp_repl.chat_log import load_chat_history
+
 
 @pytest.fixture
 def config_path():
@@ -83,18 +85,19 @@ def test_mcp_repl_infra(mcp_process, chat_history_dir):
             if len(output) > 5000 or "Query ❯" in line:
                 break
 
-    chat_files = list(Path(chat_history_dir).glob("*.json"))
+    chat_files = list(Path(chat_history_dir).glob("*.jsonl"))
     assert chat_files, "No chat history files were created"
 
     latest_chat = max(chat_files, key=os.path.getctime)
 
-    with open(latest_chat, "r") as f:
-        chat_data = json.load(f)
-        print("\nchat_data")
-        print(chat_data)
-        print("\nchat_data")
-        assert len(chat_data) > 0, "Chat history is empty"
+    chat_data = load_chat_history(latest_chat)
+    print("\nchat_data")
+    print(chat_data)
+    print("\nchat_data")
+    assert len(chat_data) > 0, "Chat history is empty"
 
-        expected_pod_name = "postgresql-0"
-        chat_history_text = json.dumps(chat_data)
-        assert expected_pod_name in chat_history_text, f"Expected pod name {expected_pod_name} not found in chat history"
+    expected_pod_name = "postgresql-0"
+    chat_history_text = json.dumps(chat_data)
+    assert expected_pod_name in chat_history_text, (
+        f"Expected pod name {expected_pod_name} not found in chat history"
+    )
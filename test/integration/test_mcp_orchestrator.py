@@ -65,7 +65,7 @@ async def test_orchestrator_add_and_remove_servers(config_path):
     )
 
     assert len(orchestrator.list_servers()) == 1
-    assert len(orchestrator.available_tools) == 7
+    assert len(orchestrator.available_tools) == 8
 
     new_server = MCPServerConfig(
         path="./examples/infra/helm_server.py", id="helm_server_1"
@@ -73,10 +73,11 @@ async def test_orchestrator_add_and_remove_servers(config_path):
     await orchestrator.add_server(new_server)
 
     assert len(orchestrator.list_servers()) == 2
-    assert len(orchestrator.available_tools) == 15
+    assert len(orchestrator.available_tools) == 16
 
     await orchestrator.remove_server("helm_server_1")
     await orchestrator.remove_server("k8s_server_1")
 
     assert len(orchestrator.list_servers()) == 0
-    assert len(orchestrator.available_tools) == 0
+    # Only the orchestrator's built-in tools remain
+    assert len(orchestrator.available_tools) == 1
@@ -0,0 +1,168 @@
+import asyncio
+import json
+
+import pytest_asyncio
+from aiohttp import web
+
+from mcp_repl.loop_monitor import LoopLagMonitor
+
+
+class MockLLMServer:
+    """Local HTTP server speaking the Anthropic messages and OpenAI chat APIs
+
+    `delay` slows every response down, `status` makes every request fail
+    with that HTTP status and `tool_call` makes the model ask for a tool.
+    To act like a throttling API, `throttle_first` answers that many
+    requests with 429, and `max_concurrent` answers 429 to requests beyond
+    that many in flight; throttled responses carry `retry_after`.
+    """
+
+    def __init__(
+        self,
+        delay=0.0,
+        status=200,
+        text="hello",
+        tool_call=None,
+        throttle_first=0,
+        max_concurrent=None,
+        retry_after=None,
+    ):
+        self.delay = delay
+        self.status = status
+        self.text = text
+        self.tool_call = tool_call
+        self.throttle_first = throttle_first
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+        self.url = None
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/messages", self.anthropic_messages)
+        app.router.add_post("/v1/chat/completions", self.openai_completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    async def _receive(self, request):
+        self.requests.append(await request.json())
+        if len(self.requests) <= self.throttle_first or (
+            self.max_concurrent is not None and self.in_flight >= self.max_concurrent
+        ):
+            self.throttled += 1
+            headers = {}
+            if self.retry_after is not None:
+                headers["retry-after"] = str(self.retry_after)
+            return web.json_response(
+                {"type": "error", "error": {"type": "rate_limit_error"}},
+                status=429,
+                headers=headers,
+            )
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.status != 200:
+            return web.json_response(
+                {"type": "error", "error": {"type": "overloaded_error"}},
+                status=self.status,
+            )
+        return None
+
+    async def anthropic_messages(self, request):
+        error = await self._receive(request)
+        if error is not None:
+            return error
+        content = [{"type": "text", "text": self.text}]
+        if self.tool_call:
+            name, arguments = self.tool_call
+            content.append(
+                {"type": "tool_use", "id": "toolu_1", "name": name, "input": arguments}
+            )
+        return web.json_response(
+            {
+                "id": "msg_1",
+                "type": "message",
+                "role": "assistant",
+                "model": self.requests[-1]["model"],
+                "content": content,
+                "stop_reason": "tool_use" if self.tool_call else "end_turn",
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            }
+        )
+
+    async def openai_completions(self, request):
+        error = await self._receive(request)
+        if error is not None:
+            return error
+        message = {"role": "assistant", "content": self.text}
+        if self.tool_call:
+            name, arguments = self.tool_call
+            message["tool_calls"] = [
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }
+            ]
+        return web.json_response(
+            {
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": self.requests[-1]["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if self.tool_call else "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 12,
+                    "completion_tokens": 3,
+                    "total_tokens": 15,
+                },
+            }
+        )
+
+
+@pytest_asyncio.fixture
+async def mock_llm_server():
+    """Factory starting MockLLMServer instances, stopped after the test"""
+    servers = []
+
+    async def start(**behaviour):
+        server = MockLLMServer(**behaviour)
+        await server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        await server.stop()
+
+
+@pytest_asyncio.fixture
+async def loop_lag_monitor():
+    """LoopLagMonitor watching the test's event loop
+
+    Assert `loop_lag_monitor.blocked == 0` to catch code that blocks the loop.
+    """
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    yield monitor
+    await monitor.stop()
@@ -0,0 +1,80 @@
+from mcp_repl.chat_compactor import (
+    ELIDED_MARKER,
+    ChatHistoryCompactor,
+    estimate_tokens,
+    is_tool_result_message,
+)
+
+
+def make_turn(i, payload_size=4000):
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {
+            "role": "assistant",
+            "content": [
+                {
+                    "type": "tool_use",
+                    "id": f"tu_{i}",
+                    "name": "k8s_get_pod_logs",
+                    "input": {},
+                }
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": f"tu_{i}",
+                    "content": "x" * payload_size,
+                }
+            ],
+        },
+        {"role": "assistant", "content": [{"type": "text", "text": f"answer {i}"}]},
+    ]
+
+
+def test_compact_under_budget_is_noop():
+    history = make_turn(0, payload_size=10)
+    compactor = ChatHistoryCompactor(max_tokens=10_000)
+
+    assert compactor.compact(history) is history
+
+
+def test_compact_elides_old_tool_results_first():
+    history = make_turn(0) + make_turn(1) + make_turn(2)
+    compactor = ChatHistoryCompactor(max_tokens=2500, keep_recent_turns=1)
+
+    compacted = compactor.compact(history)
+
+    assert len(compacted) == len(history)
+    assert compacted[2]["content"][0]["content"].startswith(ELIDED_MARKER)
+    assert compacted[2]["content"][0]["tool_use_id"] == "tu_0"
+    # Recent turn is untouched
+    assert compacted[-2] is history[-2]
+    # Originals are not mutated
+    assert history[2]["content"][0]["content"] == "x" * 4000
+    assert estimate_tokens(compacted) <= 2500
+
+
+def test_compact_drops_whole_turns_when_eliding_is_not_enough():
+    history = make_turn(0) + make_turn(1) + make_turn(2, payload_size=8000)
+    compactor = ChatHistoryCompactor(max_tokens=2100, keep_recent_turns=1)
+
+    compacted = compactor.compact(history)
+
+    assert compacted[0] == {"role": "user", "content": "question 2"}
+    tool_use_ids = {
+        block["id"]
+        for message in compacted
+        if message["role"] == "assistant"
+        for block in message["content"]
+        if block["type"] == "tool_use"
+    }
+    tool_result_ids = {
+        block["tool_use_id"]
+        for message in compacted
+        if is_tool_result_message(message)
+        for block in message["content"]
+    }
+    assert tool_use_ids == tool_result_ids == {"tu_2"}
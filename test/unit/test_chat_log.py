@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from anthropic.types import TextBlock
+
+from mcp_repl.chat_log import ChatLogWriter, load_chat_history
+
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "never"])
+def test_chat_log_appends_messages(tmp_path, fsync):
+    path = tmp_path / "chat.jsonl"
+    writer = ChatLogWriter(str(path), fsync=fsync, batch_size=2)
+
+    writer.append_message({"role": "user", "content": "hi"})
+    writer.append_message(
+        {"role": "assistant", "content": [TextBlock(type="text", text="hello")]}
+    )
+    writer.append_message({"role": "user", "content": "bye"})
+    writer.close()
+
+    assert len(path.read_text().splitlines()) == 3
+    history = load_chat_history(str(path))
+    assert [message["role"] for message in history] == ["user", "assistant", "user"]
+    assert history[1]["content"][0]["text"] == "hello"
+
+
+def test_chat_log_reopens_in_append_mode(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    for content in ["first", "second"]:
+        writer = ChatLogWriter(str(path))
+        writer.append_message({"role": "user", "content": content})
+        writer.close()
+
+    assert [m["content"] for m in load_chat_history(str(path))] == ["first", "second"]
+
+
+def test_chat_log_without_events_creates_no_file(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    ChatLogWriter(str(path)).close()
+
+    assert not path.exists()
+
+
+def test_load_legacy_json_history(tmp_path):
+    path = tmp_path / "chat.json"
+    path.write_text(json.dumps([{"role": "user", "content": "hi"}], indent=2))
+
+    assert load_chat_history(str(path)) == [{"role": "user", "content": "hi"}]
+
+
+def test_chat_log_rejects_unknown_fsync_policy(tmp_path):
+    with pytest.raises(ValueError, match="fsync must be one of"):
+        ChatLogWriter(str(tmp_path / "chat.jsonl"), fsync="sometimes")
+
+
+def test_chat_log_write_failure_is_reported_on_close(tmp_path):
+    path = tmp_path / "chat.jsonl"
+    path.mkdir()
+    writer = ChatLogWriter(str(path), flush_interval=0.01)
+    writer.append_message({"role": "user", "content": "hi"})
+    writer._thread.join()
+
+    writer.append_message({"role": "user", "content": "bye"})
+    assert writer._queue.empty()
+    with pytest.raises(IsADirectoryError):
+        writer.close()
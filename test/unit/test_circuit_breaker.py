@@ -0,0 +1,176 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from mcp.types import CallToolResult, TextContent, Tool
+
+from mcp_repl.circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitState
+from mcp_repl.mcp_orchestrator import MCPOrchestrator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(**settings):
+    clock = FakeClock()
+    config = CircuitBreakerConfig(min_calls=4, open_seconds=10, **settings)
+    return CircuitBreaker(config, clock=clock), clock
+
+
+def test_opens_on_failure_rate_and_recovers_through_half_open():
+    breaker, clock = make_breaker()
+    for failed in (False, True, False, True):
+        assert breaker.allow()
+        breaker.record(0.1, failed)
+
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == CircuitState.HALF_OPEN
+    # Only one trial call at a time
+    assert not breaker.allow()
+    breaker.record(0.1, failed=False)
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_again():
+    breaker, clock = make_breaker()
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record(0.1, failed=True)
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.retry_in() == 10
+    assert breaker.times_opened == 2
+
+
+def test_slow_calls_count_as_failures():
+    breaker, _ = make_breaker(slow_call_seconds=1.0)
+    for _ in range(3):
+        breaker.record(0.1, failed=False)
+    assert breaker.state == CircuitState.CLOSED
+    for _ in range(3):
+        breaker.record(5.0, failed=False)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_half_open_breaker_gives_a_real_wait_time():
+    breaker, clock = make_breaker(slow_call_seconds=5)
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    clock.now = 10
+    assert breaker.allow()
+
+    clock.now = 12
+    assert not breaker.allow()
+    assert breaker.retry_in() == 3
+    clock.now = 30
+    assert breaker.retry_in() == 1
+
+
+def test_cancelled_trial_is_released():
+    breaker, clock = make_breaker()
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    clock.now = 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def make_orchestrator(**settings):
+    orchestrator = MCPOrchestrator()
+    session = AsyncMock()
+    session.call_tool.return_value = CallToolResult(
+        content=[TextContent(type="text", text="connection refused")], isError=True
+    )
+    settings = {"count_error_results": True, **settings}
+    orchestrator.breaker_configs["db"] = CircuitBreakerConfig(min_calls=2, **settings)
+    orchestrator.sessions = {
+        "db": {
+            "session": session,
+            "tools": [
+                Tool(name="query", inputSchema={}),
+                Tool(name="tables", inputSchema={}),
+            ],
+            "server_info": {},
+            "server_id": "db",
+            "server_path": "./db.py",
+        }
+    }
+    orchestrator._update_available_tools()
+    return orchestrator, session
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast_without_calling_server():
+    orchestrator, session = make_orchestrator()
+    await orchestrator.call_tool("db_query", {})
+    await orchestrator.call_tool("db_tables", {})
+    assert orchestrator.circuit_status("db").startswith("open")
+
+    result = await orchestrator.call_tool("db_query", {})
+
+    assert result.isError
+    assert "circuit breaker is open" in result.content[0].text
+    assert session.call_tool.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_per_tool_breakers_are_independent():
+    orchestrator, session = make_orchestrator(per_tool=True)
+    await orchestrator.call_tool("db_query", {})
+    await orchestrator.call_tool("db_query", {})
+
+    assert orchestrator.circuit_status("db").startswith("query: open")
+    await orchestrator.call_tool("db_tables", {})
+    assert session.call_tool.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_disabled_breaker_always_calls_server():
+    orchestrator, session = make_orchestrator(enabled=False)
+    for _ in range(5):
+        await orchestrator.call_tool("db_query", {})
+    assert session.call_tool.await_count == 5
+    assert orchestrator.circuit_status("db") == "disabled"
+
+
+@pytest.mark.asyncio
+async def test_error_results_do_not_open_breaker_by_default():
+    orchestrator, session = make_orchestrator(count_error_results=False)
+    for _ in range(3):
+        result = await orchestrator.call_tool("db_query", {})
+    assert result.content[0].text == "connection refused"
+    assert orchestrator.circuit_status("db") == "closed (0/3 failed)"
+
+    session.call_tool.side_effect = ConnectionError("server gone")
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await orchestrator.call_tool("db_query", {})
+    assert orchestrator.circuit_status("db").startswith("open")
+
+
+@pytest.mark.asyncio
+async def test_calls_during_trial_are_told_how_long_to_wait():
+    orchestrator, _ = make_orchestrator(open_seconds=0, slow_call_seconds=20)
+    await orchestrator.call_tool("db_query", {})
+    await orchestrator.call_tool("db_query", {})
+    breaker = orchestrator.breaker_for("db", "query")
+    assert breaker.allow()
+
+    result = await orchestrator.call_tool("db_query", {})
+
+    assert "half-open" in result.content[0].text
+    assert "do not retry for 20 seconds" in result.content[0].text
@@ -0,0 +1,191 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from mcp.types import CallToolResult, TextContent, Tool
+
+from mcp_repl import daemon as daemon_module
+from mcp_repl.daemon import FairScheduler, OrchestratorDaemon, RemoteOrchestrator
+from mcp_repl.mcp_orchestrator import MCPOrchestrator
+from mcp_repl.metrics import LatencyStats, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_latency_stats_summary():
+    stats = LatencyStats(max_samples=10)
+    for ms in range(1, 21):
+        stats.record(ms / 1000)
+
+    summary = stats.summary()
+
+    assert summary["count"] == 20
+    assert summary["mean_ms"] == pytest.approx(10.5)
+    # Percentiles only cover the retained window
+    assert summary["p50_ms"] == pytest.approx(15)
+    assert summary["max_ms"] == pytest.approx(20)
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_round_robins_clients():
+    scheduler = FairScheduler(max_concurrency=1)
+    order = []
+
+    def job(name):
+        async def run():
+            order.append(name)
+            return name
+
+        return run
+
+    submissions = [scheduler.submit("a", job(f"a{i}")) for i in range(3)]
+    submissions += [scheduler.submit("b", job(f"b{i}")) for i in range(2)]
+    tasks = [asyncio.create_task(submission) for submission in submissions]
+    await asyncio.sleep(0)
+    scheduler.start()
+
+    results = await asyncio.gather(*tasks)
+    await scheduler.stop()
+
+    assert order == ["a0", "b0", "a1", "b1", "a2"]
+    assert results == ["a0", "a1", "a2", "b0", "b1"]
+
+
+@pytest.fixture
+def local_orchestrator():
+    orchestrator = MCPOrchestrator()
+    session = MagicMock()
+    session.call_tool = AsyncMock(
+        return_value=CallToolResult(content=[TextContent(type="text", text="pong")])
+    )
+    orchestrator.sessions["srv"] = {
+        "session": session,
+        "tools": [
+            Tool(
+                name="ping",
+                description="Ping the server",
+                inputSchema={"type": "object", "properties": {}},
+            )
+        ],
+        "server_info": None,
+        "server_id": "srv",
+        "server_path": "srv.py",
+    }
+    orchestrator._update_available_tools()
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_remote_orchestrator_calls_tools_through_daemon(
+    tmp_path, local_orchestrator
+):
+    daemon = OrchestratorDaemon(local_orchestrator, str(tmp_path / "daemon.sock"))
+    await daemon.start()
+    try:
+        remote = await RemoteOrchestrator.attach(daemon.socket_path)
+
+        assert [name for name, _, _ in remote.tools] == [
+            name for name, _, _ in local_orchestrator.tools
+        ]
+
+        result = await remote.call_tool("srv_ping", {})
+        await remote.refresh()
+        assert result.content[0].text == "pong"
+        # The daemon's breaker guards the call, none is kept in the client
+        assert remote.breakers == {}
+        assert remote.circuit_status("srv") == "closed (0/1 failed)"
+        local_orchestrator.sessions["srv"][
+            "session"
+        ].call_tool.assert_awaited_once_with("ping", {})
+
+        stats = await remote.daemon_stats()
+        (client,) = stats["clients"].values()
+        assert client["calls"] == 1
+        assert client["errors"] == 0
+        assert client["latency"]["count"] == 1
+        assert stats["event_loop"]["blocked"] == 0
+
+        await remote.cleanup()
+    finally:
+        await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_daemon_survives_oversized_messages(
+    tmp_path, local_orchestrator, monkeypatch
+):
+    monkeypatch.setattr(daemon_module, "STREAM_LIMIT", 4096)
+    local_orchestrator.sessions["srv"][
+        "session"
+    ].call_tool.return_value = CallToolResult(
+        content=[TextContent(type="text", text="x" * 8192)]
+    )
+    daemon = OrchestratorDaemon(local_orchestrator, str(tmp_path / "daemon.sock"))
+    await daemon.start()
+    try:
+        reader, writer = await asyncio.open_unix_connection(
+            daemon.socket_path, limit=4096
+        )
+        writer.write(b'{"id": 1, "op": "hello", "params": {"pad": "' + b"x" * 10000)
+        writer.write(b'"}}\n{"id": 2, "op": "hello"}\n')
+        assert json.loads(await reader.readline())["id"] is None
+        assert json.loads(await reader.readline())["id"] == 2
+        writer.close()
+
+        remote = await RemoteOrchestrator.attach(daemon.socket_path)
+        with pytest.raises(ValueError, match="exceeds the daemon protocol limit"):
+            await remote.call_tool("srv_ping", {"pad": "x" * 8192})
+        with pytest.raises(ValueError, match="exceeds the daemon protocol limit"):
+            await remote.call_tool("srv_ping", {})
+        assert (await remote.daemon_stats())["clients"]
+        await remote.cleanup()
+    finally:
+        await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_daemon_answers_malformed_requests(tmp_path, local_orchestrator):
+    daemon = OrchestratorDaemon(local_orchestrator, str(tmp_path / "daemon.sock"))
+    await daemon.start()
+    try:
+        reader, writer = await asyncio.open_unix_connection(daemon.socket_path)
+        writer.write(b'[1, 2]\n{"id": 1, "op": "hello", "params": 3}\n')
+        writer.write(b'{"id": 2, "op": "hello"}\n')
+        for expected_id in [None, None, 2]:
+            response = json.loads(await reader.readline())
+            assert response["id"] == expected_id
+        assert "error" not in response
+        writer.close()
+    finally:
+        await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_daemon_refuses_a_live_socket_and_replaces_a_stale_one(
+    tmp_path, local_orchestrator
+):
+    socket_path = str(tmp_path / "run" / "daemon.sock")
+    daemon = OrchestratorDaemon(local_orchestrator, socket_path)
+    await daemon.start()
+    try:
+        with pytest.raises(ValueError, match="already listening"):
+            await OrchestratorDaemon(local_orchestrator, socket_path).start()
+        remote = await RemoteOrchestrator.attach(socket_path)
+        await remote.cleanup()
+    finally:
+        await daemon.stop()
+
+    # A socket file nobody answers on is left behind by a daemon that died
+    server = await asyncio.start_unix_server(lambda r, w: None, path=socket_path)
+    server.close()
+    await server.wait_closed()
+    daemon = OrchestratorDaemon(local_orchestrator, socket_path)
+    await daemon.start()
+    await daemon.stop()
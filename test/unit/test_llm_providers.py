@@ -0,0 +1,163 @@
+import pytest
+from anthropic.types import TextBlock, ToolUseBlock
+from mcp.types import TextContent
+
+from mcp_repl.llm_providers import (
+    AnthropicProvider,
+    LLMProvider,
+    OpenAIProvider,
+    ProviderChain,
+    parse_tool_arguments,
+    provider_from_spec,
+    to_openai_messages,
+    to_openai_tools,
+)
+from mcp_repl.schema_validator import UNPARSED_ARGUMENTS
+
+REQUEST = {
+    "system": "be brief",
+    "messages": [{"role": "user", "content": "hi"}],
+    "tools": [],
+    "max_tokens": 100,
+}
+
+
+def anthropic(server, **kwargs):
+    return AnthropicProvider(base_url=server.url, api_key="test", **kwargs)
+
+
+def openai(server, **kwargs):
+    return OpenAIProvider(base_url=f"{server.url}/v1", api_key="test", **kwargs)
+
+
+def test_to_openai_messages_translates_tool_use_and_results():
+    history = [
+        {"role": "user", "content": "list pods"},
+        {
+            "role": "assistant",
+            "content": [
+                TextBlock(type="text", text="checking"),
+                ToolUseBlock(
+                    type="tool_use", id="tu_1", name="k8s_get_pods", input={"ns": "a"}
+                ),
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": "tu_1",
+                    "content": [TextContent(type="text", text="pod-1")],
+                }
+            ],
+        },
+    ]
+
+    messages = to_openai_messages("sys", history)
+
+    assert messages == [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "list pods"},
+        {
+            "role": "assistant",
+            "content": "checking",
+            "tool_calls": [
+                {
+                    "id": "tu_1",
+                    "type": "function",
+                    "function": {"name": "k8s_get_pods", "arguments": '{"ns": "a"}'},
+                }
+            ],
+        },
+        {"role": "tool", "tool_call_id": "tu_1", "content": "pod-1"},
+    ]
+
+
+def test_to_openai_tools():
+    tool = {
+        "name": "srv_ping",
+        "description": "Ping",
+        "input_schema": {"type": "object"},
+    }
+
+    assert to_openai_tools([tool]) == [
+        {
+            "type": "function",
+            "function": {
+                "name": "srv_ping",
+                "description": "Ping",
+                "parameters": {"type": "object"},
+            },
+        }
+    ]
+
+
+def test_provider_from_spec():
+    provider = provider_from_spec("anthropic:claude-3-5-haiku-20241022", timeout=5)
+
+    assert provider.label == "anthropic:claude-3-5-haiku-20241022"
+    assert provider.timeout == 5
+    with pytest.raises(ValueError):
+        provider_from_spec("cohere")
+    with pytest.raises(TypeError):
+        LLMProvider()
+
+
+def test_parse_tool_arguments_keeps_malformed_json():
+    assert parse_tool_arguments('{"x": 1}') == {"x": 1}
+    assert parse_tool_arguments(None) == {}
+    assert parse_tool_arguments('{"x": ') == {UNPARSED_ARGUMENTS: '{"x": '}
+    assert parse_tool_arguments("[1]") == {UNPARSED_ARGUMENTS: "[1]"}
+
+
+@pytest.mark.asyncio
+async def test_openai_response_is_translated_to_anthropic_format(mock_llm_server):
+    server = await mock_llm_server(tool_call=("srv_ping", {"x": 1}))
+
+    response = await ProviderChain([openai(server)]).create(**REQUEST)
+
+    assert [block.type for block in response.content] == ["text", "tool_use"]
+    assert response.content[1].name == "srv_ping"
+    assert response.content[1].input == {"x": 1}
+    assert response.stop_reason == "tool_use"
+    assert response.usage.input_tokens == 12
+
+
+@pytest.mark.asyncio
+async def test_chain_falls_back_on_overload(mock_llm_server):
+    overloaded = await mock_llm_server(status=529)
+    healthy = await mock_llm_server(text="from fallback")
+    chain = ProviderChain([anthropic(overloaded), openai(healthy)])
+
+    response = await chain.create(**REQUEST)
+
+    assert response.content[0].text == "from fallback"
+    assert chain.last_provider is chain.providers[1]
+    assert chain.providers[0].errors == 1
+    assert chain.fallbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_chain_hedges_when_latency_slo_is_exceeded(mock_llm_server):
+    slow = await mock_llm_server(delay=1.0, text="slow")
+    fast = await mock_llm_server(text="fast")
+    chain = ProviderChain([anthropic(slow), anthropic(fast)], latency_slo=0.2)
+
+    response = await chain.create(**REQUEST)
+
+    assert response.content[0].text == "fast"
+    assert chain.fallbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_chain_raises_last_error_and_respects_timeouts(mock_llm_server):
+    slow = await mock_llm_server(delay=1.0)
+    chain = ProviderChain([anthropic(slow, timeout=0.2)])
+
+    with pytest.raises(Exception) as error:
+        await chain.create(**REQUEST)
+
+    assert chain.providers[0].errors == 1
+    assert chain.providers[0].latency.summary()["max_ms"] < 1000
+    assert error.type.__name__ in ("TimeoutError", "APITimeoutError")
@@ -0,0 +1,81 @@
+import json
+import logging
+import logging.handlers
+import threading
+
+import pytest
+
+from mcp_repl.logging_pipeline import (
+    SamplingFilter,
+    parse_logger_values,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def make_record(name, level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, "msg %s", ("x",), None)
+
+
+def test_sampling_applies_to_children_and_spares_warnings():
+    sampling = SamplingFilter(sample_rates={"mcp": 0.0})
+
+    assert not sampling.filter(make_record("mcp.client.session"))
+    assert sampling.filter(make_record("mcp.client.session", logging.WARNING))
+    assert sampling.filter(make_record("mcpx"))
+    assert sampling.dropped == {"mcp.client.session": 1}
+
+
+def test_rate_limit_drops_records_over_the_budget():
+    sampling = SamplingFilter(rate_limits={"httpx": 2})
+
+    kept = [sampling.filter(make_record("httpx")) for _ in range(10)]
+
+    assert kept.count(True) == 2
+    assert sampling.dropped["httpx"] == 8
+
+
+def test_sampling_filter_counts_consistently_across_threads():
+    sampling = SamplingFilter(sample_rates={"mcp": 0.5}, rate_limits={"mcp": 1e6})
+    kept = []
+
+    def log():
+        kept.append(sum(sampling.filter(make_record("mcp.x")) for _ in range(2000)))
+
+    threads = [threading.Thread(target=log) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(kept) + sampling.dropped_counts()["mcp.x"] == 8 * 2000
+
+
+def test_parse_logger_values():
+    assert parse_logger_values(["httpx=0.1", "=5"]) == {"httpx": 0.1, "": 5.0}
+    with pytest.raises(ValueError):
+        parse_logger_values(["httpx"])
+
+
+def test_setup_logging_writes_json_lines_through_the_queue(tmp_path):
+    log_file = tmp_path / "repl.log"
+    try:
+        root = setup_logging(log_file=str(log_file), rate_limits={"noisy": 1})
+        assert len(root.handlers) == 1
+
+        logging.getLogger("mcp_repl.test").info("hello %s", "world")
+        for _ in range(5):
+            logging.getLogger("noisy").info("spam")
+        shutdown_logging()
+        assert not any(
+            isinstance(handler, logging.handlers.QueueHandler)
+            for handler in root.handlers
+        )
+
+        records = [json.loads(line) for line in log_file.read_text().splitlines()]
+        assert records[0]["message"] == "hello world"
+        assert records[0]["logger"] == "mcp_repl.test"
+        assert [r["message"] for r in records].count("spam") == 1
+        assert "Dropped log records" in records[-1]["message"]
+    finally:
+        setup_logging()
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp_repl.chat_log import ChatLogWriter
+from mcp_repl.llm_client import LLMClient
+from mcp_repl.llm_providers import AnthropicProvider, ProviderChain
+from mcp_repl.loop_monitor import LoopLagMonitor
+
+
+async def blocking_handler():
+    time.sleep(0.2)
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_caught_with_its_stack(loop_lag_monitor):
+    await asyncio.sleep(0.05)
+    await blocking_handler()
+    await asyncio.sleep(0.05)
+
+    summary = loop_lag_monitor.summary()
+    assert loop_lag_monitor.blocked == 1
+    assert summary["max_ms"] >= 150
+    event = summary["events"][0]
+    assert event["frame"].endswith("in blocking_handler")
+    assert event["blocked_ms"] >= 150
+    assert any("blocking_handler" in line for line in event["stack"])
+
+
+@pytest.mark.asyncio
+async def test_async_waits_do_not_count_as_blocking(loop_lag_monitor):
+    await asyncio.gather(*(asyncio.sleep(0.1) for _ in range(100)))
+
+    assert loop_lag_monitor.blocked == 0
+    assert loop_lag_monitor.lag.count > 0
+
+
+@pytest.mark.asyncio
+async def test_llm_requests_and_chat_log_do_not_block_the_loop(
+    mock_llm_server, tmp_path
+):
+    server = await mock_llm_server(delay=0.2)
+    # Creating the HTTP client loads CA certificates, once, at startup
+    provider = AnthropicProvider(base_url=server.url, api_key="test")
+    client = LLMClient(providers=ProviderChain([provider]))
+    chat_log = ChatLogWriter(str(tmp_path / "chat.jsonl"), fsync="always")
+    client.message_listeners.append(chat_log.append_message)
+    await client.add_user_message("warm up")
+    await client.get_llm_response([])
+
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    for _ in range(3):
+        for _ in range(20):
+            await client.add_user_message("x" * 10_000)
+        await client.get_llm_response([])
+    await monitor.stop()
+    chat_log.close()
+
+    assert monitor.lag.count > 0
+    assert monitor.blocked == 0, monitor.summary()["events"]
@@ -1,8 +1,10 @@
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from mcp.types import Tool
 
 from mcp_repl.mcp_orchestrator import MCPOrchestrator, MCPServerConfig
+from mcp_repl.schema_validator import UNPARSED_ARGUMENTS
 
 
 @pytest.mark.asyncio
@@ -83,3 +85,149 @@ async def test_mcp_orchestrator_call_tool_not_found():
         ValueError, match="Tool 'nonexistent_tool' not found in any connected server"
     ):
         await orchestrator.call_tool("nonexistent_tool", {})
+
+
+@pytest.mark.asyncio
+async def test_mcp_orchestrator_builtin_read_result(tmp_path):
+    orchestrator = MCPOrchestrator()
+    orchestrator.result_store.root_dir = tmp_path
+    orchestrator._update_available_tools()
+    handle = orchestrator.result_store.put("alpha\nbeta\ngamma")
+
+    result = await orchestrator.call_tool(
+        "repl_read_result", {"handle": handle, "pattern": "beta"}
+    )
+
+    assert not result.isError
+    assert result.content[0].text.splitlines()[1] == "2: beta"
+
+    result = await orchestrator.call_tool("repl_read_result", {"handle": "0" * 16})
+    assert result.isError
+
+    result = await orchestrator.call_tool(
+        "repl_read_result", {"handle": handle, "pattern": "[unclosed"}
+    )
+    assert result.isError
+    assert "Invalid pattern" in result.content[0].text
+
+
+def test_mcp_orchestrator_select_tools():
+    orchestrator = MCPOrchestrator()
+    orchestrator.sessions = {
+        server_id: {
+            "session": AsyncMock(),
+            "tools": [
+                Tool(name=name, description=description, inputSchema={})
+                for name, description in tools
+            ],
+            "server_info": {},
+            "server_id": server_id,
+            "server_path": f"./{server_id}.py",
+        }
+        for server_id, tools in {
+            "k8s": [
+                ("get_pod_logs", "Get pod logs"),
+                ("get_namespaces", "List namespaces"),
+            ],
+            "redis": [("list_keys", "List redis keys")],
+        }.items()
+    }
+    orchestrator._update_available_tools()
+
+    assert orchestrator.select_tools("pod logs") == orchestrator.available_tools
+
+    orchestrator.tool_top_k = 1
+    names = [tool["name"] for tool in orchestrator.select_tools("pod logs")]
+    assert names == ["k8s_get_pod_logs", "repl_read_result"]
+
+    orchestrator.pinned_servers = {"redis"}
+    names = [
+        tool["name"]
+        for tool in orchestrator.select_tools(
+            "pod logs", used_tools={"k8s_get_namespaces"}
+        )
+    ]
+    assert names == [
+        "k8s_get_pod_logs",
+        "k8s_get_namespaces",
+        "redis_list_keys",
+        "repl_read_result",
+    ]
+
+
+def test_mcp_orchestrator_is_read_only():
+    orchestrator = MCPOrchestrator()
+    orchestrator.read_only_patterns = {"k8s": ["get_*"]}
+    orchestrator.sessions = {
+        "k8s": {
+            "session": AsyncMock(),
+            "tools": [
+                Tool(name="get_pod_logs", inputSchema={}),
+                Tool(name="delete_pod", inputSchema={}),
+                Tool(
+                    name="list_nodes",
+                    inputSchema={},
+                    annotations={"readOnlyHint": True},
+                ),
+            ],
+            "server_info": {},
+            "server_id": "k8s",
+            "server_path": "./k8s.py",
+        }
+    }
+    orchestrator._update_available_tools()
+
+    assert orchestrator.is_read_only("k8s_get_pod_logs")
+    assert orchestrator.is_read_only("k8s_list_nodes")
+    assert orchestrator.is_read_only("repl_read_result")
+    assert not orchestrator.is_read_only("k8s_delete_pod")
+    assert not orchestrator.is_read_only("unknown_tool")
+
+
+@pytest.mark.asyncio
+async def test_mcp_orchestrator_validates_arguments_before_dispatch():
+    orchestrator = MCPOrchestrator()
+    session = AsyncMock()
+    orchestrator.sessions = {
+        "k8s": {
+            "session": session,
+            "tools": [
+                Tool(
+                    name="get_pod_logs",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "pod_name": {"type": "string"},
+                            "tail_lines": {"type": "integer", "default": 100},
+                        },
+                        "required": ["pod_name"],
+                    },
+                )
+            ],
+            "server_info": {},
+            "server_id": "k8s",
+            "server_path": "./k8s.py",
+        }
+    }
+    orchestrator._update_available_tools()
+
+    result = await orchestrator.call_tool("k8s_get_pod_logs", {"pod_name": 1})
+
+    assert result.isError
+    assert result.content[0].text == (
+        "Invalid arguments for k8s_get_pod_logs: "
+        "$.pod_name: expected string, got integer"
+    )
+    session.call_tool.assert_not_awaited()
+
+    result = await orchestrator.call_tool(
+        "k8s_get_pod_logs", {UNPARSED_ARGUMENTS: '{"pod_name": '}
+    )
+    assert result.isError
+    assert "not valid JSON" in result.content[0].text
+    session.call_tool.assert_not_awaited()
+
+    await orchestrator.call_tool("k8s_get_pod_logs", {"pod_name": "web"})
+    session.call_tool.assert_awaited_once_with(
+        "get_pod_logs", {"pod_name": "web", "tail_lines": 100}
+    )
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from mcp_repl.memory_monitor import (
+    MemoryMonitor,
+    child_processes,
+    format_bytes,
+    history_size,
+    read_rss,
+)
+
+HISTORY = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def server_process(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text("import time\ntime.sleep(60)\n")
+    process = subprocess.Popen([sys.executable, str(script)])
+    yield str(script), process
+    process.kill()
+    process.wait()
+
+
+def test_read_rss_and_history_size():
+    assert read_rss(os.getpid()) > 1024 * 1024
+    assert read_rss(2**22 + 1) is None
+    assert history_size(HISTORY)["messages"] == 2
+    assert format_bytes(1536) == "1.5 KiB"
+    assert format_bytes(None) == "-"
+
+
+def test_report_matches_server_processes(server_process):
+    script, process = server_process
+    sessions = {"k8s": {"server_path": script}, "gone": {"server_path": "gone.py"}}
+
+    report = MemoryMonitor().report(HISTORY, sessions)
+
+    assert process.pid in child_processes(os.getpid())
+    servers = {server["server_id"]: server for server in report["servers"]}
+    assert servers["k8s"]["pid"] == process.pid
+    assert servers["k8s"]["rss"] > 0
+    assert servers["gone"]["pid"] is None
+    assert report["connected_sessions"] == 2
+    assert report["history"]["messages"] == 2
+    assert not any(p["pid"] == process.pid for p in report["other_subprocesses"])
+
+
+def allocate():
+    return [bytearray(1024) for _ in range(2000)]
+
+
+def test_top_allocators_show_growth_since_baseline():
+    monitor = MemoryMonitor()
+    monitor.start_tracing()
+    try:
+        retained = allocate()  # noqa: F841
+        top = monitor.top_allocators(limit=3)
+    finally:
+        monitor.stop_tracing()
+
+    assert top[0]["location"] == f"{__file__}:{allocate.__code__.co_firstlineno + 1}"
+    assert top[0]["size_diff"] >= 2000 * 1024
+
+
+def test_growth_from_samples():
+    clock = FakeClock()
+    monitor = MemoryMonitor(clock=clock)
+    monitor.sample(HISTORY)
+    assert monitor.growth() is None
+
+    clock.now = 60
+    monitor.sample(HISTORY)
+    monitor.samples[0]["rss"] = monitor.samples[1]["rss"] - 1000
+
+    growth = monitor.growth()
+    assert growth["rss_bytes"] == 1000
+    assert growth["rss_bytes_per_hour"] == 60_000
+
+
+@pytest.mark.asyncio
+async def test_periodic_sampling():
+    monitor = MemoryMonitor(sample_interval=0.01)
+    monitor.start(lambda: HISTORY)
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+    assert len(monitor.samples) >= 2
+    assert monitor.samples[-1]["history_messages"] == 2
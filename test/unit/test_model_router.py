@@ -0,0 +1,128 @@
+import pytest
+
+from mcp_repl.llm_client import LLMClient
+from mcp_repl.llm_providers import AnthropicProvider, ProviderChain
+from mcp_repl.model_router import FAST_TIER, LARGE_TIER, ModelRouter
+
+TOOLS = [
+    {
+        "name": "k8s_get_pods",
+        "description": "",
+        "input_schema": {"type": "object", "properties": {}},
+    }
+]
+
+
+def chain(server):
+    provider = AnthropicProvider(base_url=server.url, api_key="test")
+    return ProviderChain([provider], max_retries=0)
+
+
+async def make_client(mock_llm_server, validate_tool_call=None, **fast_behaviour):
+    fast = await mock_llm_server(text="fast", **fast_behaviour)
+    large = await mock_llm_server(text="large")
+    router = ModelRouter(
+        fast=chain(fast),
+        large=chain(large),
+        fast_max_tokens=200,
+        short_query_chars=50,
+        validate_tool_call=validate_tool_call,
+    )
+    return LLMClient(providers=router.tiers[LARGE_TIER], router=router), fast, large
+
+
+async def add_tool_result(client):
+    await client.add_user_message("what is running?")
+    await client.add_assistant_message(
+        [{"type": "tool_use", "id": "tu_1", "name": "k8s_get_pods", "input": {}}]
+    )
+    client.chat_history.append(
+        {
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": "tu_1", "content": "pod-1"}
+            ],
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_short_query_is_answered_by_fast_model(mock_llm_server):
+    client, fast, large = await make_client(mock_llm_server)
+    await client.add_user_message("hi")
+
+    response = await client.get_llm_response(TOOLS)
+
+    assert response.content[0].text == "fast"
+    assert fast.requests[0]["max_tokens"] == 200
+    assert large.requests == []
+
+
+@pytest.mark.asyncio
+async def test_long_query_goes_to_large_model(mock_llm_server):
+    client, fast, large = await make_client(mock_llm_server)
+    await client.add_user_message("explain " * 20)
+
+    response = await client.get_llm_response(TOOLS)
+
+    assert response.content[0].text == "large"
+    assert fast.requests == []
+    assert large.requests[0]["max_tokens"] == client.max_tokens
+
+
+@pytest.mark.asyncio
+async def test_tool_selection_step_stays_on_fast_model(mock_llm_server):
+    client, _, large = await make_client(
+        mock_llm_server, tool_call=("k8s_get_pods", {})
+    )
+    await add_tool_result(client)
+
+    response = await client.get_llm_response(TOOLS)
+
+    assert response.content[-1].name == "k8s_get_pods"
+    assert large.requests == []
+    assert client.router.stats[FAST_TIER].latency.count == 1
+
+
+@pytest.mark.asyncio
+async def test_final_synthesis_is_escalated(mock_llm_server):
+    client, _, _ = await make_client(mock_llm_server)
+    await add_tool_result(client)
+
+    response = await client.get_llm_response(TOOLS)
+
+    assert response.content[0].text == "large"
+    assert client.router.stats[FAST_TIER].escalations == {"final_synthesis": 1}
+    # Both requests are paid for
+    assert len(client.usage_tracker.turns) == 2
+    assert client.router.step_latency.count == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_tool_and_invalid_arguments_are_escalated(mock_llm_server):
+    client, _, large = await make_client(mock_llm_server, tool_call=("rm_rf", {}))
+    await client.add_user_message("hi")
+    await client.get_llm_response(TOOLS)
+    assert client.router.stats[FAST_TIER].escalations == {"unknown_tool": 1}
+
+    client, _, large = await make_client(
+        mock_llm_server,
+        validate_tool_call=lambda name, args: "$.namespace: required",
+        tool_call=("k8s_get_pods", {}),
+    )
+    await client.add_user_message("hi")
+    await client.get_llm_response(TOOLS)
+    assert client.router.stats[FAST_TIER].escalations == {"invalid_arguments": 1}
+    assert len(large.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_fast_model_falls_back_to_large(mock_llm_server):
+    client, _, _ = await make_client(mock_llm_server, status=500)
+    await client.add_user_message("hi")
+
+    response = await client.get_llm_response(TOOLS)
+
+    assert response.content[0].text == "large"
+    assert client.router.stats[FAST_TIER].escalations == {"error": 1}
+    assert len(client.usage_tracker.turns) == 1
@@ -0,0 +1,155 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from mcp.types import (
+    CallToolResult,
+    EmbeddedResource,
+    TextContent,
+    TextResourceContents,
+    Tool,
+)
+
+from mcp_repl.mcp_orchestrator import MCPOrchestrator
+from mcp_repl.payload_channel import PayloadChannel, offload_payload
+
+
+@pytest.fixture
+def channel(monkeypatch):
+    channel = PayloadChannel(min_bytes=10)
+    for name, value in channel.server_env("srv").items():
+        monkeypatch.setenv(name, value)
+    yield channel
+    channel.close()
+
+
+def test_large_payload_round_trip(channel):
+    text = '{"items": ["' + "é" * 1000 + '"]}'
+    item = offload_payload(text)
+    assert item.type == "resource"
+    assert len(item.model_dump_json()) < 200
+
+    result = channel.resolve(CallToolResult(content=[item]), "srv")
+
+    assert result.content[0].type == "text"
+    assert result.content[0].text == text
+    assert list(channel.directory("srv").iterdir()) == []
+
+
+def test_small_payload_stays_inline(channel):
+    item = offload_payload("short")
+    assert item == TextContent(type="text", text="short")
+    # The threshold is in bytes, not characters
+    assert offload_payload("é" * 6).type == "resource"
+
+
+def test_offload_without_client_support(monkeypatch):
+    monkeypatch.delenv("MCP_REPL_PAYLOAD_DIR", raising=False)
+    item = offload_payload("x" * 1_000_000)
+    assert item.type == "text"
+
+
+def test_other_content_is_unchanged(channel):
+    result = CallToolResult(
+        content=[
+            TextContent(type="text", text="plain"),
+            EmbeddedResource(
+                type="resource",
+                resource=TextResourceContents(uri="file:///etc/hosts", text="hosts"),
+            ),
+        ]
+    )
+    assert channel.resolve(result, "srv") is result
+
+
+def test_references_outside_channel_are_ignored(channel):
+    reference = EmbeddedResource(
+        type="resource",
+        resource=TextResourceContents(
+            uri="payload://local/../../etc/passwd", text="[payload]"
+        ),
+    )
+    result = channel.resolve(CallToolResult(content=[reference]), "srv")
+    assert result.content == [reference]
+
+
+def test_references_into_another_servers_directory_are_ignored(channel):
+    item = offload_payload("x" * 100)
+    assert channel.directory("other") != channel.directory("srv")
+
+    result = channel.resolve(CallToolResult(content=[item]), "other")
+
+    assert result.content == [item]
+
+
+@pytest.mark.asyncio
+async def test_payloads_of_cancelled_calls_are_swept(channel):
+    orchestrator = MCPOrchestrator()
+    orchestrator.payload_channel = channel
+    written = asyncio.Event()
+
+    async def call_tool(name, arguments):
+        offload_payload("x" * 100)
+        written.set()
+        await asyncio.sleep(60)
+
+    session = MagicMock()
+    session.call_tool = call_tool
+    orchestrator.sessions["srv"] = {
+        "session": session,
+        "tools": [Tool(name="dump", inputSchema={"type": "object"})],
+        "server_info": None,
+        "server_id": "srv",
+        "server_path": "srv.py",
+    }
+    orchestrator._update_available_tools()
+
+    call = asyncio.create_task(orchestrator.call_tool("srv_dump", {}))
+    await written.wait()
+    assert len(list(channel.directory("srv").iterdir())) == 1
+    call.cancel()
+    await asyncio.gather(call, return_exceptions=True)
+
+    assert list(channel.directory("srv").iterdir()) == []
+    assert orchestrator.calls_in_flight == {}
+
+
+PAYLOAD_SERVER = """
+from mcp.server.fastmcp import FastMCP
+
+from mcp_repl.payload_channel import offload_payload
+
+mcp = FastMCP("payloads")
+
+
+@mcp.tool()
+def dump(size: int):
+    return offload_payload("x" * size, mime_type="text/plain")
+
+
+mcp.run()
+"""
+
+
+@pytest.mark.asyncio
+async def test_payload_round_trip_through_a_server(tmp_path):
+    script = tmp_path / "payload_server.py"
+    script.write_text(PAYLOAD_SERVER)
+    orchestrator = MCPOrchestrator()
+    orchestrator.payload_channel.min_bytes = 1000
+    try:
+        await orchestrator.connect_to_server(str(script), "srv")
+
+        for size in [10, 100_000]:
+            result = await orchestrator.call_tool("srv_dump", {"size": size})
+            assert [item.type for item in result.content] == ["text"]
+            assert result.content[0].text == "x" * size
+        assert list(orchestrator.payload_channel.directory("srv").iterdir()) == []
+
+        # The large result crossed stdio as a reference, not as its text
+        session = orchestrator.sessions["srv"]["session"]
+        raw = await session.call_tool("dump", {"size": 100_000})
+        assert raw.content[0].type == "resource"
+        orchestrator.payload_channel.resolve(raw, "srv")
+    finally:
+        await orchestrator.cleanup()
@@ -0,0 +1,127 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from mcp.shared.memory import create_connected_server_and_client_session
+from mcp.types import CallToolResult, TextContent, Tool
+
+from mcp_repl.mcp_orchestrator import MCPOrchestrator
+from mcp_repl.proxy import MCPProxy, ResultCache
+
+
+def add_mock_server(orchestrator, server_id, tool_name, text, is_error=False):
+    session = MagicMock()
+    session.call_tool = AsyncMock(
+        return_value=CallToolResult(
+            content=[TextContent(type="text", text=text)], isError=is_error
+        )
+    )
+    orchestrator.sessions[server_id] = {
+        "session": session,
+        "tools": [
+            Tool(
+                name=tool_name,
+                description=f"Run {tool_name}\n\n",
+                inputSchema={
+                    "type": "object",
+                    "properties": {"arg": {"type": "string", "title": "Arg"}},
+                },
+            )
+        ],
+        "server_info": None,
+        "server_id": server_id,
+        "server_path": f"{server_id}.py",
+    }
+    orchestrator._update_available_tools()
+    return session
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = MCPOrchestrator()
+    add_mock_server(orchestrator, "k8s", "get_pods", "pods")
+    add_mock_server(orchestrator, "db", "query", "boom", is_error=True)
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_proxy_lists_aggregated_catalog_without_builtins(orchestrator):
+    proxy = MCPProxy(orchestrator)
+
+    async with create_connected_server_and_client_session(proxy.server) as client:
+        tools = (await client.list_tools()).tools
+
+    assert [tool.name for tool in tools] == ["k8s_get_pods", "db_query"]
+    assert tools[0].description == "Run get_pods"
+    assert "title" not in tools[0].inputSchema["properties"]["arg"]
+
+
+@pytest.mark.asyncio
+async def test_proxy_forwards_calls_and_passes_errors_through(orchestrator):
+    proxy = MCPProxy(orchestrator)
+
+    async with create_connected_server_and_client_session(proxy.server) as client:
+        ok = await client.call_tool("k8s_get_pods", {"arg": "x"})
+        failed = await client.call_tool("db_query", {})
+        missing = await client.call_tool("repl_read_result", {"handle": "0"})
+
+    assert ok.content[0].text == "pods"
+    assert not ok.isError
+    orchestrator.sessions["k8s"]["session"].call_tool.assert_awaited_once_with(
+        "get_pods", {"arg": "x"}
+    )
+    assert failed.isError and failed.content[0].text == "boom"
+    assert missing.isError
+
+
+@pytest.mark.asyncio
+async def test_proxy_caches_successful_results(orchestrator):
+    orchestrator.read_only_patterns = {"k8s": ["get_*"], "db": ["query"]}
+    proxy = MCPProxy(orchestrator, cache_ttl=60)
+
+    for _ in range(3):
+        await proxy.call_tool("k8s_get_pods", {"arg": "x"})
+        await proxy.call_tool("db_query", {})
+    await proxy.call_tool("k8s_get_pods", {"arg": "y"})
+
+    assert orchestrator.sessions["k8s"]["session"].call_tool.await_count == 2
+    # Errors are never cached
+    assert orchestrator.sessions["db"]["session"].call_tool.await_count == 3
+    assert proxy.cache.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_proxy_never_caches_mutating_tools(orchestrator):
+    add_mock_server(orchestrator, "k8s", "delete_pod", "deleted")
+    proxy = MCPProxy(orchestrator, cache_ttl=60)
+
+    await asyncio.gather(
+        *[proxy.call_tool("k8s_delete_pod", {"arg": "x"}) for _ in range(2)]
+    )
+
+    assert orchestrator.sessions["k8s"]["session"].call_tool.await_count == 2
+    assert proxy.cache.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_call_does_not_hang_waiters():
+    cache = ResultCache(ttl=60)
+    key = cache.key("k8s_get_pods", {})
+    started = asyncio.Event()
+    result = CallToolResult(content=[TextContent(type="text", text="pods")])
+
+    async def slow_call():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast_call():
+        return result
+
+    leader = asyncio.create_task(cache.get_or_call(key, slow_call))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_call(key, fast_call))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await asyncio.wait_for(waiter, 1) is result
+    assert leader.cancelled()
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from mcp_repl.llm_providers import AnthropicProvider, ProviderChain
+from mcp_repl.rate_limit import (
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+    retry_after,
+)
+
+REQUEST = {
+    "system": "be brief",
+    "messages": [{"role": "user", "content": "hi"}],
+    "tools": [],
+    "max_tokens": 100,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def error_with_headers(headers):
+    return SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+
+def test_retry_after_headers():
+    assert retry_after(error_with_headers({"retry-after": "3"})) == 3.0
+    assert retry_after(error_with_headers({"retry-after-ms": "1500"})) == 1.5
+    date = formatdate(time.time() + 60, usegmt=True)
+    assert 55 < retry_after(error_with_headers({"retry-after": date})) <= 60
+    assert retry_after(error_with_headers({})) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_backoff_delay_is_jittered_capped_and_honours_retry_after():
+    delays = [backoff_delay(10, base=0.5, cap=4.0) for _ in range(100)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 1
+    assert 2.0 <= backoff_delay(0, base=0.5, retry_after=2.0) <= 2.5
+
+
+def test_token_bucket_refills_and_goes_into_debt():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=600, clock=clock)
+    assert bucket.wait_time(600) == 0
+    bucket.tokens = 0
+    assert bucket.wait_time(10) == pytest.approx(1.0)
+    clock.now = 1.0
+    assert bucket.wait_time(10) == 0
+
+    bucket.adjust(20)
+    assert bucket.wait_time(10) == pytest.approx(2.0)
+    # Larger than the bucket: waits for a full bucket instead of forever
+    assert bucket.wait_time(10_000) == pytest.approx(61.0)
+
+
+def anthropic(server, limiter=None):
+    provider = AnthropicProvider(base_url=server.url, api_key="test")
+    provider.limiter = limiter
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_chain_retries_throttled_requests_after_retry_after(mock_llm_server):
+    server = await mock_llm_server(throttle_first=2, retry_after=0.2)
+    limiter = RateLimiter()
+    chain = ProviderChain([anthropic(server, limiter)], max_retries=3)
+
+    started = time.perf_counter()
+    response = await chain.create(**REQUEST)
+
+    assert response.content[0].text == "hello"
+    assert chain.retries == 2
+    assert limiter.throttled == 2
+    assert time.perf_counter() - started >= 0.4
+
+
+@pytest.mark.asyncio
+async def test_chain_gives_up_after_max_retries(mock_llm_server):
+    server = await mock_llm_server(throttle_first=10)
+    chain = ProviderChain([anthropic(server)], max_retries=2, backoff_base=0.01)
+
+    with pytest.raises(Exception) as error:
+        await chain.create(**REQUEST)
+
+    assert error.value.status_code == 429
+    assert len(server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrency_adapts_to_throttling(mock_llm_server):
+    server = await mock_llm_server(delay=0.1, max_concurrent=2)
+    limiter = RateLimiter(max_concurrency=8)
+    chain = ProviderChain(
+        [anthropic(server, limiter)], max_retries=10, backoff_base=0.05
+    )
+
+    responses = await asyncio.gather(*(chain.create(**REQUEST) for _ in range(12)))
+
+    assert len(responses) == 12
+    assert limiter.throttled > 0
+    assert limiter.concurrency.limit < 8
+    assert server.max_in_flight <= 2
+
+
+@pytest.mark.asyncio
+async def test_token_budget_is_settled_with_real_usage(mock_llm_server):
+    server = await mock_llm_server()
+    limiter = RateLimiter(tokens_per_minute=100_000)
+    limiter.tokens.clock = FakeClock()
+    limiter.tokens.updated = 0.0
+    await ProviderChain([anthropic(server, limiter)]).create(**REQUEST)
+
+    # The mock reports 15 tokens used
+    assert limiter.tokens.tokens == 100_000 - 15
@@ -0,0 +1,103 @@
+import json
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from mcp.types import CallToolResult, TextContent, Tool
+
+from mcp_repl.mcp_orchestrator import MCPOrchestrator
+from mcp_repl.replay import (
+    filter_tool_calls,
+    load_tool_calls,
+    replay_tool_calls,
+)
+
+
+def tool_use(name, arguments):
+    return {
+        "role": "assistant",
+        "content": [{"type": "tool_use", "id": "tu", "name": name, "input": arguments}],
+    }
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = MCPOrchestrator()
+    session = AsyncMock()
+    session.call_tool.side_effect = lambda name, args: CallToolResult(
+        content=[TextContent(type="text", text="ok")], isError=name == "delete_pod"
+    )
+    orchestrator.read_only_patterns = {"k8s": ["get_*"]}
+    orchestrator.sessions = {
+        "k8s": {
+            "session": session,
+            "tools": [
+                Tool(name="get_pods", inputSchema={}),
+                Tool(name="delete_pod", inputSchema={}),
+            ],
+            "server_info": {},
+            "server_id": "k8s",
+            "server_path": "./k8s.py",
+        }
+    }
+    orchestrator._update_available_tools()
+    return orchestrator
+
+
+def test_load_tool_calls_from_session_logs(tmp_path):
+    events = [
+        {"event": "message", "message": {"role": "user", "content": "pods?"}},
+        {"event": "message", "message": tool_use("k8s_get_pods", {"ns": "a"})},
+        {"event": "usage", "input_tokens": 1},
+    ]
+    (tmp_path / "one.jsonl").write_text("\n".join(map(json.dumps, events)))
+    (tmp_path / "two.json").write_text(json.dumps([tool_use("k8s_delete_pod", {})]))
+
+    calls = load_tool_calls([str(tmp_path)])
+
+    assert sorted(calls) == [("k8s_delete_pod", {}), ("k8s_get_pods", {"ns": "a"})]
+
+
+def test_filter_tool_calls(orchestrator):
+    calls = [("k8s_get_pods", {}), ("k8s_delete_pod", {}), ("gone_tool", {})]
+
+    # Mutating tools are left out unless asked for
+    assert filter_tool_calls(orchestrator, calls) == [calls[0]]
+    assert filter_tool_calls(orchestrator, calls, ["*delete*"]) == []
+    assert filter_tool_calls(
+        orchestrator, calls, ["*delete*"], include_mutating=True
+    ) == [calls[1]]
+    assert filter_tool_calls(orchestrator, calls, include_mutating=True) == calls[:2]
+
+
+@pytest.mark.asyncio
+async def test_replay_reports_per_tool_stats(orchestrator):
+    calls = [("k8s_get_pods", {}), ("k8s_delete_pod", {})]
+
+    started = time.perf_counter()
+    report = await replay_tool_calls(
+        orchestrator, calls, concurrency=4, rate=50, repeat=5
+    )
+
+    # 10 starts paced at 50/s take at least 9 intervals
+    assert time.perf_counter() - started >= 9 / 50
+    rows = {row["tool"]: row for row in report.rows()}
+    assert rows["k8s_get_pods"]["count"] == 5
+    assert rows["k8s_delete_pod"]["errors"] == 5
+    assert rows["total"]["count"] == 10
+    assert rows["total"]["throughput"] > 0
+
+
+@pytest.mark.asyncio
+async def test_replay_bypasses_circuit_breakers(orchestrator):
+    session = orchestrator.sessions["k8s"]["session"]
+    session.call_tool.side_effect = RuntimeError("connection reset")
+    breaker_configs = orchestrator.breaker_configs
+
+    report = await replay_tool_calls(orchestrator, [("k8s_get_pods", {})], repeat=10)
+
+    # An enabled breaker would have stopped sending calls after 5 failures
+    assert session.call_tool.await_count == 10
+    assert report.rows()[0]["errors"] == 10
+    assert orchestrator.breakers == {}
+    assert orchestrator.breaker_configs is breaker_configs
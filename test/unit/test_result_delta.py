@@ -0,0 +1,224 @@
+import json
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from mcp_repl.chat_compactor import (
+    BASELINE_COPY_MARKER,
+    ELIDED_MARKER,
+    ChatHistoryCompactor,
+    content_to_text,
+    estimate_tokens,
+)
+from mcp_repl.llm_client import LLMClient
+from mcp_repl.result_delta import (
+    DELTA_MARKER,
+    UNCHANGED_MARKER,
+    ResultDeltaEncoder,
+    json_diff,
+    text_diff,
+)
+from mcp_repl.result_store import SPILL_MARKER, ResultStore
+
+
+def pods(*statuses):
+    return [
+        {"name": f"pod-{i}", "status": status, "spec": {"image": "nginx:1.25"}}
+        for i, status in enumerate(statuses)
+    ]
+
+
+def result(value):
+    text = value if isinstance(value, str) else json.dumps(value)
+    return CallToolResult(content=[TextContent(type="text", text=text)])
+
+
+async def call(client, tool_use_id, value, tool="k8s_get_resources", args=None):
+    await client.add_assistant_message(
+        [
+            {
+                "type": "tool_use",
+                "id": tool_use_id,
+                "name": tool,
+                "input": args or {"resource_type": "pod"},
+            }
+        ]
+    )
+    await client.add_tool_result(tool_use_id, result(value))
+    return client.chat_history[-1]["content"][0]["content"]
+
+
+@pytest.fixture
+def client():
+    return LLMClient(delta_encoder=ResultDeltaEncoder())
+
+
+def test_json_diff_matches_list_items_by_identity():
+    old = pods("Running", "Pending", "Running")
+    new = pods("Running", "Running", "Running")[1:] + [{"name": "pod-9"}]
+
+    assert json_diff(old, new) == [
+        '- $[name="pod-0"]',
+        '~ $[name="pod-1"].status: "Pending" -> "Running"',
+        '+ $[name="pod-9"]: {"name":"pod-9"}',
+    ]
+
+
+def test_json_diff_by_position_and_keys():
+    assert json_diff({"a": [1, 2], "b": 1}, {"a": [1, 3, 4], "c": None}) == [
+        "~ $.a[1]: 2 -> 3",
+        "+ $.a[2]: 4",
+        "- $.b",
+        "+ $.c: null",
+    ]
+
+
+def test_text_diff_only_has_changed_lines():
+    old = "\n".join(f"line {i}" for i in range(100))
+    new = old.replace("line 50", "line fifty")
+    assert text_diff(old, new) == ["@@ -51 +51 @@", "-line 50", "+line fifty"]
+
+
+@pytest.mark.asyncio
+async def test_repeat_call_is_sent_as_unchanged_or_delta(client):
+    first = pods(*["Running"] * 20)
+    assert (await call(client, "tu_1", first))[0].text == json.dumps(first)
+
+    unchanged = await call(client, "tu_2", first)
+    assert unchanged[0].text.startswith(UNCHANGED_MARKER)
+    assert "tu_1" in unchanged[0].text
+
+    second = pods(*["Running"] * 19, "CrashLoopBackOff")
+    delta = (await call(client, "tu_3", second))[0].text
+    assert delta.startswith(DELTA_MARKER)
+    assert "tu_1" in delta
+    assert '~ $[name="pod-19"].status: "Running" -> "CrashLoopBackOff"' in delta
+
+
+@pytest.mark.asyncio
+async def test_other_arguments_and_errors_are_sent_in_full(client):
+    value = pods(*["Running"] * 20)
+    await call(client, "tu_1", value)
+
+    other = await call(client, "tu_2", value, args={"resource_type": "service"})
+    assert other[0].text == json.dumps(value)
+
+    await client.add_assistant_message(
+        [{"type": "tool_use", "id": "tu_3", "name": "k8s_get_resources", "input": {}}]
+    )
+    error = CallToolResult(
+        content=[TextContent(type="text", text="boom")], isError=True
+    )
+    await client.add_tool_result("tu_3", error)
+    assert client.chat_history[-1]["content"][0]["content"] == error.content
+
+
+@pytest.mark.asyncio
+async def test_large_change_is_sent_in_full_and_becomes_baseline(client):
+    await call(client, "tu_1", pods(*["Running"] * 20))
+    changed = pods(*["Pending"] * 20)
+    assert (await call(client, "tu_2", changed))[0].text == json.dumps(changed)
+    assert "tu_2" in (await call(client, "tu_3", changed))[0].text
+
+
+@pytest.mark.asyncio
+async def test_elided_baseline_is_not_referenced(client):
+    value = pods(*["Running"] * 20)
+    await client.add_user_message("watch the pods")
+    await call(client, "tu_1", value)
+    await client.add_user_message("again")
+    client.chat_history = ChatHistoryCompactor(keep_recent_turns=1).compact(
+        client.chat_history, max_tokens=250
+    )
+    assert len(client.chat_history) == 4
+    assert ELIDED_MARKER in client.chat_history[2]["content"][0]["content"]
+
+    assert (await call(client, "tu_2", value))[0].text == json.dumps(value)
+    assert (await call(client, "tu_3", value))[0].text.startswith(UNCHANGED_MARKER)
+
+
+@pytest.mark.asyncio
+async def test_spilled_results_are_never_diffed(tmp_path):
+    store = ResultStore(str(tmp_path), threshold_chars=2000, preview_chars=100)
+    client = LLMClient(result_store=store, delta_encoder=ResultDeltaEncoder())
+    first = pods(*["Running"] * 40)
+    assert (await call(client, "tu_1", first))[0].text.startswith(SPILL_MARKER)
+
+    # The repeat is stored in full rather than diffed against a preview
+    second = pods(*["Running"] * 39, "Pending")
+    spilled = (await call(client, "tu_2", second))[0].text
+    assert spilled.startswith(SPILL_MARKER)
+    handle = spilled.split("'")[1]
+    assert store.get(handle) == json.dumps(second)
+
+    # A spilled baseline is not referenced by a small result either
+    store.threshold_chars = 10_000
+    assert (await call(client, "tu_3", first))[0].text == json.dumps(first)
+    assert (await call(client, "tu_4", first))[0].text.startswith(UNCHANGED_MARKER)
+
+
+async def watch_history(client):
+    """Three turns: a full result, a delta against it and an unchanged marker"""
+    value = pods(*["Running"] * 20)
+    await client.add_user_message("watch the pods")
+    await call(client, "tu_1", value)
+    await client.add_user_message("again")
+    await call(client, "tu_2", pods(*["Running"] * 19, "Pending"))
+    await client.add_user_message("and again")
+    await call(client, "tu_3", value)
+    return value
+
+
+def tool_result_texts(history):
+    return {
+        block["tool_use_id"]: content_to_text(block["content"])
+        for message in history
+        if message["role"] == "user" and isinstance(message["content"], list)
+        for block in message["content"]
+    }
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_baselines_that_recent_deltas_need(client):
+    value = await watch_history(client)
+    compactor = ChatHistoryCompactor(keep_recent_turns=1, preview_chars=20)
+    # Eliding the full result alone would be enough to fit
+    budget = estimate_tokens(client.chat_history) - 10
+
+    history = compactor.compact(client.chat_history, max_tokens=budget)
+
+    texts = tool_result_texts(history)
+    assert texts["tu_1"] == json.dumps(value)
+    assert texts["tu_2"].startswith(ELIDED_MARKER)
+    assert texts["tu_3"].startswith(UNCHANGED_MARKER)
+
+
+@pytest.mark.asyncio
+async def test_compaction_elides_deltas_together_with_their_baseline(client):
+    await watch_history(client)
+    await client.add_user_message("thanks")
+    compactor = ChatHistoryCompactor(keep_recent_turns=1)
+
+    history = compactor.compact(client.chat_history, max_tokens=350)
+
+    texts = tool_result_texts(history)
+    assert all(text.startswith(ELIDED_MARKER) for text in texts.values())
+
+
+@pytest.mark.asyncio
+async def test_dropped_baseline_is_copied_into_the_first_kept_delta(client):
+    value = await watch_history(client)
+    compactor = ChatHistoryCompactor(keep_recent_turns=2)
+
+    history = compactor.compact(client.chat_history, max_tokens=300)
+
+    texts = tool_result_texts(history)
+    assert "tu_1" not in texts
+    delta, copy = texts["tu_2"].split(f"{BASELINE_COPY_MARKER} tu_1, ", 1)
+    assert delta.startswith(DELTA_MARKER)
+    assert copy.split("\n", 1)[1] == json.dumps(value)
+    assert texts["tu_3"].startswith(UNCHANGED_MARKER)
+
+    # Compacting again keeps the copy while the unchanged result needs it
+    history = compactor.compact(history, max_tokens=300)
+    assert json.dumps(value) in tool_result_texts(history)["tu_2"]
@@ -0,0 +1,52 @@
+import pytest
+from mcp.types import ImageContent, TextContent
+
+from mcp_repl.result_store import ResultStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(root_dir=str(tmp_path), threshold_chars=100, preview_chars=20)
+
+
+def test_spill_keeps_small_results(store):
+    content = [TextContent(type="text", text="small")]
+
+    assert store.spill(content) is content
+
+
+def test_spill_stores_large_results(store):
+    text = "\n".join(f"line {i}" for i in range(100))
+    image = ImageContent(type="image", data="", mimeType="image/png")
+
+    spilled = store.spill([TextContent(type="text", text=text), image])
+
+    assert len(spilled) == 2
+    assert spilled[1] is image
+    assert "repl_read_result" in spilled[0].text
+    handle = spilled[0].text.split("'")[1]
+    assert store.get(handle) == text
+
+
+def test_read_pages_and_greps(store):
+    handle = store.put("\n".join(f"line {i}" for i in range(10)))
+
+    page = store.read(handle, offset=2, limit=3)
+    assert page.splitlines()[1:] == ["3: line 2", "4: line 3", "5: line 4"]
+
+    matches = store.read(handle, pattern=r"line [89]")
+    assert matches.splitlines()[1:] == ["9: line 8", "10: line 9"]
+
+
+def test_read_rejects_invalid_handle(store):
+    with pytest.raises(ValueError, match="Invalid result handle"):
+        store.read("../../etc/passwd")
+
+
+def test_read_rejects_invalid_pattern_and_negative_paging(store):
+    handle = store.put("line")
+
+    with pytest.raises(ValueError, match="Invalid pattern"):
+        store.read(handle, pattern="(unclosed")
+    with pytest.raises(ValueError, match="must not be negative"):
+        store.read(handle, offset=-5)
@@ -0,0 +1,61 @@
+import json
+
+from mcp.types import (
+    BlobResourceContents,
+    EmbeddedResource,
+    ImageContent,
+    TextContent,
+)
+from rich.syntax import Syntax
+from rich.text import Text
+
+from mcp_repl.result_view import (
+    JSON_HIGHLIGHT_CHARS,
+    describe_item,
+    item_size,
+    render_preview,
+    render_text,
+)
+
+
+def text_item(text):
+    return TextContent(type="text", text=text)
+
+
+def test_small_json_is_highlighted_and_large_json_is_not_parsed():
+    small = json.dumps({"pods": ["a", "b"]})
+    large = json.dumps(["x" * 100] * (JSON_HIGHLIGHT_CHARS // 100))
+
+    assert isinstance(render_text(small), Syntax)
+    assert isinstance(render_text(large), Text)
+    assert isinstance(render_text("{not json"), Text)
+
+
+def test_preview_shares_budget_and_cuts_without_parsing():
+    content = [text_item("a" * 300), text_item(json.dumps({"k": "v" * 1000}))]
+
+    renderables, truncated = render_preview(content, preview_chars=500)
+
+    assert truncated
+    assert renderables[0].plain == "a" * 300
+    assert renderables[1].plain == '{"k": "' + "v" * 193 + "..."
+
+
+def test_preview_summarizes_non_text_items():
+    image = ImageContent(type="image", data="A" * 4000, mimeType="image/png")
+    resource = EmbeddedResource(
+        type="resource",
+        resource=BlobResourceContents(
+            uri="file:///dump.bin", mimeType="application/octet-stream", blob="B" * 400
+        ),
+    )
+
+    renderables, truncated = render_preview([text_item("ok"), image, resource])
+
+    assert not truncated
+    assert [r.plain for r in renderables[1:]] == [
+        "[image: image/png, 3,000 bytes]",
+        "[resource: file:///dump.bin, application/octet-stream, 300 bytes]",
+    ]
+    assert describe_item(image) == renderables[1].plain
+    assert item_size(image) == 4000
@@ -0,0 +1,168 @@
+import os
+import time
+
+from mcp_repl.chat_log import load_chat_history
+from mcp_repl.result_store import SPILL_MARKER
+from mcp_repl.retention import (
+    DAY,
+    BoundedFileHistory,
+    RetentionPolicy,
+    apply_retention,
+    compress_file,
+    decompress_session,
+)
+from mcp_repl.session_store import SessionStore
+
+MESSAGE = (
+    '{"event": "message", "ts": 0, "message": {"role": "user", "content": "hi"}}\n'
+)
+
+
+def make_session(root, chat_id, age_days, size=1):
+    path = root / f"{chat_id}.jsonl"
+    path.write_text(MESSAGE * size)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_apply_retention_compresses_cold_sessions(tmp_path):
+    make_session(tmp_path, "hot", age_days=0)
+    make_session(tmp_path, "cold", age_days=3)
+
+    report = apply_retention(str(tmp_path), RetentionPolicy(compress_after_days=1))
+
+    assert report == {"compressed": 1, "deleted": 0}
+    assert (tmp_path / "hot.jsonl").exists()
+    assert not (tmp_path / "cold.jsonl").exists()
+    assert load_chat_history(str(tmp_path / "cold.jsonl.gz")) == [
+        {"role": "user", "content": "hi"}
+    ]
+
+
+def test_apply_retention_deletes_by_age_count_and_size(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    for i, chat_id in enumerate(["a", "b", "c", "d"]):
+        make_session(tmp_path, chat_id, age_days=i, size=10)
+        store.start_session(chat_id, f"{chat_id}.jsonl", [])
+    make_session(tmp_path, "old", age_days=30)
+    make_session(tmp_path, "active", age_days=30)
+
+    policy = RetentionPolicy(
+        max_age_days=7,
+        max_sessions=3,
+        max_total_bytes=len(MESSAGE) * 25,
+        compress_after_days=None,
+    )
+    report = apply_retention(str(tmp_path), policy, store, active_chat_ids=["active"])
+
+    remaining = sorted(p.name for p in tmp_path.glob("*.jsonl"))
+    assert remaining == ["a.jsonl", "active.jsonl", "b.jsonl"]
+    assert report["deleted"] == 3
+    assert store.get_session("c") is None
+    assert store.get_session("a") is not None
+    store.close()
+
+
+def test_apply_retention_counts_the_session_index(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    for i, chat_id in enumerate(["new", "old"]):
+        make_session(tmp_path, chat_id, age_days=i)
+        store.start_session(chat_id, f"{chat_id}.jsonl", [])
+        store.add_messages(chat_id, [{"role": "user", "content": "x" * 1000}])
+
+    policy = RetentionPolicy(max_total_bytes=3000, compress_after_days=None)
+    apply_retention(str(tmp_path), policy, store)
+
+    assert (tmp_path / "new.jsonl").exists()
+    assert not (tmp_path / "old.jsonl").exists()
+    assert set(store.session_sizes()) == {"new"}
+    store.close()
+
+
+def test_apply_retention_treats_a_resumed_compressed_session_as_one(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    store.start_session("resumed", "resumed.jsonl", [])
+    compress_file(make_session(tmp_path, "resumed", age_days=5))
+    make_session(tmp_path, "resumed", age_days=3, size=2)
+    make_session(tmp_path, "other", age_days=4)
+
+    report = apply_retention(str(tmp_path), RetentionPolicy(max_sessions=1), store)
+
+    assert report == {"compressed": 1, "deleted": 1}
+    assert sorted(p.name for p in tmp_path.glob("*.jsonl*")) == ["resumed.jsonl.gz"]
+    assert len(load_chat_history(str(tmp_path / "resumed.jsonl.gz"))) == 3
+    assert store.get_session("resumed") is not None
+
+    decompress_session(str(tmp_path), "resumed")
+    assert len(load_chat_history(str(tmp_path / "resumed.jsonl"))) == 3
+    assert not (tmp_path / "resumed.jsonl.gz").exists()
+    store.close()
+
+
+def test_apply_retention_keeps_results_referenced_by_kept_sessions(tmp_path):
+    results = tmp_path / "results"
+    results.mkdir()
+    handles = {
+        "kept": "a" * 16,
+        "deleted": "b" * 16,
+        "stale": "c" * 16,
+        "fresh": "e" * 16,
+        "unrelated": "f" * 16,
+    }
+    for name, handle in handles.items():
+        (results / f"{handle}.txt").write_text(name)
+        mtime = time.time() - (0 if name == "fresh" else 30) * DAY
+        os.utime(results / f"{handle}.txt", (mtime, mtime))
+    for name, age in [("kept", 0), ("deleted", 30)]:
+        path = make_session(tmp_path, name, age_days=age)
+        mtime = path.stat().st_mtime
+        with open(path, "a") as f:
+            f.write(
+                f'{{"event": "note", "text": "{SPILL_MARKER} \'{handles[name]}\'"}}\n'
+            )
+            f.write(f'{{"event": "note", "text": "commit {handles["unrelated"]}"}}\n')
+        os.utime(path, (mtime, mtime))
+
+    apply_retention(str(tmp_path), RetentionPolicy(max_age_days=7))
+
+    remaining = sorted(p.read_text() for p in results.iterdir())
+    assert remaining == ["fresh", "kept"]
+
+
+def test_apply_retention_reads_result_handles_from_the_session_index(tmp_path):
+    results = tmp_path / "results"
+    results.mkdir()
+    mtime = time.time() - 30 * DAY
+    for handle in ["a" * 16, "b" * 16]:
+        (results / f"{handle}.txt").write_text(handle)
+        os.utime(results / f"{handle}.txt", (mtime, mtime))
+
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    make_session(tmp_path, "indexed", age_days=0)
+    store.start_session("indexed", "indexed.jsonl", [])
+    store.add_messages(
+        "indexed", [{"role": "user", "content": f"{SPILL_MARKER} '{'a' * 16}': ..."}]
+    )
+
+    apply_retention(str(tmp_path), RetentionPolicy(max_age_days=7), store)
+
+    assert [p.stem for p in results.iterdir()] == ["a" * 16]
+    store.close()
+
+
+def test_bounded_file_history_loads_only_recent_entries(tmp_path):
+    path = str(tmp_path / "history")
+    history = BoundedFileHistory(path, max_entries=5, max_bytes=400)
+    for i in range(50):
+        history.store_string(f"query {i}\nsecond line")
+
+    assert list(history.load_history_strings()) == [
+        f"query {i}\nsecond line" for i in range(49, 44, -1)
+    ]
+
+    history.truncate()
+    assert os.path.getsize(path) <= 400
+    assert list(BoundedFileHistory(path).load_history_strings())[0] == (
+        "query 49\nsecond line"
+    )
@@ -0,0 +1,93 @@
+from mcp_repl.schema_validator import MAX_ERRORS, compile_validator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "namespace": {"type": "string", "default": "default"},
+        "tail_lines": {"type": "integer", "minimum": 1, "default": 100},
+        "level": {"enum": ["info", "error"]},
+        "labels": {"type": "array", "items": {"$ref": "#/$defs/Label"}},
+        "since": {"anyOf": [{"type": "string"}, {"type": "null"}], "default": None},
+    },
+    "required": ["pod_name"],
+    "$defs": {
+        "Label": {
+            "type": "object",
+            "properties": {"key": {"type": "string"}},
+            "required": ["key"],
+            "additionalProperties": False,
+        }
+    },
+}
+
+
+def test_valid_arguments_get_defaults_without_mutating_input():
+    validate = compile_validator(SCHEMA)
+    arguments = {"pod_name": "web", "labels": [{"key": "app"}]}
+
+    checked, errors = validate(arguments)
+
+    assert errors == []
+    assert checked == {
+        "pod_name": "web",
+        "labels": [{"key": "app"}],
+        "namespace": "default",
+        "tail_lines": 100,
+        "since": None,
+    }
+    assert arguments == {"pod_name": "web", "labels": [{"key": "app"}]}
+
+
+def test_invalid_arguments_produce_compact_errors():
+    validate = compile_validator(SCHEMA)
+
+    _, errors = validate(
+        {
+            "namespace": 3,
+            "tail_lines": 0,
+            "level": "debug",
+            "labels": [{"value": "x"}],
+        }
+    )
+
+    assert errors == [
+        "$.pod_name: required",
+        "$.namespace: expected string, got integer",
+        "$.tail_lines: must be >= 1",
+        "$.level: expected one of ['info', 'error']",
+        "$.labels[0].key: required",
+    ]
+
+
+def test_errors_are_capped_and_unknown_keywords_ignored():
+    validate = compile_validator(
+        {
+            "type": "object",
+            "properties": {
+                f"p{i}": {"type": "integer", "format": "x"} for i in range(9)
+            },
+        }
+    )
+
+    _, errors = validate({f"p{i}": "no" for i in range(9)})
+
+    assert len(errors) == MAX_ERRORS
+    assert validate({"p0": 1.0, "extra": True})[1] == []
+    assert validate({"p0": True})[1] == ["$.p0: expected integer, got boolean"]
+
+
+def test_unsupported_pattern_is_skipped():
+    schema = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "pattern": r"^\p{L}+$", "maxLength": 3},
+            "id": {"type": "string", "pattern": "^[a-z]+$"},
+        },
+    }
+    validate = compile_validator(schema)
+
+    assert validate({"name": "ab", "id": "x"})[1] == []
+    assert validate({"name": "abcd", "id": "X"})[1] == [
+        "$.name: must have at most 3 characters",
+        "$.id: must match '^[a-z]+$'",
+    ]
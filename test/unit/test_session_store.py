@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from anthropic.types import TextBlock, ToolUseBlock
+
+from mcp_repl.result_store import SPILL_MARKER
+from mcp_repl.session_store import SessionStore, resume_session
+
+HISTORY = [
+    {"role": "user", "content": "why is the postgres pod crashing?"},
+    {
+        "role": "assistant",
+        "content": [
+            TextBlock(type="text", text="Let me check the logs."),
+            ToolUseBlock(
+                type="tool_use",
+                id="tu_1",
+                name="k8s_get_pod_logs",
+                input={"pod_name": "postgresql-0"},
+            ),
+        ],
+    },
+    {
+        "role": "user",
+        "content": [
+            {
+                "type": "tool_result",
+                "tool_use_id": "tu_1",
+                "content": "FATAL: out of memory",
+            }
+        ],
+    },
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def test_session_store_records_metadata_and_history(store):
+    store.start_session("chat1", "chat_history/chat1.jsonl", ["k8s"])
+    store.write_events(
+        "chat1",
+        [{"event": "message", "message": message} for message in HISTORY]
+        + [{"event": "usage", "input_tokens": 100, "output_tokens": 20}],
+    )
+
+    session = store.get_session("chat1")
+    assert session["servers"] == ["k8s"]
+    assert session["tools_used"] == ["k8s_get_pod_logs"]
+    assert session["message_count"] == 3
+    assert session["input_tokens"] == 100
+    assert session["output_tokens"] == 20
+
+    history = store.load_history("chat1")
+    assert history[0] == HISTORY[0]
+    assert history[1]["content"][1] == {
+        "type": "tool_use",
+        "id": "tu_1",
+        "name": "k8s_get_pod_logs",
+        "input": {"pod_name": "postgresql-0"},
+    }
+
+
+def test_session_store_search(store):
+    store.start_session("chat1", "chat1.jsonl", [])
+    store.add_messages("chat1", HISTORY)
+    store.start_session("chat2", "chat2.jsonl", [])
+    store.add_messages("chat2", [{"role": "user", "content": "list redis keys"}])
+
+    results = store.search("out of memory")
+    assert [(r["chat_id"], r["role"]) for r in results] == [("chat1", "user")]
+    assert "[memory]" in results[0]["snippet"]
+
+    assert [r["chat_id"] for r in store.search('redis "keys')] == ["chat2"]
+    assert store.search("   ") == []
+
+
+def test_resume_session_indexes_legacy_json(store, tmp_path):
+    (tmp_path / "legacy.json").write_text(json.dumps(HISTORY[:1]))
+
+    assert resume_session(store, "legacy", str(tmp_path)) == HISTORY[:1]
+    assert store.get_session("legacy")["message_count"] == 1
+
+    with pytest.raises(ValueError, match="No chat session 'missing'"):
+        resume_session(store, "missing", str(tmp_path))
+
+
+def test_session_store_records_result_handles(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    store = SessionStore(db_path)
+    store.start_session("chat1", "chat1.jsonl", [])
+    store.start_session("chat2", "chat2.jsonl", [])
+    store.add_messages(
+        "chat1",
+        [{"role": "user", "content": f"{SPILL_MARKER} '{'a' * 16}': ... {'b' * 16}"}],
+    )
+    assert store.result_handles() == {"chat1": {"a" * 16}, "chat2": set()}
+
+    # Indexes from before handles were recorded are backfilled on open
+    with store._conn:
+        store._conn.execute("DROP TABLE result_handles")
+    store.close()
+    store = SessionStore(db_path)
+    assert store.result_handles() == {"chat1": {"a" * 16}, "chat2": set()}
+
+    store.delete_session("chat1")
+    assert store.result_handles() == {"chat2": set()}
+    store.close()
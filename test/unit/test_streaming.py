@@ -0,0 +1,140 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import anyio
+import pytest
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.shared.memory import create_client_server_memory_streams
+from mcp.shared.session import BaseSession
+from mcp.types import CallToolResult, TextContent
+
+from mcp_repl.streaming import (
+    EARLY_STOP_MARKER,
+    StreamingClientSession,
+    ToolProgress,
+    ToolStream,
+    call_tool_streaming,
+)
+
+server = FastMCP("streaming")
+server_state = {"cancelled": False}
+
+
+@server.tool()
+async def count(n: int, ctx: Context) -> str:
+    for i in range(n):
+        await ctx.report_progress(i + 1, n)
+        await ctx.info(f"line {i}")
+    return "done"
+
+
+@server.tool()
+async def tail(ctx: Context) -> str:
+    try:
+        for i in range(1000):
+            await ctx.info(f"line {i}")
+            await asyncio.sleep(0.01)
+    except asyncio.CancelledError:
+        server_state["cancelled"] = True
+        raise
+    return "done"
+
+
+@asynccontextmanager
+async def connected_session():
+    lowlevel = server._mcp_server
+    async with create_client_server_memory_streams() as (client, server_streams):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(
+                lambda: lowlevel.run(
+                    *server_streams, lowlevel.create_initialization_options()
+                )
+            )
+            try:
+                async with StreamingClientSession(*client) as session:
+                    await session.initialize()
+                    yield session
+            finally:
+                tg.cancel_scope.cancel()
+
+
+@pytest.mark.asyncio
+async def test_mcp_session_internals_used_for_streaming():
+    # Fails when an mcp upgrade changes the private API StreamingClientSession
+    # depends on; see the mcp pin in pyproject.toml
+    assert "_received_notification" in vars(BaseSession)
+    async with connected_session() as session:
+        request_id = session._request_id
+        assert isinstance(request_id, int)
+        await session.list_tools()
+        assert session._request_id == request_id + 1
+
+
+@pytest.mark.asyncio
+async def test_streaming_call_reports_progress_and_output():
+    updates = []
+    async with connected_session() as session:
+        result = await session.call_tool_streaming("count", {"n": 3}, updates.append)
+
+    assert result.content[0].text == "done"
+    assert [(u.progress, u.total) for u in updates if u.progress] == [
+        (1, 3),
+        (2, 3),
+        (3, 3),
+    ]
+    assert [u.message for u in updates if u.message] == ["line 0", "line 1", "line 2"]
+    assert session._progress_callbacks == {}
+
+
+@pytest.mark.asyncio
+async def test_output_limit_stops_call_and_keeps_partial_output():
+    server_state["cancelled"] = False
+    async with connected_session() as session:
+        orchestrator = SimpleNamespace(
+            call_tool=lambda name, args, on_progress: session.call_tool_streaming(
+                name, args, on_progress
+            )
+        )
+        stream = ToolStream("tail", max_chars=20)
+        result = await call_tool_streaming(
+            orchestrator, "tail", {}, stream, asyncio.Event()
+        )
+        await asyncio.sleep(0.1)
+
+    text = result.content[0].text
+    assert text.startswith("line 0\nline 1\nline 2")
+    assert EARLY_STOP_MARKER in text
+    assert server_state["cancelled"]
+
+
+@pytest.mark.asyncio
+async def test_completed_call_returns_its_result():
+    async def call_tool(name, args, on_progress):
+        on_progress(ToolProgress(progress=1, total=1, message="working"))
+        return CallToolResult(content=[TextContent(type="text", text="full")])
+
+    stream = ToolStream("t")
+    result = await call_tool_streaming(
+        SimpleNamespace(call_tool=call_tool), "t", {}, stream, asyncio.Event()
+    )
+
+    assert result.content[0].text == "full"
+    assert stream.output == ["working"]
+    assert (stream.progress, stream.total) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_stop_event_returns_partial_result():
+    stop = asyncio.Event()
+
+    async def call_tool(name, args, on_progress):
+        on_progress(ToolProgress(message="partial"))
+        stop.set()
+        await asyncio.sleep(10)
+
+    result = await call_tool_streaming(
+        SimpleNamespace(call_tool=call_tool), "t", {}, ToolStream("t"), stop
+    )
+
+    assert result.content[0].text.startswith("partial\n" + EARLY_STOP_MARKER)
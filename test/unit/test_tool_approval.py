@@ -0,0 +1,95 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+from rich.console import Console
+
+from mcp_repl.repl import RichUI, discard_task
+
+
+def make_ui(answers, auto_approve_tools=False):
+    ui = RichUI.__new__(RichUI)
+    ui.console = SimpleNamespace(print=lambda *args, **kwargs: None)
+    ui.auto_approve_tools = auto_approve_tools
+    answers = iter(answers)
+
+    async def ask(message=""):
+        return next(answers)
+
+    ui.ask = ask
+    return ui
+
+
+def calls(n):
+    return [SimpleNamespace(name=f"srv_tool{i}", input={"i": i}) for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_batch_approval_approves_or_rejects_all_at_once():
+    assert await make_ui([""]).confirm_tool_executions(calls(3)) == [True] * 3
+    assert await make_ui(["n"]).confirm_tool_executions(calls(3)) == [False] * 3
+
+
+@pytest.mark.asyncio
+async def test_batch_approval_can_choose_each_call():
+    ui = make_ui(["s", "y", "n", ""])
+
+    assert await ui.confirm_tool_executions(calls(3)) == [True, False, True]
+
+
+@pytest.mark.asyncio
+async def test_auto_approve_never_prompts():
+    ui = make_ui([], auto_approve_tools=True)
+
+    assert await ui.confirm_tool_executions(calls(2)) == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_read_only_calls_start_before_approval_and_are_discarded_on_denial():
+    started = []
+
+    async def call_tool(name, args):
+        started.append(name)
+        await asyncio.sleep(10)
+
+    ui = make_ui([])
+    ui.mcp_client = SimpleNamespace(
+        call_tool=call_tool, is_read_only=lambda name: name == "srv_tool0"
+    )
+    tool_calls = [
+        SimpleNamespace(id=f"tu_{i}", name=f"srv_tool{i}", input={}) for i in range(2)
+    ]
+
+    speculative = ui.start_speculative_calls(tool_calls)
+    await asyncio.sleep(0)
+
+    assert list(speculative) == ["tu_0"]
+    assert started == ["srv_tool0"]
+
+    discard_task(speculative["tu_0"])
+    await asyncio.sleep(0)
+    assert speculative["tu_0"].cancelled()
+
+
+@pytest.mark.asyncio
+async def test_failing_call_does_not_discard_the_other_results():
+    async def call_tool(name, args, on_progress=None):
+        if name == "srv_tool1":
+            raise ValueError(f"Tool '{name}' not found")
+        return CallToolResult(content=[TextContent(type="text", text=name)])
+
+    ui = make_ui([])
+    ui.console = Console(file=io.StringIO())
+    ui.stream_output_limit = None
+    ui.mcp_client = SimpleNamespace(call_tool=call_tool)
+    tool_calls = [
+        SimpleNamespace(id=f"tu_{i}", name=f"srv_tool{i}", input={}) for i in range(3)
+    ]
+
+    results = await ui.execute_tool_calls(tool_calls, {})
+
+    assert [result.isError for result in results] == [False, True, False]
+    assert "not found" in results[1].content[0].text
+    assert results[2].content[0].text == "srv_tool2"
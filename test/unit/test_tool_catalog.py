@@ -0,0 +1,65 @@
+from mcp.types import Tool
+
+from mcp_repl.tool_catalog import (
+    catalog_report,
+    compile_tool,
+    minify_schema,
+    normalize_description,
+)
+
+TOOL = Tool(
+    name="get_pod_logs",
+    description="""
+    Get logs from a pod.
+
+    Args:
+        pod_name: Name of the pod
+        namespace: Kubernetes namespace
+    """,
+    inputSchema={
+        "title": "get_pod_logsArguments",
+        "type": "object",
+        "properties": {
+            "pod_name": {"title": "Pod Name", "type": "string"},
+            "title": {
+                "title": "Title",
+                "anyOf": [{"type": "string"}, {"type": "null"}],
+                "default": None,
+            },
+        },
+        "required": ["pod_name"],
+    },
+)
+
+
+def test_normalize_description():
+    assert normalize_description(TOOL.description) == (
+        "Get logs from a pod.\n\nArgs:\npod_name: Name of the pod\n"
+        "namespace: Kubernetes namespace"
+    )
+    assert normalize_description(None) == ""
+
+
+def test_minify_schema_strips_titles_and_null_defaults():
+    assert minify_schema(TOOL.inputSchema) == {
+        "type": "object",
+        "properties": {
+            "pod_name": {"type": "string"},
+            "title": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+        },
+        "required": ["pod_name"],
+    }
+
+
+def test_compile_tool_drops_server_prefix_from_description():
+    compiled = compile_tool("k8s", TOOL)
+
+    assert compiled["name"] == "k8s_get_pod_logs"
+    assert compiled["description"].startswith("Get logs from a pod.")
+
+
+def test_catalog_report():
+    [row] = catalog_report("k8s", [TOOL])
+
+    assert row["name"] == "k8s_get_pod_logs"
+    assert row["saved_tokens"] == row["raw_tokens"] - row["compiled_tokens"] > 0
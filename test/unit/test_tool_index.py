@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+from mcp_repl.tool_index import ToolIndex, tokenize
+
+TOOLS = json.loads(
+    (Path(__file__).parent.parent / "integration/data/available_tools.json").read_text()
+)
+
+
+def test_tokenize_splits_snake_case():
+    assert tokenize("k8s_server_get_pod_logs") == [
+        "k8s",
+        "server",
+        "get",
+        "pod",
+        "logs",
+    ]
+
+
+def test_search_ranks_relevant_tools_first():
+    index = ToolIndex(TOOLS)
+
+    assert index.search("show me the logs of pod nginx", top_k=1) == [
+        "k8s_server_get_pod_logs"
+    ]
+    assert "k8s_server_delete_resource" in index.search("delete deployment", top_k=2)
+
+
+def test_search_without_matches_is_empty():
+    index = ToolIndex(TOOLS)
+
+    assert index.search("hello there", top_k=3) == []
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mcp_repl.usage import (
+    BudgetExceededError,
+    UsageTracker,
+    attribute_prompt_tokens,
+    model_prices,
+)
+
+TOOLS = [
+    {"name": "k8s_get_pod_logs", "description": "Get pod logs", "input_schema": {}}
+]
+
+HISTORY = [
+    {"role": "user", "content": "show logs"},
+    {
+        "role": "assistant",
+        "content": [
+            {"type": "tool_use", "id": "tu_1", "name": "k8s_get_pod_logs", "input": {}}
+        ],
+    },
+    {
+        "role": "user",
+        "content": [
+            {"type": "tool_result", "tool_use_id": "tu_1", "content": "x" * 400}
+        ],
+    },
+]
+
+
+def make_usage(input_tokens, output_tokens, cache_read=0):
+    return SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cache_creation_input_tokens=None,
+        cache_read_input_tokens=cache_read,
+    )
+
+
+def test_attribute_prompt_tokens_counts_schemas_and_results():
+    tool_tokens = attribute_prompt_tokens(TOOLS, HISTORY)
+
+    assert tool_tokens["k8s_get_pod_logs"] > 100
+
+
+def test_tracker_totals_and_cost():
+    tracker = UsageTracker()
+    tracker.record(make_usage(1000, 100), TOOLS, HISTORY)
+    tracker.record(make_usage(2000, 200, cache_read=1000), TOOLS, HISTORY)
+
+    totals = tracker.totals()
+    assert totals.input_tokens == 3000
+    assert totals.output_tokens == 300
+    assert totals.cache_read_input_tokens == 1000
+    assert totals.cache_creation_input_tokens == 0
+    assert tracker.cost() == pytest.approx((3000 * 3 + 300 * 15 + 1000 * 0.3) / 1e6)
+    assert tracker.top_tools(1)[0][0] == "k8s_get_pod_logs"
+
+
+def test_tracker_prices_turns_by_model():
+    tracker = UsageTracker()
+    tracker.record(make_usage(1000, 100), [], [], model="gpt-4o-mini-2024-07-18")
+    tracker.record(make_usage(1000, 100), [], [], model="claude-3-opus-20240229")
+
+    assert model_prices("gpt-4o-mini").input == 0.15
+    assert model_prices("gpt-4o-2024-08-06").input == 2.5
+    assert tracker.cost() == pytest.approx((1000 * 15.15 + 100 * 75.6) / 1e6)
+    assert not tracker.cost_is_estimate()
+
+    tracker.record(make_usage(1000, 0), [], [], model="llama-3")
+    assert tracker.cost_is_estimate()
+
+
+def test_tracker_budgets():
+    tracker = UsageTracker(soft_budget=1000, hard_budget=2000)
+    tracker.check_hard_budget()
+
+    tracker.record(make_usage(900, 200), [], [])
+    assert tracker.over_soft_budget()
+    tracker.check_hard_budget()
+
+    tracker.record(make_usage(900, 200), [], [])
+    with pytest.raises(BudgetExceededError):
+        tracker.check_hard_budget()